@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""Validate many model snapshots in parallel and merge the results.
+
+Each task is one snapshot file.  With ``--per-sector`` every snapshot is
+classified once here (rooms, doors, directions and duplicates), and only
+its numbering groups fan out, one task per sector: groups are independent
+once rooms are keyed by ``(sector, function_id)``.  Tasks run on a process
+pool and their findings are merged in task order, so the report is
+identical for any worker count, with or without ``--per-sector``::
+
+    python batch_validate.py nightly/*.rvsnap --workers 8 --output report.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+
+from model_snapshot import load_snapshot
+from validation_engine import (DIRECTION, DOOR, DUPLICATE, ROOM, OK, UNRESOLVED_SECTOR,
+                               group_data, load_config, load_direction_rules,
+                               number_group_data, validate_model)
+
+KINDS = ((ROOM, "rooms"), (DOOR, "doors"), (DIRECTION, "directions"),
+         (DUPLICATE, "duplicates"))
+
+# Per-worker state, filled by _init_worker.
+_WORKER = {}
+
+
+def _init_worker(config_dir, mode):
+    _WORKER["config_dir"] = config_dir
+    _WORKER["mode"] = mode
+    _WORKER["models"] = {}
+
+
+def _config():
+    """(FunctionCatalogue, LevelResolver, DoorDirectionRules or None)."""
+    # Numbering tasks never need the workbooks, so they are read on first use.
+    if "config" not in _WORKER:
+        config_dir = _WORKER["config_dir"]
+        _WORKER["config"] = load_config(config_dir) + (load_direction_rules(config_dir),)
+    return _WORKER["config"]
+
+
+def _model(path):
+    models = _WORKER["models"]
+    if path not in models:
+        models[path] = load_snapshot(path)
+    return models[path]
+
+
+def _close_models():
+    for model in _WORKER.get("models", {}).values():
+        model.close()
+    _WORKER["models"] = {}
+
+
+def _part(path, sector, result):
+    part = {"path": path, "sector": sector}
+    for kind, name in KINDS:
+        part[name] = [f._asdict() for f in result.findings(kind)]
+    return part
+
+
+def _validate(path, numbering):
+    model = _model(path)
+    catalogue, resolver, direction_rules = _config()
+    return validate_model(model, catalogue, resolver, _WORKER["mode"],
+                          model.meta.get("view_sector"), direction_rules=direction_rules,
+                          numbering=numbering)
+
+
+def split_snapshot(path):
+    """(findings outside room numbering, [numbering task per sector]) for a snapshot."""
+    result = _validate(path, numbering=False)
+    groups = group_data(result.room_groups)
+    return (_part(path, None, result),
+            [("groups", path, sector, groups[sector]) for sector in sorted(groups)])
+
+
+def run_task(task):
+    """Run a ("model", path) or ("groups", path, sector, groups) task; returns plain data."""
+    if task[0] == "groups":
+        _, path, sector, groups = task
+        findings = number_group_data(_model(path).rooms, groups)
+        part = dict((name, []) for _, name in KINDS)
+        part.update(path=path, sector=sector, rooms=[f._asdict() for f in findings])
+        return part
+    _, path = task
+    return _part(path, None, _validate(path, numbering=True))
+
+
+def _summary(findings):
+    counts = {}
+    for f in findings:
+        c = counts.setdefault(f["sector"] or UNRESOLVED_SECTOR, {"ok": 0, "issues": 0})
+        c["ok" if f["code"] == OK else "issues"] += 1
+    return counts
+
+
+def merge_results(task_results):
+    """Merge task outputs (already in task order) into one report per snapshot."""
+    models = []
+    by_path = {}
+    for part in task_results:
+        entry = by_path.get(part["path"])
+        if entry is None:
+            entry = dict((name, []) for _, name in KINDS)
+            entry["path"] = part["path"]
+            by_path[part["path"]] = entry
+            models.append(entry)
+        for _, name in KINDS:
+            entry[name].extend(part[name])
+
+    report = {"models": []}
+    for entry in models:
+        model = {"path": entry["path"]}
+        for _, name in KINDS:
+            model[name] = {"summary": _summary(entry[name]), "findings": entry[name]}
+        report["models"].append(model)
+    return report
+
+
+def run_batch(paths, config_dir, mode="ALL", workers=None, per_sector=False):
+    """Validate ``paths`` on ``workers`` processes and return the merged report.
+
+    With ``per_sector`` each snapshot is first classified by one task
+    (split_snapshot), then its sectors are numbered by the tasks that
+    returns.
+    """
+    paths = sorted(set(os.path.abspath(p) for p in paths))
+    workers = workers or multiprocessing.cpu_count()
+    pool = None
+    if workers > 1 and (per_sector or len(paths) > 1):
+        pool = multiprocessing.Pool(workers, _init_worker, (config_dir, mode))
+        # imap keeps task order, so the merge does not depend on timing.
+        run = pool.imap
+    else:
+        _init_worker(config_dir, mode)
+        run = map
+    try:
+        parts = []
+        if per_sector:
+            tasks = []
+            for part, group_tasks in run(split_snapshot, paths):
+                parts.append(part)
+                tasks.extend(group_tasks)
+        else:
+            tasks = [("model", path) for path in paths]
+        return merge_results(parts + list(run(run_task, tasks)))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        else:
+            _close_models()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate model snapshots in parallel.")
+    parser.add_argument("snapshots", nargs="+", help="snapshot files")
+    parser.add_argument("--config-dir", default=os.path.dirname(os.path.abspath(__file__)),
+                        help="folder holding function_map.xlsx, level_map.xlsx and "
+                             "door_direction_rules.xlsx")
+    parser.add_argument("--mode", choices=["ALL", "FOH", "BOH"], default="ALL")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--per-sector", action="store_true",
+                        help="classify each snapshot once and number its sectors "
+                             "as separate tasks")
+    parser.add_argument("--output", help="write the merged report as JSON")
+    args = parser.parse_args(argv)
+
+    report = run_batch(args.snapshots, args.config_dir, args.mode,
+                       args.workers, args.per_sector)
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=1, sort_keys=True)
+
+    issues = 0
+    for model in report["models"]:
+        for _, kind in KINDS:
+            summary = model[kind]["summary"]
+            ok = sum(c["ok"] for c in summary.values())
+            bad = sum(c["issues"] for c in summary.values())
+            issues += bad
+            print("{} {}: OK {}, Issues {}".format(os.path.basename(model["path"]),
+                                                  kind, ok, bad))
+    return 1 if issues else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
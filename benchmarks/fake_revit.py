@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+"""Minimal stand-ins for the Revit API used by the extraction code.
+
+``install()`` registers ``Autodesk.Revit.DB`` and ``System.Collections.Generic``
+modules in ``sys.modules`` so ``revit_extract`` imports unchanged outside
+Revit.  Only the members the validators touch are implemented, with the
+same names and call shapes as the real API.
+"""
+import math
+import sys
+import types
+
+
+class ElementId(object):
+    __slots__ = ("IntegerValue",)
+
+    def __init__(self, value):
+        self.IntegerValue = value
+
+    def __eq__(self, other):
+        return isinstance(other, ElementId) and other.IntegerValue == self.IntegerValue
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.IntegerValue)
+
+
+class XYZ(object):
+    __slots__ = ("X", "Y", "Z")
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.X = x
+        self.Y = y
+        self.Z = z
+
+
+class BoundingBoxXYZ(object):
+    __slots__ = ("Min", "Max")
+
+    def __init__(self, min_pt, max_pt):
+        self.Min = min_pt
+        self.Max = max_pt
+
+
+class Outline(object):
+    def __init__(self, min_pt, max_pt):
+        self.MinimumPoint = min_pt
+        self.MaximumPoint = max_pt
+
+
+class LocationPoint(object):
+    __slots__ = ("Point",)
+
+    def __init__(self, point):
+        self.Point = point
+
+
+class LocationCurve(object):
+    def __init__(self, curve):
+        self.Curve = curve
+
+
+class Curve(object):
+    pass
+
+
+class Line(Curve):
+    def __init__(self, p0, p1):
+        self._points = (p0, p1)
+
+    def GetEndPoint(self, i):
+        return self._points[i]
+
+    def Evaluate(self, t, normalized=True):
+        p0, p1 = self._points
+        return XYZ(p0.X + (p1.X - p0.X) * t, p0.Y + (p1.Y - p0.Y) * t,
+                   p0.Z + (p1.Z - p0.Z) * t)
+
+
+class Options(object):
+    pass
+
+
+class _Enum(object):
+    """Attribute access returns the attribute name, like an enum member."""
+
+    def __getattr__(self, name):
+        return name
+
+
+BuiltInCategory = _Enum()
+BuiltInParameter = _Enum()
+
+
+class Parameter(object):
+    __slots__ = ("Id", "Definition", "GUID", "IsShared", "_value")
+
+    def __init__(self, pid, value, shared=False):
+        self.Id = pid
+        self.Definition = pid
+        self.GUID = pid
+        self.IsShared = shared
+        self._value = value
+
+    @property
+    def HasValue(self):
+        return self._value is not None
+
+    IsReadOnly = False
+
+    def AsString(self):
+        return self._value
+
+    def Set(self, value):
+        self._value = value
+        return True
+
+
+class Element(object):
+    category = None
+
+    def __init__(self, element_id, name=None, params=None):
+        self.Id = ElementId(element_id)
+        self.Name = name
+        # {handle: Parameter}; handles are BuiltInParameter names or display names.
+        self._params = params or {}
+        self._by_name = {}
+
+    def add_param(self, handle, display_name, value, shared=False):
+        param = Parameter(handle, value, shared)
+        self._params[handle] = param
+        self._by_name[display_name] = param
+        return param
+
+    def LookupParameter(self, name):
+        return self._by_name.get(name)
+
+    def get_Parameter(self, handle):
+        return self._params.get(handle)
+
+    def get_BoundingBox(self, view):
+        return getattr(self, "_bbox", None)
+
+
+class ElementType(Element):
+    pass
+
+
+class Level(Element):
+    def __init__(self, element_id, name, elevation):
+        Element.__init__(self, element_id, name)
+        self.Elevation = elevation
+
+
+class Phase(Element):
+    pass
+
+
+class View(Element):
+    pass
+
+
+class ScopeBox(Element):
+    category = "OST_VolumeOfInterest"
+
+    def __init__(self, element_id, name, min_pt, max_pt):
+        Element.__init__(self, element_id, name)
+        self._bbox = BoundingBoxXYZ(min_pt, max_pt)
+
+    def get_Geometry(self, options):
+        lo, hi = self._bbox.Min, self._bbox.Max
+        c = [XYZ(lo.X, lo.Y), XYZ(hi.X, lo.Y), XYZ(hi.X, hi.Y), XYZ(lo.X, hi.Y)]
+        return [Line(c[i], c[(i + 1) % 4]) for i in range(4)]
+
+
+class Room(Element):
+    category = "OST_Rooms"
+
+    def __init__(self, element_id, level, point, half_size):
+        Element.__init__(self, element_id)
+        self.LevelId = level.Id
+        self.Location = LocationPoint(point)
+        self._bbox = BoundingBoxXYZ(XYZ(point.X - half_size, point.Y - half_size, point.Z),
+                                    XYZ(point.X + half_size, point.Y + half_size,
+                                        point.Z + 10.0))
+
+
+class FamilySymbol(ElementType):
+    def __init__(self, element_id, family_name, type_name):
+        ElementType.__init__(self, element_id, type_name)
+        self.FamilyName = family_name
+
+
+class FamilyInstance(Element):
+    category = "OST_Doors"
+
+    def __init__(self, element_id, symbol, point, to_room=None, from_room=None,
+                 flipped=False):
+        Element.__init__(self, element_id, symbol.Name)
+        self.Symbol = symbol
+        self.Location = LocationPoint(point)
+        self.FacingFlipped = flipped
+        self._rooms = (to_room, from_room)
+        self._bbox = BoundingBoxXYZ(XYZ(point.X - 1.5, point.Y - 0.5, point.Z),
+                                    XYZ(point.X + 1.5, point.Y + 0.5, point.Z + 7.0))
+
+    def get_ToRoom(self, phase_id):
+        return self._rooms[0]
+
+    def get_FromRoom(self, phase_id):
+        return self._rooms[1]
+
+
+class _DocumentVersion(object):
+    def __init__(self, guid, saves):
+        self.VersionGUID = guid
+        self.NumberOfSaves = saves
+
+
+class Transform(object):
+    """Plan rotation by ``angle`` radians about Z, then a move to ``origin``."""
+
+    def __init__(self, origin, angle=0.0):
+        self.Origin = origin
+        self.BasisX = XYZ(math.cos(angle), math.sin(angle), 0.0)
+        self.BasisY = XYZ(-math.sin(angle), math.cos(angle), 0.0)
+
+
+class RevitLinkInstance(Element):
+    def __init__(self, element_id, link_doc, transform):
+        Element.__init__(self, element_id, link_doc.Title if link_doc else None)
+        self._link_doc = link_doc
+        self._transform = transform
+
+    def GetLinkDocument(self):
+        return self._link_doc
+
+    def GetTotalTransform(self):
+        return self._transform
+
+
+class Document(object):
+    """Elements by class and category, plus the per-view visible ids."""
+
+    def __init__(self, title, path=""):
+        self.Title = title
+        self.PathName = path
+        self.saves = 0
+        self.elements = []
+        self._by_id = {}
+        self.visible = {}
+        self.transactions = []
+        self.commits = 0
+
+    def add(self, element, views=()):
+        self.elements.append(element)
+        self._by_id[element.Id.IntegerValue] = element
+        for view in views:
+            self.visible.setdefault(view.Id.IntegerValue, set()).add(element.Id.IntegerValue)
+        return element
+
+    def GetElement(self, element_id):
+        return self._by_id.get(element_id.IntegerValue)
+
+    @staticmethod
+    def GetDocumentVersion(doc):
+        return _DocumentVersion(doc.Title, doc.saves)
+
+
+class Transaction(object):
+    """Counts starts and commits on the document; changes apply immediately."""
+
+    def __init__(self, doc, name):
+        self.doc = doc
+        self.name = name
+        self._state = None
+
+    def Start(self):
+        self._state = "started"
+        self.doc.transactions.append(self.name)
+
+    def Commit(self):
+        self._state = "committed"
+        self.doc.commits += 1
+
+    def RollBack(self):
+        self._state = "rolled back"
+
+    def HasStarted(self):
+        return self._state is not None
+
+    def HasEnded(self):
+        return self._state in ("committed", "rolled back")
+
+
+# --- Filters ---
+
+class ElementFilter(object):
+    def passes(self, element):
+        raise NotImplementedError
+
+
+class BoundingBoxIntersectsFilter(ElementFilter):
+    def __init__(self, outline):
+        self.outline = outline
+
+    def passes(self, element):
+        bb = element.get_BoundingBox(None)
+        if bb is None:
+            return False
+        lo, hi = self.outline.MinimumPoint, self.outline.MaximumPoint
+        return (bb.Min.X <= hi.X and bb.Max.X >= lo.X and bb.Min.Y <= hi.Y
+                and bb.Max.Y >= lo.Y and bb.Min.Z <= hi.Z and bb.Max.Z >= lo.Z)
+
+
+class _EqualsRule(object):
+    def __init__(self, param_id, value):
+        self.param_id = param_id
+        self.value = value
+
+
+class ParameterFilterRuleFactory(object):
+    @staticmethod
+    def CreateEqualsRule(param_id, value, case_sensitive=None):
+        return _EqualsRule(param_id, value)
+
+
+class ElementParameterFilter(ElementFilter):
+    def __init__(self, rule, inverted=False):
+        self.rule = rule
+        self.inverted = inverted
+
+    def passes(self, element):
+        param = element.get_Parameter(self.rule.param_id)
+        match = param is not None and param.AsString() == self.rule.value
+        return match != self.inverted
+
+
+class LogicalAndFilter(ElementFilter):
+    def __init__(self, filters):
+        self.filters = list(filters)
+
+    def passes(self, element):
+        return all(f.passes(element) for f in self.filters)
+
+
+class LogicalOrFilter(ElementFilter):
+    def __init__(self, filters):
+        self.filters = list(filters)
+
+    def passes(self, element):
+        return any(f.passes(element) for f in self.filters)
+
+
+class FilteredElementCollector(object):
+    def __init__(self, doc, view_id=None):
+        visible = None
+        if view_id is not None:
+            visible = doc.visible.get(view_id.IntegerValue, set())
+        self._elements = [e for e in doc.elements
+                          if visible is None or e.Id.IntegerValue in visible]
+
+    def _where(self, predicate):
+        self._elements = [e for e in self._elements if predicate(e)]
+        return self
+
+    def OfClass(self, cls):
+        return self._where(lambda e: isinstance(e, cls))
+
+    def OfCategory(self, category):
+        return self._where(lambda e: e.category == category)
+
+    def WhereElementIsNotElementType(self):
+        return self._where(lambda e: not isinstance(e, ElementType))
+
+    def WherePasses(self, element_filter):
+        return self._where(element_filter.passes)
+
+    def Excluding(self, element_ids):
+        excluded = set(i.IntegerValue for i in element_ids)
+        return self._where(lambda e: e.Id.IntegerValue not in excluded)
+
+    def FirstElement(self):
+        return self._elements[0] if self._elements else None
+
+    def __iter__(self):
+        return iter(self._elements)
+
+
+class _GenericList(object):
+    """``List[T](items)`` returns a plain list."""
+
+    def __getitem__(self, item_type):
+        return list
+
+
+def install():
+    """Register the stand-in modules (idempotent)."""
+    if "Autodesk.Revit.DB" in sys.modules:
+        return sys.modules["Autodesk.Revit.DB"]
+    db = types.ModuleType("Autodesk.Revit.DB")
+    for name, value in globals().items():
+        if isinstance(value, (type, _Enum)) and not name.startswith("_"):
+            setattr(db, name, value)
+    autodesk = types.ModuleType("Autodesk")
+    revit = types.ModuleType("Autodesk.Revit")
+    autodesk.Revit = revit
+    revit.DB = db
+
+    generic = types.ModuleType("System.Collections.Generic")
+    generic.List = _GenericList()
+    collections_mod = types.ModuleType("System.Collections")
+    collections_mod.Generic = generic
+    system = sys.modules.get("System") or types.ModuleType("System")
+    system.Collections = collections_mod
+
+    sys.modules.update({
+        "Autodesk": autodesk, "Autodesk.Revit": revit, "Autodesk.Revit.DB": db,
+        "System": system, "System.Collections": collections_mod,
+        "System.Collections.Generic": generic,
+    })
+    return db
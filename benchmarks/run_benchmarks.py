@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""Time the validator stages on synthetic models, outside Revit.
+
+The Revit API is replaced by ``fake_revit`` so the real extraction,
+validation and reporting code runs under plain Python 3::
+
+    python benchmarks/run_benchmarks.py --rooms 1000 10000 --sectors 16 100 \\
+        --output results.json
+
+Each case is timed ``--repeat`` times and the best time per stage is kept.
+Compare two result files to see regressions between versions.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+import fake_revit
+fake_revit.install()
+
+import synthetic
+from door_direction import DoorDirectionRules
+from door_rules_reader import read_door_direction_rules
+from function_catalogue import FunctionCatalogue
+from function_level_reader import read_function_categories, read_function_map, read_level_map
+from level_resolver import LevelResolver
+from renumber import build_plan
+from report_builder import ReportBuilder, write_csv
+from revit_apply import apply_plan
+from revit_extract import extract_model
+from validation_engine import (DIRECTION, DOOR, DUPLICATE, ROOM, DoorRoomIndex,
+                               DuplicateIndex, ValidationResult, build_sector_index,
+                               validate_door_directions, validate_doors,
+                               validate_duplicates, validate_rooms)
+
+STAGES = ("config_load", "collection", "sector_resolution", "numbering",
+          "door_checks", "duplicates", "reporting", "renumber")
+
+
+class _Output(object):
+    """Stands in for the pyRevit output window; keeps only the text size."""
+
+    def __init__(self):
+        self.calls = 0
+        self.chars = 0
+
+    def print_md(self, text):
+        self.calls += 1
+        self.chars += len(text)
+
+    def print_html(self, text):
+        self.calls += 1
+        self.chars += len(text)
+
+
+def _timed(timings, stage, func, *args, **kwargs):
+    start = time.time()
+    value = func(*args, **kwargs)
+    timings[stage] = time.time() - start
+    return value
+
+
+def _load_config(config_dir):
+    function_map_file = os.path.join(config_dir, "function_map.xlsx")
+    catalogue = FunctionCatalogue(read_function_map(function_map_file),
+                                  read_function_categories(function_map_file))
+    resolver = LevelResolver(read_level_map(os.path.join(config_dir, "level_map.xlsx")))
+    rules = DoorDirectionRules(read_door_direction_rules(
+        os.path.join(config_dir, "door_direction_rules.xlsx")))
+    return catalogue, resolver, rules
+
+
+def _resolve_sectors(model):
+    index = build_sector_index(model)
+    rooms = model.rooms
+    for i in range(len(rooms)):
+        index.owner(rooms["sx"][i], rooms["sy"][i])
+    return index
+
+
+def _report(result, export_dir):
+    output = _Output()
+    report = ReportBuilder()
+    for kind in (ROOM, DOOR, DIRECTION, DUPLICATE):
+        report.findings(kind, result.findings(kind), by_sector=True)
+    report.render(output)
+    write_csv(result, os.path.join(export_dir, "findings.csv"))
+    return output
+
+
+def run_case(rooms, sectors, levels, doors_per_room, rule_phrases, mode, work_dir):
+    """{stage: seconds, ...} plus element and finding counts for one case."""
+    config_dir = os.path.join(work_dir, "config")
+    synthetic.write_configs(config_dir, levels=levels, rule_phrases=rule_phrases)
+    doc, phase = synthetic.make_document(rooms=rooms, sectors=sectors, levels=levels,
+                                         doors_per_room=doors_per_room)
+
+    timings = {}
+    result = ValidationResult()
+    catalogue, resolver, rules = _timed(timings, "config_load", _load_config, config_dir)
+    model = _timed(timings, "collection", extract_model, doc, None, phase, True,
+                   excluded_gifa_names=catalogue.names_rejected(mode))
+    sector_index = _timed(timings, "sector_resolution", _resolve_sectors, model)
+    result.rooms = _timed(timings, "numbering", validate_rooms, model, catalogue,
+                          resolver, sector_index, mode)
+
+    def door_checks():
+        door_index = DoorRoomIndex(model, sector_index)
+        return (validate_doors(model, sector_index, door_index=door_index),
+                validate_door_directions(model, sector_index, rules,
+                                         door_index=door_index))
+    result.doors, result.directions = _timed(timings, "door_checks", door_checks)
+
+    def duplicates():
+        duplicate_index = DuplicateIndex(model)
+        return duplicate_index, validate_duplicates(model, sector_index, duplicate_index)
+    duplicate_index, result.duplicates = _timed(timings, "duplicates", duplicates)
+    output = _timed(timings, "reporting", _report, result, work_dir)
+
+    def renumber():
+        plan = build_plan(model, result, sector_index, duplicate_index)
+        return plan, apply_plan(doc, plan)
+    plan, (renumbered, _) = _timed(timings, "renumber", renumber)
+
+    return {
+        "stages": timings,
+        "total": sum(timings.values()),
+        "counts": {
+            "rooms": len(model.rooms), "doors": len(model.doors),
+            "room_findings": len(result.rooms), "door_findings": len(result.doors),
+            "direction_findings": len(result.directions),
+            "duplicate_findings": len(result.duplicates),
+            "output_calls": output.calls, "output_chars": output.chars,
+            "renumber_changes": len(plan), "renumbered": renumbered,
+            "renumber_commits": doc.commits,
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the validator stages.")
+    parser.add_argument("--rooms", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--sectors", type=int, nargs="+", default=[16])
+    parser.add_argument("--levels", type=int, default=10)
+    parser.add_argument("--doors-per-room", type=float, default=1.5)
+    parser.add_argument("--rule-phrases", type=int, default=300)
+    parser.add_argument("--mode", choices=["ALL", "FOH", "BOH"], default="ALL")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--label", default="", help="free text stored with the results")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = {
+        "label": args.label,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cases": [],
+    }
+    work_dir = tempfile.mkdtemp(prefix="validators-bench-")
+    try:
+        for rooms in args.rooms:
+            for sectors in args.sectors:
+                best = None
+                for _ in range(args.repeat):
+                    run = run_case(rooms, sectors, args.levels, args.doors_per_room,
+                                   args.rule_phrases, args.mode, work_dir)
+                    if best is None:
+                        best = run
+                    else:
+                        for stage in STAGES:
+                            best["stages"][stage] = min(best["stages"][stage],
+                                                        run["stages"][stage])
+                best["total"] = sum(best["stages"].values())
+                best["params"] = {"rooms": rooms, "sectors": sectors,
+                                  "levels": args.levels,
+                                  "doors_per_room": args.doors_per_room,
+                                  "rule_phrases": args.rule_phrases, "mode": args.mode}
+                results["cases"].append(best)
+                print("rooms={:>7} sectors={:>4}  ".format(rooms, sectors) +
+                      "  ".join("{} {:.3f}s".format(stage, best["stages"][stage])
+                                for stage in STAGES) +
+                      "  total {:.3f}s".format(best["total"]))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=1, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""Synthetic models and config workbooks for the benchmarks.
+
+``make_document`` builds a ``fake_revit.Document`` with a grid of sector
+scope boxes, levels, rooms and doors.  ``write_configs`` writes matching
+function map, level map and door direction rule workbooks.  Both are
+deterministic for a given seed.
+"""
+import math
+import os
+import random
+import zipfile
+
+import fake_revit as db
+
+SECTOR_SIZE = 400.0     # ft, side of one sector scope box
+LEVEL_HEIGHT = 4500.0   # mm
+FUNCTIONS = [
+    ("OFFICE", 1, "FOH"), ("RECEPTION", 1, "FOH"), ("LOBBY", 5, "FOH"),
+    ("RETAIL", 6, "FOH"), ("CORRIDOR", 8, "FOH & BOH"), ("TOILET", 9, "FOH & BOH"),
+    ("STORE", 2, "BOH"), ("PLANT", 3, "BOH"), ("LOADING", 7, "BOH"),
+]
+ROOM_NAMES = ["Office", "Meeting", "Store", "Stair", "Lift Lobby", "Toilet",
+              "Corridor", "Plant", "Kitchen", "Riser"]
+DOOR_FAMILIES = [("Single Door", "900x2100"), ("Double Door", "1800x2100"),
+                 ("Fire Door", "FD60 900"), ("Sliding Door", "1200")]
+
+GIFA_PARAM = "GIFA_NAME"
+
+
+def gifa_names(count):
+    """``count`` GIFA NAMEs cycling through FUNCTIONS, with their id and category."""
+    names = []
+    for i in range(count):
+        base, fid, category = FUNCTIONS[i % len(FUNCTIONS)]
+        names.append(("{} {:03d}".format(base, i // len(FUNCTIONS)), fid, category))
+    return names
+
+
+def make_document(rooms=1000, sectors=16, levels=10, doors_per_room=1.5,
+                  functions=90, seed=0):
+    """(document, phase) with the requested element counts."""
+    rng = random.Random(seed)
+    doc = db.Document("Synthetic {} rooms".format(rooms))
+    next_id = [1000]
+
+    def new_id():
+        next_id[0] += 1
+        return next_id[0]
+
+    phase = doc.add(db.Phase(new_id(), "New Construction"))
+    doc.add(db.Phase(new_id(), "Existing"))
+
+    level_elems = []
+    for n in range(levels):
+        elevation_ft = n * LEVEL_HEIGHT / 304.8
+        level_elems.append(doc.add(db.Level(new_id(), "Level L{:02d}".format(n), elevation_ft)))
+
+    columns = int(math.ceil(math.sqrt(sectors)))
+    sector_codes = []
+    for n in range(sectors):
+        code = "{:04d}".format(n + 1)
+        x0 = (n % columns) * SECTOR_SIZE
+        y0 = (n // columns) * SECTOR_SIZE
+        doc.add(db.ScopeBox(new_id(), "100_{}".format(code), db.XYZ(x0, y0, -10.0),
+                            db.XYZ(x0 + SECTOR_SIZE, y0 + SECTOR_SIZE, 500.0)))
+        sector_codes.append((code, x0, y0))
+
+    names = gifa_names(functions)
+    room_elems = []
+    counters = {}
+    for n in range(rooms):
+        code, x0, y0 = sector_codes[rng.randrange(sectors)]
+        level = level_elems[rng.randrange(levels)]
+        point = db.XYZ(x0 + rng.uniform(5.0, SECTOR_SIZE - 5.0),
+                       y0 + rng.uniform(5.0, SECTOR_SIZE - 5.0), level.Elevation)
+        room = db.Room(new_id(), level, point, half_size=rng.uniform(3.0, 15.0))
+        gifa, fid, _ = names[rng.randrange(len(names))]
+        key = (level.Id.IntegerValue, code, fid)
+        counters[key] = counters.get(key, 0) + 1
+        number = "L{:02d}-{}-{}{:02d}".format(level_elems.index(level), code, fid,
+                                              counters[key] % 100)
+        if rng.random() < 0.05:
+            number = number[:-1] + "X"
+        room.add_param("ROOM_NAME", "Name", rng.choice(ROOM_NAMES))
+        room.add_param("ROOM_NUMBER", "Number", number)
+        room.add_param(GIFA_PARAM, "GIFA NAME", gifa, shared=True)
+        room_elems.append(doc.add(room))
+
+    symbols = []
+    for family, type_name in DOOR_FAMILIES:
+        symbol = db.FamilySymbol(new_id(), family, type_name)
+        symbol.add_param("ALL_MODEL_TYPE_COMMENTS", "Type Comments",
+                         "NOT FOR DOOR SCHEDULE" if family == "Sliding Door" else None)
+        symbol.add_param("SYMBOL_NAME_PARAM", "Type Name", type_name)
+        symbols.append(doc.add(symbol))
+
+    door_count = int(rooms * doors_per_room)
+    for n in range(door_count):
+        room = room_elems[n % rooms] if n < rooms else rng.choice(room_elems)
+        other = rng.choice(room_elems) if rng.random() < 0.7 else None
+        p = room.Location.Point
+        door = db.FamilyInstance(new_id(), rng.choice(symbols),
+                                 db.XYZ(p.X + rng.uniform(-3.0, 3.0),
+                                        p.Y + rng.uniform(-3.0, 3.0), p.Z),
+                                 to_room=room, from_room=other,
+                                 flipped=rng.random() < 0.5)
+        number = room.LookupParameter("Number").AsString()
+        mark = number + rng.choice(["", "A", "B"]) if rng.random() < 0.9 else None
+        door.add_param("ALL_MODEL_MARK", "Mark", mark)
+        door.add_param("ALL_MODEL_INSTANCE_COMMENTS", "Comments", None)
+        doc.add(door)
+
+    return doc, phase
+
+
+# --- Workbooks ---
+
+_NS = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+_REL_NS = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+
+
+def _escape(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _column(n):
+    name = ""
+    n += 1
+    while n:
+        n, rem = divmod(n - 1, 26)
+        name = chr(65 + rem) + name
+    return name
+
+
+def write_xlsx(path, rows):
+    """One-sheet workbook with inline strings; None cells are left out."""
+    parts = ['<worksheet {}><sheetData>'.format(_NS)]
+    for r, row in enumerate(rows, 1):
+        parts.append('<row r="{}">'.format(r))
+        for c, value in enumerate(row):
+            ref = "{}{}".format(_column(c), r)
+            if value is None:
+                continue
+            if isinstance(value, (int, float)):
+                parts.append('<c r="{}"><v>{!r}</v></c>'.format(ref, value))
+            else:
+                parts.append('<c r="{}" t="inlineStr"><is><t>{}</t></is></c>'.format(
+                    ref, _escape(value)))
+        parts.append('</row>')
+    parts.append('</sheetData></worksheet>')
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", "<Types/>")
+        zf.writestr("xl/workbook.xml",
+                    '<workbook {} {}><sheets><sheet name="Sheet1" sheetId="1" '
+                    'r:id="rId1"/></sheets></workbook>'.format(_NS, _REL_NS))
+        zf.writestr("xl/_rels/workbook.xml.rels",
+                    '<Relationships xmlns="http://schemas.openxmlformats.org/package/'
+                    '2006/relationships"><Relationship Id="rId1" '
+                    'Target="worksheets/sheet1.xml"/></Relationships>')
+        zf.writestr("xl/worksheets/sheet1.xml", "".join(parts))
+
+
+def write_configs(folder, levels=10, functions=90, rule_phrases=300, seed=0):
+    """Write function_map, level_map and door_direction_rules workbooks."""
+    rng = random.Random(seed)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    rows = [["GIFA NAME", "FUNCTION ID", "AREA CATEGORY"]]
+    rows.extend([name, fid, category] for name, fid, category in gifa_names(functions))
+    write_xlsx(os.path.join(folder, "function_map.xlsx"), rows)
+
+    rows = [["Elevation", "Code"]]
+    rows.extend([n * LEVEL_HEIGHT, "L{:02d}".format(n)] for n in range(levels))
+    write_xlsx(os.path.join(folder, "level_map.xlsx"), rows)
+
+    words = ["STAIR", "LIFT", "LOBBY", "FIRE", "RISER", "PLANT", "ESCAPE", "CORE",
+             "SHAFT", "SMOKE", "EXIT", "SERVICE"]
+    rows = [["Flip contains", "Flip search contains", "Block flip equals"]]
+    for n in range(rule_phrases):
+        phrase = "{} {}".format(rng.choice(words), n)
+        rows.append([phrase if n % 3 == 0 else None,
+                     phrase if n % 3 == 1 else None,
+                     phrase if n % 3 == 2 else None])
+    rows[1] = ["STAIR", "FIRE", "RISER 0"]
+    write_xlsx(os.path.join(folder, "door_direction_rules.xlsx"), rows)
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""Sidecar cache for parsed config workbooks.
+
+The parsed result of a reader (``read_function_map``, ``read_level_map``,
+``read_door_direction_rules``) is stored as JSON next to the workbook and
+reused until the workbook changes.  Each reader has its own sidecar
+(``.function_map.xlsx.read_function_map.cache.json``), so two readers of
+one workbook do not evict each other.  A sidecar is valid when the source
+path and content hash match; size and mtime are recorded as well and are
+refreshed in place when only they change (e.g. the file was copied).
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+from instrumentation import count
+
+CACHE_VERSION = 1
+_FALLBACK_DIR = os.path.join(tempfile.gettempdir(), "validators-for-revit-cache")
+
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _encode(value):
+    # JSON objects only allow string keys; keep dicts as item lists so
+    # int keys (level map elevations) survive the round trip.
+    if isinstance(value, dict):
+        return {"__items__": [[_encode(k), _encode(v)] for k, v in value.items()]}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict) and "__items__" in value:
+        return dict((_decode(k), _decode(v)) for k, v in value["__items__"])
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+def _reader_name(reader):
+    return "{}.{}".format(getattr(reader, "__module__", "?"),
+                          getattr(reader, "__name__", "?"))
+
+
+def _sidecar_paths(source_path, reader, cache_dir):
+    name = ".{}.{}.cache.json".format(os.path.basename(source_path),
+                                      getattr(reader, "__name__", "reader"))
+    dirs = [cache_dir] if cache_dir else [os.path.dirname(source_path), _FALLBACK_DIR]
+    return [os.path.join(d, name) for d in dirs]
+
+
+def _read_sidecar(path):
+    try:
+        with open(path, "r") as fh:
+            return json.load(fh)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def _write_sidecar(path, payload):
+    folder = os.path.dirname(path)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump(payload, fh, separators=(",", ":"))
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(tmp_path, path)
+
+
+def cached_read(reader, source_path, cache_dir=None, **reader_kwargs):
+    """Return ``reader(source_path, **reader_kwargs)``, from the sidecar when valid.
+
+    Missing sources are passed straight to the reader (which decides what
+    an absent config means) and never cached.
+    """
+    if not os.path.isfile(source_path):
+        return reader(source_path, **reader_kwargs)
+
+    stat = os.stat(source_path)
+    key = {
+        "version": CACHE_VERSION,
+        "reader": _reader_name(reader),
+        "path": os.path.normcase(os.path.abspath(source_path)),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+    }
+    content_hash = _file_hash(source_path)
+    sidecars = _sidecar_paths(source_path, reader, cache_dir)
+
+    for sidecar in sidecars:
+        payload = _read_sidecar(sidecar)
+        if not payload:
+            continue
+        stored = payload.get("key", {})
+        if (stored.get("version") != key["version"]
+                or stored.get("reader") != key["reader"]
+                or stored.get("path") != key["path"]
+                or payload.get("hash") != content_hash):
+            continue
+        value = _decode(payload.get("value"))
+        if stored.get("size") != key["size"] or stored.get("mtime") != key["mtime"]:
+            # Same content, new stamp: refresh the key, keep the parse.
+            payload["key"] = key
+            try:
+                _write_sidecar(sidecar, payload)
+            except (IOError, OSError):
+                pass
+        count("cache.config_hits")
+        return value
+
+    count("cache.config_misses")
+    value = reader(source_path, **reader_kwargs)
+    payload = {"key": key, "hash": content_hash, "value": _encode(value)}
+    for sidecar in sidecars:
+        try:
+            _write_sidecar(sidecar, payload)
+            break
+        except (IOError, OSError):
+            continue
+    return value
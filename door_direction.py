@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Expected door flip from the door direction rule sheet.
+
+The sheet has three columns, read by ``read_door_direction_rules``:
+
+- ``flip_contains``: the door should be flipped when its reference room's
+  name contains the phrase.
+- ``flip_search_contains``: the door should be flipped when its search text
+  (family and type name) contains the phrase.
+- ``block_flip_equals``: no flip when the room name or the type name equals
+  the phrase, whatever the other columns say.
+
+"Flipped" is the door's ``FacingFlipped`` value: True when the facing side
+is mirrored from the way the family was placed.  A ``flip_*`` match expects
+True, a ``block_flip_equals`` match expects False, and the door is reported
+when FacingFlipped differs.  Only doors that some rule applies to get an
+expectation; the others, and every door when the rule workbook is missing
+or empty, are not checked (no finding either way).
+"""
+from collections import namedtuple
+
+from phrase_matcher import PhraseMatcher
+
+FLIP_CONTAINS = "flip_contains"
+FLIP_SEARCH_CONTAINS = "flip_search_contains"
+BLOCK_FLIP_EQUALS = "block_flip_equals"
+
+FlipRule = namedtuple("FlipRule", "flip rule phrase")
+
+
+class DoorDirectionRules(object):
+    """Rule lists compiled into two phrase matchers and a set."""
+
+    def __init__(self, rules):
+        rules = rules or {}
+        self.room_matcher = PhraseMatcher(rules.get(FLIP_CONTAINS) or [])
+        self.search_matcher = PhraseMatcher(rules.get(FLIP_SEARCH_CONTAINS) or [])
+        self.blocked = frozenset(p for p in rules.get(BLOCK_FLIP_EQUALS) or [] if p)
+
+    def __len__(self):
+        return len(self.room_matcher) + len(self.search_matcher) + len(self.blocked)
+
+    def expected(self, room_name, search_text, type_name=None):
+        """FlipRule for a door, or None when no rule applies.
+
+        All texts are compared upper-cased and stripped.
+        """
+        room_name = (room_name or "").strip().upper()
+        type_name = (type_name or "").strip().upper()
+        for name in (room_name, type_name):
+            if name and name in self.blocked:
+                return FlipRule(False, BLOCK_FLIP_EQUALS, name)
+        phrase = self.room_matcher.first(room_name)
+        if phrase:
+            return FlipRule(True, FLIP_CONTAINS, phrase)
+        phrase = self.search_matcher.first((search_text or "").upper())
+        if phrase:
+            return FlipRule(True, FLIP_SEARCH_CONTAINS, phrase)
+        return None
@@ -1,108 +1,68 @@
 # -*- coding: utf-8 -*-
-import clr
-import System
+import excel_com
+import xlsx_reader
+from excel_com import ExcelSession
 
-def read_door_direction_rules(excel_path):
-    """Read door direction rules from Excel file using late binding."""
-    # Create Excel application using late binding
-    excel_type = System.Type.GetTypeFromProgID("Excel.Application")
-    excel = System.Activator.CreateInstance(excel_type)
-    
+def read_door_direction_rules(excel_path, session=None):
+    """Read door direction rules from the first sheet of the workbook.
+
+    Columns A:C below the header are ``flip_contains``,
+    ``flip_search_contains`` and ``block_flip_equals``.  The first two list
+    phrases that make a door expected to be flipped (FacingFlipped True),
+    the third exact names that make it expected not to be; doors no phrase
+    applies to are not checked.  See door_direction for the matching order.
+
+    .xlsx/.xlsm files are parsed directly; Excel is only started through COM
+    for other formats or workbooks the built-in reader cannot handle.  Pass
+    an ``ExcelSession`` to share one Excel instance between several reads.
+    """
+    if xlsx_reader.is_xlsx(excel_path):
+        try:
+            return _read_door_direction_rules_xlsx(excel_path)
+        except xlsx_reader.XlsxError:
+            if excel_com.System is None:
+                raise
+    if session is None:
+        with ExcelSession() as own_session:
+            return own_session.read_workbook(excel_path, _read_rules_sheet)
+    return session.read_workbook(excel_path, _read_rules_sheet)
+
+def _rules_from_rows(rows):
+    """Collect rule phrases from (c1, c2, c3) rows until an all-empty row."""
+    rules = {
+        "flip_contains": [], 
+        "flip_search_contains": [], 
+        "block_flip_equals": []
+    }
+    for c1, c2, c3 in rows:
+        if not c1 and not c2 and not c3:
+            break
+        if c1:
+            rules["flip_contains"].append(str(c1).strip().upper())
+        if c2:
+            rules["flip_search_contains"].append(str(c2).strip().upper())
+        if c3:
+            rules["block_flip_equals"].append(str(c3).strip().upper())
+    return rules
+
+def _read_door_direction_rules_xlsx(excel_path):
+    """Read door direction rules by parsing the .xlsx package."""
+    rows = xlsx_reader.iter_sheet_rows(excel_path, xlsx_reader.FIRST_SHEET, col_count=3)
     try:
-        # Use reflection to set properties and call methods
-        excel_type.InvokeMember("Visible", 
-            System.Reflection.BindingFlags.SetProperty, 
-            None, excel, System.Array[object]([False]))
-        
-        excel_type.InvokeMember("DisplayAlerts", 
-            System.Reflection.BindingFlags.SetProperty, 
-            None, excel, System.Array[object]([False]))
-        
-        # Get Workbooks collection
-        workbooks = excel_type.InvokeMember("Workbooks", 
-            System.Reflection.BindingFlags.GetProperty, 
-            None, excel, None)
-        
-        # Open workbook
-        workbook = workbooks.GetType().InvokeMember("Open", 
-            System.Reflection.BindingFlags.InvokeMethod, 
-            None, workbooks, System.Array[object]([excel_path]))
-        
-        # Get Sheets collection
-        sheets = workbook.GetType().InvokeMember("Sheets", 
-            System.Reflection.BindingFlags.GetProperty, 
-            None, workbook, None)
-        
-        # Get first sheet
-        sheet = sheets.GetType().InvokeMember("Item", 
-            System.Reflection.BindingFlags.GetProperty, 
-            None, sheets, System.Array[object]([1]))
-        
-        # Get Cells collection
-        cells = sheet.GetType().InvokeMember("Cells", 
-            System.Reflection.BindingFlags.GetProperty, 
-            None, sheet, None)
-        
-        rules = {
-            "flip_contains": [], 
-            "flip_search_contains": [], 
-            "block_flip_equals": []
-        }
-        
-        row = 2  # assuming headers in row 1
-        while True:
-            # Read cell values
-            cell1 = cells.GetType().InvokeMember("Item", 
-                System.Reflection.BindingFlags.GetProperty, 
-                None, cells, System.Array[object]([row, 1]))
-            c1 = cell1.GetType().InvokeMember("Value2", 
-                System.Reflection.BindingFlags.GetProperty, 
-                None, cell1, None)
-            
-            cell2 = cells.GetType().InvokeMember("Item", 
-                System.Reflection.BindingFlags.GetProperty, 
-                None, cells, System.Array[object]([row, 2]))
-            c2 = cell2.GetType().InvokeMember("Value2", 
-                System.Reflection.BindingFlags.GetProperty, 
-                None, cell2, None)
-            
-            cell3 = cells.GetType().InvokeMember("Item", 
-                System.Reflection.BindingFlags.GetProperty, 
-                None, cells, System.Array[object]([row, 3]))
-            c3 = cell3.GetType().InvokeMember("Value2", 
-                System.Reflection.BindingFlags.GetProperty, 
-                None, cell3, None)
-            
-            if not c1 and not c2 and not c3:
-                break
-                
-            if c1:
-                rules["flip_contains"].append(str(c1).strip().upper())
-            if c2:
-                rules["flip_search_contains"].append(str(c2).strip().upper())
-            if c3:
-                rules["block_flip_equals"].append(str(c3).strip().upper())
-            
-            row += 1
-        
-        # Close workbook without saving
-        workbook.GetType().InvokeMember("Close", 
-            System.Reflection.BindingFlags.InvokeMethod, 
-            None, workbook, System.Array[object]([False]))
-        
-        return rules
-        
+        next(rows)  # assuming headers in row 1
+        return _rules_from_rows(rows)
     finally:
-        # Quit Excel
-        try:
-            excel_type.InvokeMember("Quit", 
-                System.Reflection.BindingFlags.InvokeMethod, 
-                None, excel, None)
-        except:
-            pass
-        
-        # Release COM object
-        try:
-            System.Runtime.InteropServices.Marshal.ReleaseComObject(excel)
-        except:
-            pass
\ No newline at end of file
+        rows.close()
+
+def _read_rules_sheet(session, workbook):
+    """Read door direction rules from an open workbook through COM.
+
+    Columns A:C below the header are fetched as one Value2 block.
+    """
+    sheets = session.get(workbook, "Sheets")
+    sheet = session.get(sheets, "Item", 1)
+    last_row, _ = session.used_extent(sheet)
+    rows = []
+    if last_row >= 2:  # assuming headers in row 1
+        rows = session.read_block(sheet, 2, 1, last_row, 3)
+    return _rules_from_rows(rows)
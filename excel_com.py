@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""Late-binding Excel COM helpers shared by the config readers."""
+try:
+    import clr
+    import System
+except ImportError:
+    # Outside Revit (CPython) there is no COM; the readers use xlsx_reader.
+    clr = None
+    System = None
+
+
+def _args(values):
+    if not values:
+        return None
+    return System.Array[object](list(values))
+
+
+def get_property(obj, name, *args):
+    """Read a COM property through reflection (one cross-process call)."""
+    return obj.GetType().InvokeMember(name,
+        System.Reflection.BindingFlags.GetProperty,
+        None, obj, _args(args))
+
+
+def set_property(obj, name, value):
+    """Set a COM property through reflection."""
+    obj.GetType().InvokeMember(name,
+        System.Reflection.BindingFlags.SetProperty,
+        None, obj, _args([value]))
+
+
+def call_method(obj, name, *args):
+    """Invoke a COM method through reflection."""
+    return obj.GetType().InvokeMember(name,
+        System.Reflection.BindingFlags.InvokeMethod,
+        None, obj, _args(args))
+
+
+def is_com_object(obj):
+    try:
+        return obj is not None and System.Runtime.InteropServices.Marshal.IsComObject(obj)
+    except:
+        return False
+
+
+def release(obj):
+    """Drop every runtime-callable-wrapper reference to a COM object."""
+    try:
+        if is_com_object(obj):
+            System.Runtime.InteropServices.Marshal.FinalReleaseComObject(obj)
+    except:
+        pass
+
+
+def array_to_rows(values):
+    """Turn a Value2 result (2-D object[,] or a single value) into row lists."""
+    if not isinstance(values, System.Array):
+        return [[values]]
+    r0, r1 = values.GetLowerBound(0), values.GetUpperBound(0)
+    c0, c1 = values.GetLowerBound(1), values.GetUpperBound(1)
+    return [[values[r, c] for c in range(c0, c1 + 1)]
+            for r in range(r0, r1 + 1)]
+
+
+class ExcelSession(object):
+    """One hidden Excel instance shared by any number of workbook reads.
+
+    Excel is started on first use, so a session around readers that end up
+    parsing .xlsx files directly never launches it.  Every COM object
+    obtained through the session is tracked and released when its workbook
+    is closed, and the Application itself is released on ``close()``::
+
+        with ExcelSession() as session:
+            function_map = read_function_map(path_a, session=session)
+            level_map = read_level_map(path_b, session=session)
+    """
+
+    def __init__(self):
+        self._excel = None
+        self._tracked = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return False
+
+    @property
+    def excel(self):
+        if self._excel is None:
+            if System is None:
+                raise RuntimeError("Excel COM automation is not available outside .NET")
+            excel_type = System.Type.GetTypeFromProgID("Excel.Application")
+            self._excel = System.Activator.CreateInstance(excel_type)
+            set_property(self._excel, "Visible", False)
+            set_property(self._excel, "DisplayAlerts", False)
+        return self._excel
+
+    def _track(self, obj):
+        if is_com_object(obj):
+            self._tracked.append(obj)
+        return obj
+
+    def get(self, obj, name, *args):
+        """get_property() whose COM result is released with the session."""
+        return self._track(get_property(obj, name, *args))
+
+    def call(self, obj, name, *args):
+        """call_method() whose COM result is released with the session."""
+        return self._track(call_method(obj, name, *args))
+
+    def _release_to(self, mark):
+        while len(self._tracked) > mark:
+            release(self._tracked.pop())
+
+    def read_workbook(self, file_path, reader):
+        """Open a workbook, return ``reader(session, workbook)``, then close it.
+
+        Objects fetched while reading are released as soon as the workbook
+        is closed, so a long session does not accumulate references.
+        """
+        mark = len(self._tracked)
+        try:
+            workbooks = self.get(self.excel, "Workbooks")
+            workbook = self.call(workbooks, "Open", file_path)
+            try:
+                return reader(self, workbook)
+            finally:
+                call_method(workbook, "Close", False)
+        finally:
+            self._release_to(mark)
+
+    def used_extent(self, sheet):
+        """Return (last used row, used column count) of the sheet's UsedRange."""
+        used_range = self.get(sheet, "UsedRange")
+        rows = self.get(used_range, "Rows")
+        columns = self.get(used_range, "Columns")
+        first_row = get_property(used_range, "Row")
+        row_count = get_property(rows, "Count")
+        col_count = get_property(columns, "Count")
+        return first_row + row_count - 1, col_count
+
+    def read_block(self, sheet, first_row, first_col, last_row, last_col):
+        """Read a rectangular block of cells with a single Value2 call."""
+        cells = self.get(sheet, "Cells")
+        top_left = self.get(cells, "Item", first_row, first_col)
+        bottom_right = self.get(cells, "Item", last_row, last_col)
+        block = self.get(sheet, "Range", top_left, bottom_right)
+        return array_to_rows(get_property(block, "Value2"))
+
+    def close(self):
+        """Release every tracked object, quit Excel and release it."""
+        self._release_to(0)
+        if self._excel is None:
+            return
+        try:
+            call_method(self._excel, "Quit")
+        except:
+            pass
+        release(self._excel)
+        self._excel = None
+        # Let the RCW finalizers run so EXCEL.EXE can actually exit.
+        try:
+            System.GC.Collect()
+            System.GC.WaitForPendingFinalizers()
+        except:
+            pass
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Compiled GIFA NAME -> (function id, FOH/BOH category) lookup.
+
+Built once from ``read_function_map`` so each room needs one dict lookup
+instead of repeated normalisation and list membership tests.
+"""
+import hashlib
+
+FOH_IDS = (1, 5, 6, 8, 9)
+BOH_IDS = (2, 3, 7, 8, 9)
+
+CATEGORY_FOH = "FOH"
+CATEGORY_BOH = "BOH"
+CATEGORY_BOTH = "FOH & BOH"
+CATEGORY_UNASSIGNED = "UNASSIGNED"
+
+
+def normalize_function_id(fid):
+    """Integer function id from a config/parameter value, or None."""
+    try:
+        if fid is None:
+            return None
+        if isinstance(fid, int):
+            return fid
+        s = str(fid).strip()
+        if not s:
+            return None
+        if s.isdigit():
+            return int(s)
+        if s[0].isdigit():
+            return int(s[0])
+    except:
+        pass
+    return None
+
+
+def extract_function_id_from_number(room_number):
+    """Function id from the first digit of the last part of 'L-SSSS-FNN'."""
+    try:
+        parts = (room_number or '').split('-')
+        if len(parts) == 3:
+            tail = parts[2]
+            if tail and tail[0].isdigit():
+                return int(tail[0])
+    except:
+        pass
+    return None
+
+
+def mode_accepts(mode, category):
+    """True when a room of ``category`` is validated in ``mode`` (ALL/FOH/BOH)."""
+    if mode == CATEGORY_FOH:
+        return CATEGORY_FOH in category
+    if mode == CATEGORY_BOH:
+        return CATEGORY_BOH in category
+    return True
+
+
+class FunctionCatalogue(object):
+    """Pre-normalised function ids and area categories for every GIFA NAME.
+
+    ``categories`` optionally overrides the hard-coded FOH/BOH id lists with
+    the membership read from the workbook (see ``read_function_categories``).
+    """
+
+    def __init__(self, function_map, categories=None):
+        foh_ids = set(FOH_IDS)
+        boh_ids = set(BOH_IDS)
+        if categories:
+            foh_ids = set(categories.get(CATEGORY_FOH) or ())
+            boh_ids = set(categories.get(CATEGORY_BOH) or ())
+
+        self._category_by_id = {}
+        for fid in foh_ids | boh_ids:
+            if fid in foh_ids and fid in boh_ids:
+                self._category_by_id[fid] = CATEGORY_BOTH
+            elif fid in foh_ids:
+                self._category_by_id[fid] = CATEGORY_FOH
+            else:
+                self._category_by_id[fid] = CATEGORY_BOH
+
+        self._by_name = {}
+        for name, fid in function_map.items():
+            key = (name or "").strip().upper()
+            self._by_name[key] = normalize_function_id(fid)
+
+    def __len__(self):
+        return len(self._by_name)
+
+    def fingerprint(self):
+        """Digest of the names, ids and categories in the catalogue."""
+        return hashlib.sha1(repr((sorted(self._by_name.items()),
+                                  sorted(self._category_by_id.items())))
+                            .encode("utf-8")).hexdigest()
+
+    def category(self, fid):
+        if fid is None:
+            return CATEGORY_UNASSIGNED
+        return self._category_by_id.get(fid, CATEGORY_UNASSIGNED)
+
+    def names_rejected(self, mode):
+        """Mapped GIFA NAMEs whose rooms are never validated in ``mode``.
+
+        Unmapped names are not listed: those rooms take their id from the
+        room number, so only the room itself can tell whether it is in.
+        """
+        return sorted(name for name, fid in self._by_name.items()
+                      if name and fid is not None
+                      and not mode_accepts(mode, self.category(fid)))
+
+    def lookup(self, gifa_name, room_number=None):
+        """Return (function id, category) for a room.
+
+        ``gifa_name`` is the room's GIFA NAME; when it is not mapped, the id
+        is taken from the room number as before.
+        """
+        fid = self._by_name.get((gifa_name or "").strip().upper())
+        if fid is None:
+            fid = extract_function_id_from_number(room_number)
+        return fid, self.category(fid)
@@ -1,110 +1,50 @@
 # -*- coding: utf-8 -*-
-import clr
 import os
-import System
+import excel_com
+import xlsx_reader
+from excel_com import ExcelSession
+from function_catalogue import normalize_function_id
 
-def read_excel_sheet(file_path):
-    """Read Excel data as a list of rows using late binding COM Excel."""
-    # Create Excel application using late binding
-    excel_type = System.Type.GetTypeFromProgID("Excel.Application")
-    xl = System.Activator.CreateInstance(excel_type)
-    
-    try:
-        # Use reflection to set properties
-        excel_type.InvokeMember("Visible", 
-            System.Reflection.BindingFlags.SetProperty, 
-            None, xl, System.Array[object]([False]))
-        
-        excel_type.InvokeMember("DisplayAlerts", 
-            System.Reflection.BindingFlags.SetProperty, 
-            None, xl, System.Array[object]([False]))
-        
-        # Get Workbooks collection
-        workbooks = excel_type.InvokeMember("Workbooks", 
-            System.Reflection.BindingFlags.GetProperty, 
-            None, xl, None)
-        
-        # Open workbook
-        wb = workbooks.GetType().InvokeMember("Open", 
-            System.Reflection.BindingFlags.InvokeMethod, 
-            None, workbooks, System.Array[object]([file_path]))
-        
-        # Get ActiveSheet
-        ws = wb.GetType().InvokeMember("ActiveSheet", 
-            System.Reflection.BindingFlags.GetProperty, 
-            None, wb, None)
-        
-        # Get UsedRange
-        used_range = ws.GetType().InvokeMember("UsedRange", 
-            System.Reflection.BindingFlags.GetProperty, 
-            None, ws, None)
-        
-        # Get Columns collection from UsedRange
-        columns = used_range.GetType().InvokeMember("Columns", 
-            System.Reflection.BindingFlags.GetProperty, 
-            None, used_range, None)
-        
-        # Get column count
-        col_count = columns.GetType().InvokeMember("Count", 
-            System.Reflection.BindingFlags.GetProperty, 
-            None, columns, None)
-        
-        # Get Cells collection
-        cells = ws.GetType().InvokeMember("Cells", 
-            System.Reflection.BindingFlags.GetProperty, 
-            None, ws, None)
-        
-        data = []
-        row = 1
-        
-        while True:
-            row_values = []
-            empty_row = True
-            
-            for col in range(1, col_count + 1):
-                cell = cells.GetType().InvokeMember("Item", 
-                    System.Reflection.BindingFlags.GetProperty, 
-                    None, cells, System.Array[object]([row, col]))
-                val = cell.GetType().InvokeMember("Value2", 
-                    System.Reflection.BindingFlags.GetProperty, 
-                    None, cell, None)
-                
-                if val is not None:
-                    empty_row = False
-                row_values.append(val)
-            
-            if empty_row:
-                break
-            data.append(row_values)
-            row += 1
-        
-        # Close workbook
-        wb.GetType().InvokeMember("Close", 
-            System.Reflection.BindingFlags.InvokeMethod, 
-            None, wb, System.Array[object]([False]))
-        
-        return data
-        
-    finally:
-        # Quit Excel
-        try:
-            excel_type.InvokeMember("Quit", 
-                System.Reflection.BindingFlags.InvokeMethod, 
-                None, xl, None)
-        except:
-            pass
-        
-        # Release COM object
+def read_excel_sheet(file_path, session=None):
+    """Read Excel data as a list of rows (ActiveSheet, row 1 to first empty row).
+
+    .xlsx/.xlsm files are parsed directly; Excel is only started through COM
+    for other formats or workbooks the built-in reader cannot handle.  Pass
+    an ``ExcelSession`` to share one Excel instance between several reads.
+    """
+    if xlsx_reader.is_xlsx(file_path):
         try:
-            System.Runtime.InteropServices.Marshal.ReleaseComObject(xl)
-        except:
-            pass
+            return xlsx_reader.read_sheet(file_path, xlsx_reader.ACTIVE_SHEET)
+        except xlsx_reader.XlsxError:
+            if excel_com.System is None:
+                raise
+    if session is None:
+        with ExcelSession() as own_session:
+            return own_session.read_workbook(file_path, _read_active_sheet)
+    return session.read_workbook(file_path, _read_active_sheet)
+
+def _read_active_sheet(session, wb):
+    """Read the ActiveSheet of an open workbook through COM.
 
-def read_function_map(xlsx_path):
+    The block from A1 to the bottom-right of the UsedRange is fetched with a
+    single Value2 call instead of one round trip per cell.
+    """
+    ws = session.get(wb, "ActiveSheet")
+    last_row, col_count = session.used_extent(ws)
+    block = session.read_block(ws, 1, 1, max(last_row, 1), col_count)
+    
+    data = []
+    for row_values in block:
+        if all(val is None for val in row_values):
+            break
+        data.append(row_values)
+    return data
+
+def read_function_map(xlsx_path, session=None):
     """Read GIFA NAME -> FUNCTION ID mapping."""
     if not os.path.exists(xlsx_path):
         return {}
-    data = read_excel_sheet(xlsx_path)
+    data = read_excel_sheet(xlsx_path, session)
     if not data:
         return {}
     headers = [str(h).strip().upper() if h else "" for h in data[0]]
@@ -124,11 +64,46 @@ def read_function_map(xlsx_path):
             function_map[str(name).strip().upper()] = str(fid).strip()
     return function_map
 
-def read_level_map(xlsx_path):
+def read_function_categories(xlsx_path, session=None):
+    """Read FUNCTION ID -> FOH/BOH membership from an optional AREA CATEGORY column.
+
+    Returns {"FOH": [ids], "BOH": [ids]}, or {} when the column is absent so
+    the built-in FOH/BOH id lists apply.
+    """
+    if not os.path.exists(xlsx_path):
+        return {}
+    data = read_excel_sheet(xlsx_path, session)
+    if not data:
+        return {}
+    headers = [str(h).strip().upper() if h else "" for h in data[0]]
+    try:
+        idx_funcid = headers.index("FUNCTION ID")
+        idx_cat = headers.index("AREA CATEGORY")
+    except ValueError:
+        return {}
+    foh_ids = set()
+    boh_ids = set()
+    for row in data[1:]:
+        try:
+            fid = normalize_function_id(row[idx_funcid])
+            category = str(row[idx_cat] or "").strip().upper()
+        except IndexError:
+            continue
+        if fid is None or not category:
+            continue
+        if "FOH" in category:
+            foh_ids.add(fid)
+        if "BOH" in category:
+            boh_ids.add(fid)
+    if not foh_ids and not boh_ids:
+        return {}
+    return {"FOH": sorted(foh_ids), "BOH": sorted(boh_ids)}
+
+def read_level_map(xlsx_path, session=None):
     """Read Elevation -> Level Code mapping."""
     if not os.path.exists(xlsx_path):
         return {}
-    data = read_excel_sheet(xlsx_path)
+    data = read_excel_sheet(xlsx_path, session)
     if not data:
         return {}
     headers = [str(h).strip().upper() if h else "" for h in data[0]]
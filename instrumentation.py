@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""Stage timers, counters and an optional whole-run profile.
+
+Timers and counters go to the module-level ``STATS``, which is off by
+default; while it is off ``timed`` and ``count`` cost one attribute test::
+
+    with timed("rooms.loop"):
+        ...
+    count("rooms.processed", len(rooms))
+
+``RunProfiler`` writes a cProfile capture of everything between ``start``
+and ``stop``, or a sampled stack profile where cProfile is unavailable.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+PROFILE_DIR = os.path.join(tempfile.gettempdir(), "validators-for-revit-cache", "profiles")
+
+
+class _NullTimer(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer(object):
+    __slots__ = ("stats", "name", "start")
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.add_time(self.name, time.time() - self.start)
+        return False
+
+
+class Stats(object):
+    """Accumulated seconds and call counts per timer name, plus counters."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self._times = {}
+        self._counts = {}
+        self._order = []
+
+    def timer(self, name):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def add_time(self, name, seconds):
+        entry = self._times.get(name)
+        if entry is None:
+            entry = self._times[name] = [0.0, 0]
+            self._order.append(name)
+        entry[0] += seconds
+        entry[1] += 1
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self._counts[name] = self._counts.get(name, 0) + n
+
+    def timing_rows(self):
+        """[(name, seconds, calls)] in the order timers were first used."""
+        return [(name, self._times[name][0], self._times[name][1]) for name in self._order]
+
+    def counter_rows(self):
+        """[(name, value)] sorted by name."""
+        return sorted(self._counts.items())
+
+
+STATS = Stats()
+
+
+def timed(name):
+    """Context manager adding its duration to timer ``name`` in STATS."""
+    return STATS.timer(name)
+
+
+def count(name, n=1):
+    """Add ``n`` to counter ``name`` in STATS."""
+    STATS.count(name, n)
+
+
+def add_time(name, seconds):
+    """Add ``seconds`` measured elsewhere (e.g. on a worker thread) to timer ``name``."""
+    if STATS.enabled:
+        STATS.add_time(name, seconds)
+
+
+class _Sampler(object):
+    """Samples one thread's stack every ``interval`` seconds."""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = {}
+        self.total = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("{}:{}({})".format(os.path.basename(code.co_filename),
+                                                frame.f_lineno, code.co_name))
+                frame = frame.f_back
+            if stack:
+                key = tuple(reversed(stack))
+                self.samples[key] = self.samples.get(key, 0) + 1
+                self.total += 1
+            time.sleep(self.interval)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        """Folded stacks ("a;b;c count"), heaviest first."""
+        with open(path, "w") as fh:
+            for stack, n in sorted(self.samples.items(), key=lambda item: -item[1]):
+                fh.write("{} {}\n".format(";".join(stack), n))
+
+
+class RunProfiler(object):
+    """cProfile (``.prof``) or sampled stacks (``.folded``) for one run."""
+
+    def __init__(self, folder=None):
+        self.folder = folder or PROFILE_DIR
+        self.path = None
+        self._profile = None
+        self._sampler = None
+
+    def start(self):
+        try:
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        except Exception:
+            self._profile = None
+            if not hasattr(sys, "_current_frames"):
+                return False
+            self._sampler = _Sampler(threading.current_thread().ident)
+            self._sampler.start()
+        return True
+
+    def stop(self):
+        """Stop and write the capture; returns its path, or None."""
+        if self._profile is None and self._sampler is None:
+            return None
+        if not os.path.isdir(self.folder):
+            os.makedirs(self.folder)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        if self._profile is not None:
+            self._profile.disable()
+            self.path = os.path.join(self.folder, "run-{}.prof".format(stamp))
+            self._profile.dump_stats(self.path)
+            self._profile = None
+        else:
+            self._sampler.stop()
+            self.path = os.path.join(self.folder, "run-{}.folded".format(stamp))
+            self._sampler.write(self.path)
+            self._sampler = None
+        return self.path
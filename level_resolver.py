@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Level name/elevation -> level code resolution, built once per run.
+
+Rules are tried in the same order as before: the level name equals a code
+or ends with " <code>", then the name contains a code, then the code of the
+nearest mapped elevation.  Results are memoized per key, the document and
+Level element id (ids repeat across linked documents), and carry the rule
+that produced them.
+"""
+import hashlib
+from bisect import bisect_left
+from collections import namedtuple
+
+RULE_EXACT = "exact"
+RULE_SUFFIX = "suffix"
+RULE_CONTAINS = "contains"
+RULE_ELEVATION = "elevation"
+RULE_NONE = "none"
+
+UNKNOWN_CODE = "???"
+FEET_TO_MM = 304.8
+
+LevelMatch = namedtuple("LevelMatch", "code rule detail")
+
+
+class LevelResolver(object):
+    """Resolve levels against a ``read_level_map`` result."""
+
+    def __init__(self, level_map):
+        codes = []
+        for code in level_map.values():
+            code = str(code).upper()
+            if code not in codes:
+                codes.append(code)
+        self._codes = set(codes)
+        # Longest code first so "L01M" wins over "L01" on substring matches.
+        self._contains_order = sorted(codes, key=lambda c: (-len(c), c))
+        self._elevations = sorted(level_map.keys())
+        self._elevation_codes = [str(level_map[e]) for e in self._elevations]
+        self._memo = {}
+        self._names = {}
+        self._fingerprint = hashlib.sha1(
+            repr(sorted(level_map.items())).encode("utf-8")).hexdigest()
+
+    def fingerprint(self):
+        """Digest of the level map this resolver was built from."""
+        return self._fingerprint
+
+    def _match_name(self, name):
+        if name in self._codes:
+            return LevelMatch(name, RULE_EXACT, name)
+        # " <code>" suffixes, longest tail first.
+        pos = name.find(" ")
+        while pos != -1:
+            tail = name[pos + 1:]
+            if tail in self._codes:
+                return LevelMatch(tail, RULE_SUFFIX, tail)
+            pos = name.find(" ", pos + 1)
+        for code in self._contains_order:
+            if code in name:
+                return LevelMatch(code, RULE_CONTAINS, code)
+        return None
+
+    def _match_elevation(self, elevation_mm):
+        elevations = self._elevations
+        if not elevations:
+            return None
+        i = bisect_left(elevations, elevation_mm)
+        if i == len(elevations):
+            i -= 1
+        elif i > 0 and (elevation_mm - elevations[i - 1]) <= (elevations[i] - elevation_mm):
+            i -= 1
+        return LevelMatch(self._elevation_codes[i], RULE_ELEVATION,
+                          "{:.0f} mm".format(elevations[i]))
+
+    def resolve(self, key, name, elevation_ft):
+        """Return the LevelMatch for a level, memoized under ``key``."""
+        match = self._memo.get(key)
+        if match is not None:
+            return match
+        level_name = (name or "").strip().upper()
+        match = self._match_name(level_name)
+        if match is None and elevation_ft is not None:
+            match = self._match_elevation(elevation_ft * FEET_TO_MM)
+        if match is None:
+            detail = "no match" if self._elevations else "no level map entries"
+            match = LevelMatch(UNKNOWN_CODE, RULE_NONE, detail)
+        self._memo[key] = match
+        self._names[key] = name
+        return match
+
+    def explain(self):
+        """[(level name, LevelMatch)] for every level resolved so far."""
+        return sorted(((self._names[k], m) for k, m in self._memo.items()),
+                      key=lambda item: item[0] or "")
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Linked models: per-link extraction cache and placement in host coordinates.
+
+A link is extracted in its own coordinates and cached as a snapshot keyed
+by the link document's version, so an unchanged link is read from disk on
+the next run.  ``place_model`` then maps the cached data into the host:
+room and door points go through the link instance's transform, level
+elevations are shifted by its Z offset, and the host's scope boxes replace
+the link's so sectors resolve exactly as for host elements.
+"""
+import os
+
+from instrumentation import count, timed
+from model_snapshot import ModelData, SnapshotError, Table, load_snapshot, write_snapshot
+from state_store import DEFAULT_STATE_DIR, stable_hash
+
+LINK_CACHE_DIR = os.path.join(os.path.dirname(DEFAULT_STATE_DIR), "links")
+
+# Columns holding plan (x, y) point pairs, per table.
+POINT_COLUMNS = {"rooms": (("x", "y"), ("sx", "sy")), "doors": (("x", "y"),)}
+
+
+def link_cache_path(link_key, cache_dir=None):
+    """Snapshot file caching one linked document's extraction."""
+    return os.path.join(cache_dir or LINK_CACHE_DIR, "{}.rvsnap".format(stable_hash(link_key)))
+
+
+def cached_link_model(link_key, version, extract, cache_dir=None):
+    """(ModelData in link coordinates, True when it came from the cache).
+
+    A cached model is memory-mapped; close it once it has been placed.
+
+    ``version`` identifies the link's saved state plus anything else the
+    extraction depends on; ``extract()`` runs when the cache holds another
+    version (or ``version`` is None, meaning the link cannot be versioned).
+    """
+    path = link_cache_path(link_key, cache_dir)
+    if version is not None and os.path.isfile(path):
+        try:
+            model = load_snapshot(path)
+            if model.meta.get("link_version") == version:
+                count("links.cached")
+                return model, True
+            model.close()  # Windows cannot replace a file that is still mapped
+        except (IOError, OSError, SnapshotError, ValueError):
+            pass
+
+    count("links.extracted")
+    model = extract()
+    model.meta["link_version"] = version
+    if version is not None:
+        folder = os.path.dirname(path)
+        tmp_path = path + ".tmp"
+        try:
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            write_snapshot(tmp_path, model)
+            if os.path.exists(path):
+                os.remove(path)
+            os.rename(tmp_path, path)
+        except (IOError, OSError):
+            pass
+    return model, False
+
+
+def place_model(model, transform, host_scope_boxes, source):
+    """Copy of a link ``model`` in host coordinates, tagged with ``source``.
+
+    ``transform`` is ``(ox, oy, oz, bxx, bxy, byx, byy)``: the link
+    instance's origin and the plan components of its X and Y basis vectors.
+    Links are assumed to stay level (Z basis up), as Revit links do.  The
+    copy holds plain lists, so ``model`` may be closed afterwards.
+    """
+    ox, oy, oz, bxx, bxy, byx, byy = transform
+    tables = {}
+    with timed("links.place"):
+        for name, table in model.tables.items():
+            if name == "scope_boxes":
+                tables[name] = host_scope_boxes
+                continue
+            columns = dict((col, list(table[col])) for col, _ in table.schema)
+            for x_col, y_col in POINT_COLUMNS.get(name, ()):
+                xs = table[x_col]
+                ys = table[y_col]
+                columns[x_col] = [ox + bxx * xs[i] + byx * ys[i] for i in range(len(table))]
+                columns[y_col] = [oy + bxy * xs[i] + byy * ys[i] for i in range(len(table))]
+            if name == "levels":
+                columns["elevation"] = [e + oz for e in table["elevation"]]
+            tables[name] = Table(name, columns, len(table))
+    meta = dict(model.meta, source=source)
+    return ModelData(meta=meta, tables=tables)
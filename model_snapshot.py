@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""Columnar model data and the on-disk snapshot format.
+
+``ModelData`` holds everything the validators read from a Revit model as
+plain columns (one table each for rooms, doors, levels, phases and scope
+boxes, plus the Number/Mark of every room and door in the document for the
+duplicate check), so validation can run against a live document or a snapshot file
+and produce identical results.
+
+Snapshot layout (little-endian, every block 8-byte aligned so numeric
+columns can be memory-mapped in place)::
+
+    b"RVSNAP01" | uint64 header length | JSON header | column blocks
+
+Numeric columns are raw int64 / float64 / uint8 arrays.  String columns
+are an int64 offsets array (n + 1), a uint8 null mask and a UTF-8 blob.
+"""
+import json
+import mmap
+import struct
+import sys
+
+MAGIC = b"RVSNAP01"
+SNAPSHOT_VERSION = 1
+NO_ID = -1
+NAN = float("nan")
+
+INT = "i8"
+FLOAT = "f8"
+BOOL = "u1"
+STR = "str"
+
+_STRUCT_CODES = {INT: "q", FLOAT: "d", BOOL: "B"}
+_ITEM_SIZES = {INT: 8, FLOAT: 8, BOOL: 1}
+
+# Column order is the on-disk order; every table lists its columns here.
+SCHEMAS = {
+    "rooms": [
+        ("id", INT), ("level_id", INT),
+        ("x", FLOAT), ("y", FLOAT),        # numbering point (Location or bbox centre)
+        ("sx", FLOAT), ("sy", FLOAT),      # sector reference point (bbox centre)
+        ("name", STR), ("number", STR), ("gifa", STR),
+        ("has_params", BOOL), ("in_scope", BOOL), ("error", STR),
+    ],
+    "doors": [
+        ("id", INT), ("x", FLOAT), ("y", FLOAT),
+        ("from_room", INT), ("to_room", INT),
+        ("mark", STR), ("type_comments", STR), ("comments", STR),
+        ("error", STR),
+        ("flipped", INT),                  # FacingFlipped: 1 / 0, NO_ID if unknown
+        ("family", STR), ("type_name", STR),
+    ],
+    "levels": [("id", INT), ("name", STR), ("elevation", FLOAT)],
+    # Every room / door of the document, whatever the view or mode collected.
+    "room_numbers": [("id", INT), ("number", STR)],
+    "door_marks": [("id", INT), ("mark", STR), ("type_comments", STR), ("comments", STR)],
+    "phases": [("id", INT), ("name", STR)],
+    "scope_boxes": [
+        ("code", STR), ("min_x", FLOAT), ("min_y", FLOAT),
+        ("max_x", FLOAT), ("max_y", FLOAT),
+        ("ox", FLOAT), ("oy", FLOAT), ("ux", FLOAT), ("uy", FLOAT),
+        ("vx", FLOAT), ("vy", FLOAT), ("lu", FLOAT), ("lv", FLOAT),
+    ],
+}
+
+_DEFAULTS = {INT: NO_ID, FLOAT: NAN, BOOL: 0, STR: None}
+
+
+class SnapshotError(Exception):
+    """The file is not a snapshot this version can read."""
+    pass
+
+
+class Table(object):
+    """A set of equally long named columns."""
+
+    def __init__(self, name, columns=None, length=0):
+        self.name = name
+        self.schema = SCHEMAS[name]
+        self.columns = columns or dict((col, []) for col, _ in self.schema)
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def append(self, **values):
+        """Add a row; missing columns get their type's empty value."""
+        for col, kind in self.schema:
+            self.columns[col].append(values.get(col, _DEFAULTS[kind]))
+        self.length += 1
+        return self.length - 1
+
+    def row(self, index):
+        return dict((col, self.columns[col][index]) for col, _ in self.schema)
+
+
+class ModelData(object):
+    """Everything validation needs from one model, as columnar tables."""
+
+    def __init__(self, meta=None, tables=None):
+        self.meta = meta or {}
+        self.tables = tables or dict((name, Table(name)) for name in SCHEMAS)
+        self._mapping = None
+        self._views = []
+
+    def close(self):
+        """Release the file mapping of a loaded snapshot (no-op otherwise).
+
+        Columns read from the mapping are unusable afterwards; on Windows the
+        file cannot be replaced or removed until this is called.
+        """
+        for view in self._views:
+            view.release()
+        self._views = []
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    @property
+    def rooms(self):
+        return self.tables["rooms"]
+
+    @property
+    def doors(self):
+        return self.tables["doors"]
+
+    @property
+    def levels(self):
+        return self.tables["levels"]
+
+    @property
+    def phases(self):
+        return self.tables["phases"]
+
+    @property
+    def scope_boxes(self):
+        return self.tables["scope_boxes"]
+
+    @property
+    def room_numbers(self):
+        return self.tables["room_numbers"]
+
+    @property
+    def door_marks(self):
+        return self.tables["door_marks"]
+
+
+def _text(value):
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return value
+
+
+class StringColumn(object):
+    """Read-only string column decoded lazily from a mapped blob."""
+
+    def __init__(self, offsets, nulls, buf, blob_start):
+        self._offsets = offsets
+        self._nulls = nulls
+        self._buf = buf
+        self._start = blob_start
+
+    def __len__(self):
+        return len(self._nulls)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if self._nulls[index]:
+            return None
+        start = self._start + self._offsets[index]
+        end = self._start + self._offsets[index + 1]
+        return _text(self._buf[start:end])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def _pad(length):
+    return (8 - length % 8) % 8
+
+
+def _pack_numeric(kind, values):
+    if kind == BOOL:
+        return struct.pack("<%dB" % len(values), *[1 if v else 0 for v in values])
+    return struct.pack("<%d%s" % (len(values), _STRUCT_CODES[kind]), *values)
+
+
+def write_snapshot(path, model):
+    """Write ``model`` to ``path`` in the snapshot format."""
+    blocks = []
+    offset = [0]
+
+    def add_block(data):
+        start = offset[0]
+        blocks.append(data)
+        blocks.append(b"\0" * _pad(len(data)))
+        offset[0] += len(data) + _pad(len(data))
+        return start
+
+    header_tables = {}
+    for name, _schema in sorted(SCHEMAS.items()):
+        table = model.tables[name]
+        columns = {}
+        for col, kind in table.schema:
+            values = list(table[col])
+            if kind == STR:
+                encoded = [(v if v is not None else u"").encode("utf-8") for v in values]
+                offsets = [0]
+                for item in encoded:
+                    offsets.append(offsets[-1] + len(item))
+                columns[col] = {
+                    "type": kind,
+                    "offsets": add_block(_pack_numeric(INT, offsets)),
+                    "nulls": add_block(_pack_numeric(BOOL, [v is None for v in values])),
+                    "blob": add_block(b"".join(encoded)),
+                    "blob_length": offsets[-1],
+                }
+            else:
+                columns[col] = {"type": kind, "offset": add_block(_pack_numeric(kind, values))}
+        header_tables[name] = {"length": len(table), "columns": columns}
+
+    header = json.dumps({
+        "version": SNAPSHOT_VERSION,
+        "meta": model.meta,
+        "tables": header_tables,
+    }, sort_keys=True).encode("utf-8")
+    header += b" " * _pad(len(MAGIC) + 8 + len(header))
+    data_start = len(MAGIC) + 8 + len(header)
+
+    with open(path, "wb") as fh:
+        fh.write(MAGIC)
+        fh.write(struct.pack("<Q", len(header)))
+        fh.write(header)
+        for block in blocks:
+            fh.write(block)
+    return data_start + offset[0]
+
+
+def _numeric_view(buf, start, kind, count, views):
+    """Zero-copy typed view on CPython 3 (added to ``views``); a decoded list elsewhere."""
+    code = _STRUCT_CODES[kind]
+    if hasattr(memoryview, "cast") and sys.byteorder == "little":
+        size = _ITEM_SIZES[kind] * count
+        view = memoryview(buf)[start:start + size].cast(code)
+        views.append(view)
+        return view
+    return list(struct.unpack_from("<%d%s" % (count, code), buf, start))
+
+
+def load_snapshot(path):
+    """Memory-map a snapshot file and return it as ``ModelData``.
+
+    Numeric columns are views onto the mapping where the runtime supports
+    it; string columns decode entries on access.  Call ``close()`` on the
+    result (or use it in a ``with`` block) to release the mapping.
+    """
+    with open(path, "rb") as fh:
+        if fh.read(len(MAGIC)) != MAGIC:
+            raise SnapshotError("Not a model snapshot: {}".format(path))
+        header_length = struct.unpack("<Q", fh.read(8))[0]
+        header = json.loads(fh.read(header_length).decode("utf-8"))
+        if header.get("version") != SNAPSHOT_VERSION:
+            raise SnapshotError("Unsupported snapshot version {}".format(header.get("version")))
+        data_start = len(MAGIC) + 8 + header_length
+        buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    views = []
+    tables = {}
+    for name in SCHEMAS:
+        info = header["tables"].get(name)
+        if info is None:
+            tables[name] = Table(name)
+            continue
+        count = info["length"]
+        columns = {}
+        for col, kind in SCHEMAS[name]:
+            spec = info["columns"].get(col)
+            if spec is None:
+                # Column added after the snapshot was written.
+                columns[col] = [_DEFAULTS[kind]] * count
+            elif kind == STR:
+                offsets = _numeric_view(buf, data_start + spec["offsets"], INT, count + 1,
+                                        views)
+                nulls = _numeric_view(buf, data_start + spec["nulls"], BOOL, count, views)
+                columns[col] = StringColumn(offsets, nulls, buf, data_start + spec["blob"])
+            else:
+                columns[col] = _numeric_view(buf, data_start + spec["offset"], kind, count, views)
+        tables[name] = Table(name, columns, count)
+    model = ModelData(header.get("meta") or {}, tables)
+    model._mapping = buf
+    model._views = views
+    return model
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Room numbering order for one (sector, function id) group.
+
+Rooms are sorted by descending X and chained into bands: a room joins the
+current band when its X is within ``BAND_TOLERANCE`` of the previous
+room's X.  Bands are then ordered by descending Y and numbered
+``"{level}-{sector}-{fid}{idx:02d}"`` from 1.  Ties keep input order.
+
+Groups are given as row indices into whole-model columns, so callers do
+not copy coordinates per group.  NumPy is used when it is installed and
+the group is large enough for the array overhead to pay off; the
+pure-Python path gives identical results.
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BAND_TOLERANCE = 3000.0 / 304.8
+NUMPY_MIN_ROOMS = 64
+
+
+def _band_order_python(xs, ys, rows, tolerance):
+    by_x = sorted(rows, key=lambda i: -xs[i])
+    bands = []
+    current_band = []
+    last_x = None
+    for i in by_x:
+        if last_x is None or abs(xs[i] - last_x) <= tolerance:
+            current_band.append(i)
+        else:
+            bands.append(current_band)
+            current_band = [i]
+        last_x = xs[i]
+    if current_band:
+        bands.append(current_band)
+
+    order = []
+    for band in bands:
+        band.sort(key=lambda i: -ys[i])
+        order.extend(band)
+    return order
+
+
+def _band_order_numpy(xs, ys, rows, tolerance):
+    n = len(rows)
+    x = np.fromiter((xs[i] for i in rows), dtype=float, count=n)
+    y = np.fromiter((ys[i] for i in rows), dtype=float, count=n)
+    by_x = np.argsort(-x, kind="stable")
+    band = np.zeros(len(x), dtype=np.int64)
+    if len(x) > 1:
+        band[1:] = np.cumsum(np.abs(np.diff(x[by_x])) > tolerance)
+    # lexsort is stable: within a band, equal Y keeps the X-sorted order.
+    within = np.lexsort((-y[by_x], band))
+    return [rows[i] for i in by_x[within].tolist()]
+
+
+def band_order(xs, ys, tolerance=BAND_TOLERANCE, use_numpy=None, rows=None):
+    """Indices into ``xs``/``ys`` in numbering order.
+
+    ``rows`` restricts the group to those indices (in input order); by
+    default every index is in the group.  ``use_numpy`` forces a backend;
+    by default NumPy is used for groups of ``NUMPY_MIN_ROOMS`` or more when
+    it is available.
+    """
+    if rows is None:
+        rows = range(len(xs))
+    if use_numpy is None:
+        use_numpy = np is not None and len(rows) >= NUMPY_MIN_ROOMS
+    if use_numpy:
+        if np is None:
+            raise RuntimeError("NumPy is not installed")
+        return _band_order_numpy(xs, ys, rows, tolerance)
+    return _band_order_python(xs, ys, rows, tolerance)
+
+
+def number_group(xs, ys, level_codes, sector, fid,
+                 tolerance=BAND_TOLERANCE, use_numpy=None, rows=None):
+    """[(index, expected number)] for one group, in numbering order.
+
+    ``rows`` works as for band_order; ``level_codes`` is indexed like
+    ``xs`` and ``ys``.
+    """
+    order = band_order(xs, ys, tolerance, use_numpy, rows)
+    tail = "-{}-{}".format(sector, fid or 0)
+    return [(i, "{}{}{:02d}".format(level_codes[i], tail, idx))
+            for idx, i in enumerate(order, start=1)]
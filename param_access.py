@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Parameter handles resolved once per run, and per-type value memos.
+
+``LookupParameter`` searches an element's parameters by display name on
+every call.  A ``ParamHandle`` does that search once: built-in parameters
+are read by their BuiltInParameter, shared parameters by GUID and other
+project parameters by their Definition.  ``TypeValues`` reads type-level
+values once per ElementType instead of once per instance.
+
+Handles belong to one document; create them per extraction run.
+"""
+
+
+class ParamHandle(object):
+    """A parameter by display name, resolved to a direct handle on first use."""
+
+    def __init__(self, name, builtin=None):
+        self.name = name
+        self._handle = builtin
+        self.reads = 0
+
+    def lookup(self, element):
+        """The element's Parameter, or None."""
+        self.reads += 1
+        if self._handle is not None:
+            return element.get_Parameter(self._handle)
+        param = element.LookupParameter(self.name)
+        if param is not None:
+            # Later elements are read through the definition, not the name.
+            try:
+                self._handle = param.GUID if param.IsShared else param.Definition
+            except:
+                pass
+        return param
+
+    def string(self, element):
+        """(exists, value) where value is None unless the parameter has a value."""
+        param = self.lookup(element)
+        if not param:
+            return False, None
+        if not param.HasValue:
+            return True, None
+        return True, param.AsString() or ""
+
+
+class TypeValues(object):
+    """Values read from element types, memoized per type id."""
+
+    def __init__(self, reader):
+        self.reader = reader
+        self._values = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, element_type):
+        """``reader(element_type)``, read once per type (and each time for None)."""
+        if element_type is None:
+            return self.reader(None)
+        key = element_type.Id.IntegerValue
+        try:
+            value = self._values[key]
+            self.hits += 1
+            return value
+        except KeyError:
+            self.misses += 1
+            value = self.reader(element_type)
+            self._values[key] = value
+            return value
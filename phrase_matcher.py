@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Aho-Corasick matcher for "text contains any of these phrases" rules.
+
+The phrases are compiled once into a trie with failure links; a search is
+then a single pass over the text, however many phrases there are.
+"""
+from collections import deque
+
+
+class PhraseMatcher(object):
+    """Find which of a fixed set of phrases occur in a text.
+
+    Phrases are compared as given, so callers normalise case on both sides
+    (the rule readers already upper-case every phrase).
+    """
+
+    def __init__(self, phrases):
+        self.phrases = []
+        # State 0 is the root; each state has goto edges, a failure link and
+        # the indices of the phrases that end there (including via failure).
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        seen = set()
+        for phrase in phrases:
+            if not phrase or phrase in seen:
+                continue
+            seen.add(phrase)
+            self._add(phrase, len(self.phrases))
+            self.phrases.append(phrase)
+        self._link()
+
+    def _add(self, phrase, index):
+        state = 0
+        for ch in phrase:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] = self._out[state] + (index,)
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def _scan(self, text):
+        goto = self._goto
+        fail = self._fail
+        state = 0
+        for end, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if self._out[state]:
+                yield end, self._out[state]
+
+    def first(self, text):
+        """The phrase whose match ends earliest in ``text`` (longest on ties), or None."""
+        if not text or not self.phrases:
+            return None
+        for _, hits in self._scan(text):
+            return max((self.phrases[i] for i in hits), key=len)
+        return None
+
+    def findall(self, text):
+        """Every phrase occurring in ``text``, in rule order, without repeats."""
+        if not text or not self.phrases:
+            return []
+        found = set()
+        for _, hits in self._scan(text):
+            found.update(hits)
+        return [self.phrases[i] for i in sorted(found)]
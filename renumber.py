@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""Renumber plan: the room number and door mark corrections for a run.
+
+``build_plan`` turns a ValidationResult into the list of parameter changes
+that makes it clean: rooms get their expected number, then each door mark
+is rebuilt from its reference room's (new) number, keeping an existing
+``[A-Z]`` suffix and giving unmarked or wrong doors the next free letter.
+
+``RenumberPlan.steps`` orders the writes so no step gives an element a value
+another changing element still holds (a swap goes through a temporary
+value), and ``diff_rows`` is the dry-run view.  Writing to Revit is done by
+``revit_apply.apply_plan``.
+"""
+from collections import defaultdict, namedtuple
+from string import ascii_uppercase
+
+from validation_engine import (DOOR, MISMATCH, NO_MARK, OK, ROOM, DoorRoomIndex,
+                               DuplicateIndex, build_sector_index, mark_matches)
+
+ROOM_NUMBER = "room_number"
+DOOR_MARK = "door_mark"
+TEMP_PREFIX = "~renumber~"
+
+Change = namedtuple("Change", "target element_id old new sector")
+
+
+def order_assignments(changes, holders):
+    """[(element_id, value)] writes that apply ``changes`` without collisions.
+
+    ``changes`` are Change tuples of one target; ``holders`` maps each
+    current value to the ids holding it.  A change waits while its new value
+    is held by another element that is still to change, unless that value
+    is already shared and the holders are waiting for the changing
+    element's old value (moving in beside them adds no collision).  Cycles
+    (swaps) are broken by parking one element on a temporary value; each
+    element is parked at most once.
+    """
+    holders = defaultdict(set, ((v, set(ids)) for v, ids in holders.items()))
+    current = {}
+    for value, ids in holders.items():
+        for element_id in ids:
+            current[element_id] = value
+    pending = dict((c.element_id, c) for c in changes)
+    waiting = defaultdict(list)  # value -> ids waiting for its holders to move
+    parked = set()
+    queue = sorted(pending, reverse=True)
+    steps = []
+
+    def write(element_id, value):
+        old = current.get(element_id)
+        holders[old].discard(element_id)
+        holders[value].add(element_id)
+        current[element_id] = value
+        steps.append((element_id, value))
+        queue.extend(waiting.pop(old, ()))
+
+    def blocked(change):
+        value_holders = holders[change.new]
+        old = current.get(change.element_id)
+        shared = len(value_holders) > 1
+        for b in value_holders:
+            if b == change.element_id or b not in pending:
+                continue
+            if not (shared and pending[b].new == old):
+                return True
+        return False
+
+    def park_candidate():
+        # Park a holder of a value someone waits for, freeing the value with
+        # the fewest pending holders first.
+        best = None
+        for element_id in pending:
+            value = current.get(element_id)
+            if element_id in parked or not waiting.get(value):
+                continue
+            key = (sum(1 for b in holders[value] if b in pending), element_id)
+            if best is None or key < best:
+                best = key
+        return None if best is None else best[1]
+
+    while pending:
+        if not queue:
+            element_id = park_candidate()
+            if element_id is None:
+                raise RuntimeError("renumber writes could not be ordered")
+            parked.add(element_id)
+            write(element_id, "{}{}".format(TEMP_PREFIX, element_id))
+            continue
+        element_id = queue.pop()
+        change = pending.get(element_id)
+        if change is None:
+            continue
+        if blocked(change):
+            waiting[change.new].append(element_id)
+            continue
+        del pending[element_id]
+        write(element_id, change.new)
+    return steps
+
+
+class RenumberPlan(object):
+    """Room number and door mark changes, with their safe write order."""
+
+    def __init__(self, room_changes, door_changes, room_holders, door_holders,
+                 skipped=None):
+        self.room_changes = room_changes
+        self.door_changes = door_changes
+        self._room_holders = room_holders
+        self._door_holders = door_holders
+        # [(kind, element id, reason)] for elements that could not be planned.
+        self.skipped = skipped or []
+
+    def __len__(self):
+        return len(self.room_changes) + len(self.door_changes)
+
+    def steps(self):
+        """[(target, element_id, value)]: rooms first, then door marks."""
+        return ([(ROOM_NUMBER, eid, value) for eid, value in
+                 order_assignments(self.room_changes, self._room_holders)] +
+                [(DOOR_MARK, eid, value) for eid, value in
+                 order_assignments(self.door_changes, self._door_holders)])
+
+    def duplicates(self):
+        """{target: {value: [ids]}} values held by several elements afterwards."""
+        result = {}
+        for target, changes, holders in (
+                (ROOM_NUMBER, self.room_changes, self._room_holders),
+                (DOOR_MARK, self.door_changes, self._door_holders)):
+            final = {}
+            for value, ids in holders.items():
+                for element_id in ids:
+                    final[element_id] = value
+            for c in changes:
+                final[c.element_id] = c.new
+            by_value = defaultdict(list)
+            for element_id, value in final.items():
+                if value:
+                    by_value[value].append(element_id)
+            dupes = dict((v, sorted(ids)) for v, ids in by_value.items()
+                         if len(ids) > 1 and any(c.new == v for c in changes))
+            if dupes:
+                result[target] = dupes
+        return result
+
+    def diff_rows(self):
+        """[target, sector, element id, old, new] for the dry-run table."""
+        return [[c.target, c.sector or "", c.element_id, c.old or "", c.new]
+                for c in self.room_changes + self.door_changes]
+
+
+def build_plan(model, result, sector_index=None, duplicate_index=None):
+    """RenumberPlan that fixes the room and door findings in ``result``."""
+    sector_index = sector_index or build_sector_index(model)
+    duplicate_index = duplicate_index or DuplicateIndex(model)
+    rooms = model.rooms
+    doors = model.doors
+
+    new_numbers = {}
+    room_changes = []
+    for f in result.rooms:
+        if f.code == MISMATCH:
+            new_numbers[f.element_id] = f.details["expected"]
+            room_changes.append(Change(ROOM_NUMBER, f.element_id, f.details["found"],
+                                       f.details["expected"], f.sector))
+
+    index = DoorRoomIndex(model, sector_index)
+    door_rows = dict((doors["id"][i], i) for i in range(len(doors)))
+    by_room = defaultdict(list)
+    skipped = []
+    for f in result.doors:
+        if f.code not in (OK, MISMATCH, NO_MARK):
+            continue
+        i = door_rows[f.element_id]
+        ref_row = index.ref_row(i)
+        if ref_row is None or not rooms["number"][ref_row]:
+            skipped.append((DOOR, f.element_id, "no numbered reference room"))
+            continue
+        old_number = rooms["number"][ref_row]
+        by_room[rooms["id"][ref_row]].append((f, doors["mark"][i], old_number))
+
+    door_changes = []
+    for room_id in sorted(by_room):
+        entries = by_room[room_id]
+        new_number = new_numbers.get(room_id)
+        used = set()
+        keep = []
+        relabel = []
+        for f, mark, old_number in entries:
+            if mark is not None and mark_matches(old_number, mark):
+                suffix = mark.rstrip("\n")[len(old_number):]
+                used.add(suffix)
+                keep.append((f, mark, suffix))
+            else:
+                relabel.append((f, mark))
+        number = new_number or entries[0][2]
+        for f, mark, suffix in keep:
+            if new_number and mark != new_number + suffix:
+                door_changes.append(Change(DOOR_MARK, f.element_id, mark,
+                                           new_number + suffix, f.sector))
+        free = [c for c in ascii_uppercase if c not in used]
+        for f, mark in relabel:
+            if not free:
+                skipped.append((DOOR, f.element_id, "no free [A-Z] suffix"))
+                continue
+            door_changes.append(Change(DOOR_MARK, f.element_id, mark,
+                                       number + free.pop(0), f.sector))
+
+    return RenumberPlan(room_changes, door_changes, duplicate_index.holders(ROOM),
+                        duplicate_index.holders(DOOR), skipped)
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""Batched report rendering and CSV/JSON export of a ValidationResult.
+
+Printing one markdown line per element makes the pyRevit output window the
+slowest part of a large run.  ``ReportBuilder`` collects the report into a
+few text blocks instead and renders them with one call per block: a summary
+table, the issues, then collapsed lists of OK elements (per sector in
+whole-model runs).  Lists longer than
+``PAGE_SIZE`` lines are split into collapsed pages (the first one open).
+
+``write_csv`` and ``write_json`` stream the same findings to files, one row
+per finding, for downstream tooling.
+"""
+import csv
+import io
+import json
+import re
+import sys
+
+from validation_engine import (DIRECTION, DOOR, DUPLICATE, ROOM, OK, UNRESOLVED_SECTOR,
+                               format_finding, sector_sort_key)
+
+PAGE_SIZE = 500
+
+FIELDS = ("kind", "element_id", "sector", "code",
+          "name", "area_cat", "expected", "found",
+          "room_name", "room_number", "mark", "rule", "phrase", "flipped",
+          "others", "error", "source")
+
+TITLES = {ROOM: "Rooms", DOOR: "Doors", DIRECTION: "Door directions",
+          DUPLICATE: "Duplicate numbers and marks"}
+
+_PY2 = sys.version_info[0] < 3
+
+_MD_LINK = re.compile(r"\[([^\]]*)\]\(([^)]*)\)")
+_MD_CODE = re.compile(r"`([^`]*)`")
+
+
+def _escape(text):
+    return (text.replace("&", "&amp;").replace("<", "&lt;")
+            .replace(">", "&gt;").replace('"', "&quot;"))
+
+
+def md_to_html(line):
+    """HTML for one finding line: handles the ``[text](url)`` and `code` spans."""
+    html = _escape(line)
+    html = _MD_LINK.sub(r'<a href="\2">\1</a>', html)
+    return _MD_CODE.sub(r"<code>\1</code>", html)
+
+
+def finding_row(finding):
+    """Flat dict of FIELDS for one finding (missing details are empty)."""
+    row = dict(finding.details)
+    if "others" in row:
+        row["others"] = " ".join(str(other) for other in row["others"])
+    row.update(kind=finding.kind, element_id=finding.element_id,
+               sector=finding.sector or "", code=finding.code)
+    return dict((field, row.get(field, "")) for field in FIELDS)
+
+
+def iter_rows(result):
+    for kind in (ROOM, DOOR, DIRECTION, DUPLICATE):
+        for finding in result.findings(kind):
+            yield finding_row(finding)
+
+
+def write_csv(result, path):
+    """Stream every finding of ``result`` to a CSV file with a FIELDS header."""
+    if _PY2:
+        fh = open(path, "wb")
+    else:
+        fh = io.open(path, "w", encoding="utf-8", newline="")
+    with fh:
+        writer = csv.writer(fh)
+        writer.writerow(FIELDS)
+        for row in iter_rows(result):
+            values = [row[field] for field in FIELDS]
+            if _PY2:
+                values = [v.encode("utf-8") if isinstance(v, unicode) else v
+                          for v in values]
+            writer.writerow(values)
+
+
+def write_json(result, path, meta=None):
+    """Stream ``{"meta": ..., "findings": [...]}`` to ``path``, a row per line."""
+    with io.open(path, "w", encoding="utf-8") as fh:
+        fh.write(u'{"meta": ')
+        fh.write(_to_text(json.dumps(meta or {}, sort_keys=True, ensure_ascii=False)))
+        fh.write(u',\n "findings": [')
+        sep = u"\n  "
+        for row in iter_rows(result):
+            fh.write(sep)
+            fh.write(_to_text(json.dumps(row, sort_keys=True, ensure_ascii=False)))
+            sep = u",\n  "
+        fh.write(u"\n ]}\n")
+
+
+def _to_text(value):
+    if isinstance(value, bytes) and not isinstance(value, type(u"")):
+        return value.decode("utf-8")
+    return value
+
+
+def export_result(result, path, meta=None):
+    """Write ``result`` as JSON for a ``.json`` path, else as CSV."""
+    if path.lower().endswith(".json"):
+        write_json(result, path, meta)
+    else:
+        write_csv(result, path)
+
+
+class ReportBuilder(object):
+    """Markdown and HTML blocks, rendered to a pyRevit output in one pass."""
+
+    def __init__(self, page_size=PAGE_SIZE):
+        self.page_size = page_size
+        self._blocks = []
+
+    def md(self, *lines):
+        self._add("md", lines)
+
+    def html(self, *chunks):
+        self._add("html", chunks)
+
+    def _add(self, kind, parts):
+        if not parts:
+            return
+        if self._blocks and self._blocks[-1][0] == kind:
+            self._blocks[-1][1].extend(parts)
+        else:
+            self._blocks.append((kind, list(parts)))
+
+    def table(self, columns, rows, title=None):
+        if title:
+            self.md("#### {}".format(title))
+        lines = []
+        lines.append("| {} |".format(" | ".join(columns)))
+        lines.append("|{}|".format("|".join(" --- " for _ in columns)))
+        for row in rows:
+            lines.append("| {} |".format(" | ".join(str(v) for v in row)))
+        self.md("\n".join(lines))
+
+    def collapsed(self, title, lines, open_first=False):
+        """``lines`` (markdown) as collapsible HTML sections of page_size lines."""
+        pages = [lines[i:i + self.page_size]
+                 for i in range(0, len(lines), self.page_size)]
+        for n, page in enumerate(pages):
+            label = title
+            if len(pages) > 1:
+                start = n * self.page_size + 1
+                label = "{} ({}-{} of {})".format(title, start, start + len(page) - 1,
+                                                  len(lines))
+            self.html(u'<details{}><summary>{}</summary>'.format(
+                          " open" if open_first and n == 0 else "", _escape(label)),
+                      u"<br>".join(md_to_html(line) for line in page),
+                      u"</details>")
+
+    def listing(self, title, lines):
+        """Lines inline when short, otherwise paged with the first page open."""
+        if len(lines) <= self.page_size:
+            self.md(*lines)
+        else:
+            self.collapsed(title, lines, open_first=True)
+
+    def findings(self, kind, findings, by_sector=False):
+        """Issues inline (paged when long), then OK lines collapsed."""
+        grouped = {}
+        for f in findings:
+            line = format_finding(f)
+            if line:
+                sector = (f.sector or UNRESOLVED_SECTOR) if by_sector else None
+                issues, oks = grouped.setdefault(sector, ([], []))
+                (oks if f.code == OK else issues).append(line)
+        title = TITLES[kind]
+        for sector in sorted(grouped, key=lambda s: sector_sort_key(s or "")):
+            issues, oks = grouped[sector]
+            label = title
+            if sector is not None:
+                self.md("### Sector `{}`".format(sector))
+                label = "{} in sector {}".format(title, sector)
+            if issues:
+                self.listing("{} issues".format(label), issues)
+            if oks:
+                self.collapsed("{} OK ({})".format(label, len(oks)), oks)
+
+    def timings(self, stats):
+        """Timer and counter tables from an instrumentation.Stats."""
+        rows = stats.timing_rows()
+        if rows:
+            self.table(["Stage", "Seconds", "Calls"],
+                       [[name, "{:.3f}".format(seconds), calls]
+                        for name, seconds, calls in rows],
+                       title="Timings")
+        counters = stats.counter_rows()
+        if counters:
+            self.table(["Counter", "Value"], [list(row) for row in counters],
+                       title="Counters")
+
+    def render(self, output):
+        """One print call per block of consecutive markdown or HTML."""
+        for kind, parts in self._blocks:
+            if kind == "md":
+                output.print_md("\n\n".join(parts))
+            else:
+                output.print_html(u"".join(parts))
+        self._blocks = []
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Write a ``renumber.RenumberPlan`` back to the model.
+
+Every step goes through one Transaction, so the whole plan is one undo
+item and the model regenerates once, at commit.  The plan's step order
+already keeps values unique between steps (swaps go through a temporary
+value), so no intermediate duplicate is ever written.
+"""
+from Autodesk.Revit.DB import BuiltInParameter, ElementId, Transaction
+
+from instrumentation import count, timed
+from param_access import ParamHandle
+from renumber import DOOR_MARK, ROOM_NUMBER
+
+TRANSACTION_NAME = "Renumber rooms and doors"
+
+
+def apply_plan(doc, plan):
+    """Apply ``plan`` in one transaction; returns (changes written, failures).
+
+    ``failures`` is a list of (element id, reason) for steps that could not
+    be written (missing element, missing or read-only parameter); the other
+    steps are still committed.
+    """
+    handles = {ROOM_NUMBER: ParamHandle("Number", BuiltInParameter.ROOM_NUMBER),
+               DOOR_MARK: ParamHandle("Mark", BuiltInParameter.ALL_MODEL_MARK)}
+    steps = plan.steps()
+    failures = []
+    failed_ids = set()
+    t = Transaction(doc, TRANSACTION_NAME)
+    t.Start()
+    try:
+        with timed("renumber.write"):
+            for target, element_id, value in steps:
+                if element_id in failed_ids:
+                    continue
+                element = doc.GetElement(ElementId(element_id))
+                param = handles[target].lookup(element) if element is not None else None
+                if param is None or param.IsReadOnly:
+                    failures.append((element_id, "no writable {}".format(target)))
+                    failed_ids.add(element_id)
+                    continue
+                param.Set(value)
+        with timed("renumber.commit"):
+            t.Commit()
+    except:
+        if t.HasStarted() and not t.HasEnded():
+            t.RollBack()
+        raise
+    count("renumber.steps", len(steps))
+    return len(plan) - len(failed_ids), failures
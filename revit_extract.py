@@ -0,0 +1,571 @@
+# -*- coding: utf-8 -*-
+"""Extract rooms, doors, levels, phases and scope boxes into ``ModelData``.
+
+This is the only place the validators touch the Revit API for reading;
+everything downstream works on the extracted columns.
+"""
+import os
+import time
+
+from System.Collections.Generic import List
+from Autodesk.Revit.DB import (BoundingBoxIntersectsFilter, BuiltInCategory,
+                               BuiltInParameter, Curve, Document, ElementFilter,
+                               ElementId, ElementParameterFilter,
+                               FilteredElementCollector, Level, LocationCurve,
+                               LocationPoint, LogicalAndFilter, LogicalOrFilter,
+                               Options, Outline, ParameterFilterRuleFactory, Phase,
+                               RevitLinkInstance, XYZ)
+
+from instrumentation import count, timed
+from linked_models import cached_link_model, place_model
+from model_snapshot import ModelData, NO_ID, NAN
+from param_access import ParamHandle, TypeValues
+from sector_index import EPS, box_from_corners, parse_sector_code
+from state_store import stable_hash
+from validation_engine import build_sector_index
+
+NEW_CONSTRUCTION_NAMES = ("new construction", "new")
+
+
+def find_new_construction_phase(doc):
+    for phase in FilteredElementCollector(doc).OfClass(Phase):
+        if phase.Name and phase.Name.lower() in NEW_CONSTRUCTION_NAMES:
+            return phase
+    return None
+
+
+def get_view_sector(doc, view):
+    scope_box_param = view.LookupParameter("Scope Box")
+    if scope_box_param and scope_box_param.HasValue:
+        sb_elem = doc.GetElement(scope_box_param.AsElementId())
+        if sb_elem:
+            sector = parse_sector_code(sb_elem.Name)
+            if sector:
+                return sector
+    return parse_sector_code(view.Name or "")
+
+
+def collect_elements(doc, view, category, all_sectors, element_filter=None):
+    """Collector over the category's instances; iterate it once.
+
+    Elements are handed out one at a time, so callers that keep only the
+    extracted values let each Revit object go as soon as it is read.
+    """
+    # Whole-model mode collects once for the document instead of per view.
+    if all_sectors or view is None:
+        collector = FilteredElementCollector(doc)
+    else:
+        collector = FilteredElementCollector(doc, view.Id)
+    collector = collector.OfCategory(category).WhereElementIsNotElementType()
+    if element_filter is not None:
+        collector = collector.WherePasses(element_filter)
+    return collector
+
+
+def _combine(filters, combiner):
+    filters = [f for f in filters if f is not None]
+    if not filters:
+        return None
+    if len(filters) == 1:
+        return filters[0]
+    return combiner(List[ElementFilter](filters))
+
+
+# Plan-only outline: the scope box height must not drop rooms on other levels.
+_OUTLINE_Z = 1.0e6
+
+
+def sector_outline_filter(scope_boxes, sector_code):
+    """Bounding-box filter for elements touching ``sector_code``'s scope boxes.
+
+    Built from the scope box table so no extra collector is needed.  It only
+    narrows what crosses the API; ownership is still decided in Python.
+    """
+    filters = []
+    for i in range(len(scope_boxes)):
+        if scope_boxes["code"][i] != sector_code:
+            continue
+        outline = Outline(XYZ(scope_boxes["min_x"][i] - EPS, scope_boxes["min_y"][i] - EPS,
+                              -_OUTLINE_Z),
+                          XYZ(scope_boxes["max_x"][i] + EPS, scope_boxes["max_y"][i] + EPS,
+                              _OUTLINE_Z))
+        filters.append(BoundingBoxIntersectsFilter(outline))
+    return _combine(filters, LogicalOrFilter)
+
+
+def view_leftovers(doc, view, category, collected_ids, keep, element_filter=None):
+    """Elements of ``view`` left out by the sector filter that ``keep`` accepts.
+
+    Some of them are still reported by the validators (see extract_model),
+    so they are read with a second collector that skips ``collected_ids``;
+    ``keep`` looks at as little as it can before an element is kept.
+    """
+    collector = collect_elements(doc, view, category, False, element_filter)
+    if collected_ids:
+        collector = collector.Excluding(List[ElementId]([ElementId(i) for i in collected_ids]))
+    for element in collector:
+        if keep(element):
+            count("collect.view_leftovers")
+            yield element
+
+
+def outside_sectors(sector_index, ref_point):
+    """``keep`` for view_leftovers: elements lying in no scope box."""
+    def keep(element):
+        pt = ref_point(element)
+        return pt is None or not sector_index.owner(pt[0], pt[1])
+    return keep
+
+
+def _room_reported(level_ids, params, in_no_sector):
+    """``keep`` for view_leftovers: rooms the room check reports in any sector.
+
+    Those are rooms missing a parameter or a level, as the check reports
+    them before it looks at the sector, and rooms in no scope box.
+    """
+    def keep(room):
+        try:
+            if room.LevelId.IntegerValue not in level_ids:
+                return True
+            for handle in (params.room_name, params.room_number, params.gifa):
+                if not handle.lookup(room):
+                    return True
+        except Exception:
+            return True
+        return in_no_sector(room)
+    return keep
+
+
+def _not_equals_filter(param_id, value):
+    try:
+        rule = ParameterFilterRuleFactory.CreateEqualsRule(param_id, value)
+    except:
+        rule = ParameterFilterRuleFactory.CreateEqualsRule(param_id, value, False)
+    # Inverted, so rooms without the parameter still pass (and get reported).
+    return ElementParameterFilter(rule, True)
+
+
+def gifa_exclusion_filter(doc, names):
+    """Filter dropping rooms whose GIFA NAME equals one of ``names``."""
+    if not names:
+        return None
+    sample = (FilteredElementCollector(doc).OfCategory(BuiltInCategory.OST_Rooms)
+              .WhereElementIsNotElementType().FirstElement())
+    param = sample.LookupParameter("GIFA NAME") if sample else None
+    if param is None:
+        return None
+    return _combine([_not_equals_filter(param.Id, name) for name in names],
+                    LogicalAndFilter)
+
+
+def scope_box_corners(sb):
+    """Distinct plan (XY) corners of a scope box, from its edge lines."""
+    corners = []
+    seen = set()
+    try:
+        for geom_obj in sb.get_Geometry(Options()):
+            if not isinstance(geom_obj, Curve):
+                continue
+            for i in (0, 1):
+                p = geom_obj.GetEndPoint(i)
+                key = (round(p.X, 6), round(p.Y, 6))
+                if key not in seen:
+                    seen.add(key)
+                    corners.append((p.X, p.Y))
+    except:
+        pass
+    return corners
+
+
+def _bbox_centre(element):
+    try:
+        bb = element.get_BoundingBox(None) if element else None
+        if bb:
+            return ((bb.Min.X + bb.Max.X) * 0.5, (bb.Min.Y + bb.Max.Y) * 0.5)
+    except:
+        pass
+    return None
+
+
+def room_ref_point(room):
+    """Sector reference point of a room: its bounding box centre."""
+    return _bbox_centre(room)
+
+
+def room_number_point(room):
+    """Numbering point of a room: its location point, else bbox centre."""
+    if room.Location:
+        pt = room.Location.Point
+        return (pt.X, pt.Y)
+    return _bbox_centre(room)
+
+
+def door_ref_point(door):
+    try:
+        loc = door.Location
+        if isinstance(loc, LocationPoint):
+            return (loc.Point.X, loc.Point.Y)
+        elif isinstance(loc, LocationCurve):
+            curve = loc.Curve
+            if curve:
+                pt = curve.Evaluate(0.5, True)
+                return (pt.X, pt.Y)
+    except:
+        pass
+    return _bbox_centre(door)
+
+
+class DoorRoomCache(object):
+    """From/To rooms per (door id, phase id) for one extraction run.
+
+    Remembers whether ``get_ToRoom(phase.Id)`` or the ``ToRoom[phase]``
+    indexer works in this Revit version, so the fallback is not paid for
+    with an exception on every door.
+    """
+
+    def __init__(self):
+        self._rooms = {}
+        self._use_indexer = False
+        self.api_calls = 0
+
+    def rooms(self, door, phase):
+        """(to_room, from_room) for ``door`` in ``phase``; either may be None."""
+        key = (door.Id.IntegerValue, phase.Id.IntegerValue)
+        pair = self._rooms.get(key)
+        if pair is None:
+            pair = (self._room(door, phase, True), self._room(door, phase, False))
+            self._rooms[key] = pair
+        return pair
+
+    def _room(self, door, phase, to_room):
+        self.api_calls += 1
+        if not self._use_indexer:
+            try:
+                if to_room:
+                    return door.get_ToRoom(phase.Id)
+                return door.get_FromRoom(phase.Id)
+            except:
+                pass
+        try:
+            room = door.ToRoom[phase] if to_room else door.FromRoom[phase]
+        except:
+            return None
+        self._use_indexer = True
+        return room
+
+
+def _string_param(param):
+    """(exists, value) for a Parameter that may be None."""
+    if not param:
+        return False, None
+    if not param.HasValue:
+        return True, None
+    return True, param.AsString() or ""
+
+
+def _door_type_values(symbol):
+    """(type comments, family name, type name) of a door type."""
+    if symbol is None:
+        return None, None, None
+    _, type_comments = _string_param(
+        symbol.get_Parameter(BuiltInParameter.ALL_MODEL_TYPE_COMMENTS))
+    _, type_name = _string_param(symbol.get_Parameter(BuiltInParameter.SYMBOL_NAME_PARAM))
+    return type_comments, symbol.FamilyName, type_name
+
+
+class ExtractionParams(object):
+    """Parameter handles and type memos for one extraction run."""
+
+    def __init__(self):
+        self.room_name = ParamHandle("Name", BuiltInParameter.ROOM_NAME)
+        self.room_number = ParamHandle("Number", BuiltInParameter.ROOM_NUMBER)
+        self.gifa = ParamHandle("GIFA NAME")
+        self.mark = ParamHandle("Mark", BuiltInParameter.ALL_MODEL_MARK)
+        self.comments = ParamHandle("Comments", BuiltInParameter.ALL_MODEL_INSTANCE_COMMENTS)
+        self.door_types = TypeValues(_door_type_values)
+
+    def report_counts(self):
+        """Add this run's parameter reads and type memo hits to STATS."""
+        handles = (self.room_name, self.room_number, self.gifa, self.mark, self.comments)
+        count("api.parameter_reads", sum(h.reads for h in handles))
+        count("api.type_reads", self.door_types.misses)
+        count("cache.type_hits", self.door_types.hits)
+
+
+def _append_room(table, room, in_scope, params):
+    rid = room.Id.IntegerValue
+    try:
+        has_name, name = params.room_name.string(room)
+        has_number, number = params.room_number.string(room)
+        has_gifa, gifa = params.gifa.string(room)
+        sector_pt = room_ref_point(room) or (NAN, NAN)
+        number_pt = room_number_point(room) or (NAN, NAN)
+        table.append(id=rid, level_id=room.LevelId.IntegerValue,
+                     x=number_pt[0], y=number_pt[1],
+                     sx=sector_pt[0], sy=sector_pt[1],
+                     name=name, number=number, gifa=gifa,
+                     has_params=has_name and has_number and has_gifa,
+                     in_scope=in_scope)
+    except Exception as e:
+        table.append(id=rid, in_scope=in_scope, error=str(e) or type(e).__name__)
+
+
+def _append_door(table, door, phase, door_rooms, params):
+    did = door.Id.IntegerValue
+    try:
+        type_comments = None
+        comments = None
+        family = None
+        type_name = None
+        flipped = NO_ID
+        try:
+            type_comments, family, type_name = params.door_types.get(door.Symbol)
+            _, comments = params.comments.string(door)
+            flipped = 1 if door.FacingFlipped else 0
+        except:
+            pass
+        _, mark = params.mark.string(door)
+        pt = door_ref_point(door) or (NAN, NAN)
+        to_room, from_room = door_rooms.rooms(door, phase)
+        table.append(id=did, x=pt[0], y=pt[1],
+                     to_room=to_room.Id.IntegerValue if to_room else NO_ID,
+                     from_room=from_room.Id.IntegerValue if from_room else NO_ID,
+                     mark=mark, type_comments=type_comments, comments=comments,
+                     flipped=flipped, family=family, type_name=type_name)
+        return [r for r in (to_room, from_room) if r]
+    except Exception as e:
+        table.append(id=did, error=str(e) or type(e).__name__)
+        return []
+
+
+def _extract_levels_phases(doc, model):
+    for level in FilteredElementCollector(doc).OfClass(Level):
+        model.levels.append(id=level.Id.IntegerValue, name=level.Name,
+                            elevation=level.Elevation)
+    for ph in FilteredElementCollector(doc).OfClass(Phase):
+        model.phases.append(id=ph.Id.IntegerValue, name=ph.Name)
+
+
+def _extract_scope_boxes(doc, model):
+    scope_box_collector = (FilteredElementCollector(doc)
+                           .OfCategory(BuiltInCategory.OST_VolumeOfInterest)
+                           .WhereElementIsNotElementType())
+    for sb in scope_box_collector:
+        try:
+            sector_code = parse_sector_code((sb.Name or "").strip())
+            if not sector_code:
+                continue
+            bbox = sb.get_BoundingBox(None)
+            if not bbox:
+                continue
+            frame = None
+            # Rotated boxes: test containment in the box's own frame.
+            corners = scope_box_corners(sb)
+            if len(corners) == 4:
+                frame = box_from_corners(sector_code, corners).frame
+            ox, oy, ux, uy, vx, vy, lu, lv = frame or (NAN,) * 8
+            model.scope_boxes.append(code=sector_code,
+                                     min_x=bbox.Min.X, min_y=bbox.Min.Y,
+                                     max_x=bbox.Max.X, max_y=bbox.Max.Y,
+                                     ox=ox, oy=oy, ux=ux, uy=uy,
+                                     vx=vx, vy=vy, lu=lu, lv=lv)
+        except:
+            pass
+
+
+def _extract_document_values(doc, model, params, rooms, doors, whole_rooms, whole_doors):
+    """Number / Mark (and the door skip comments) of every room and door in ``doc``.
+
+    Tables the extraction already filled for the whole document are copied
+    from its rows; only the others are collected again.
+    """
+    if rooms:
+        table = model.room_numbers
+        if whole_rooms:
+            for i in range(len(model.rooms)):
+                table.append(id=model.rooms["id"][i], number=model.rooms["number"][i])
+        else:
+            for room in collect_elements(doc, None, BuiltInCategory.OST_Rooms, True):
+                try:
+                    _, number = params.room_number.string(room)
+                except:
+                    continue
+                table.append(id=room.Id.IntegerValue, number=number)
+    if doors:
+        table = model.door_marks
+        if whole_doors:
+            extracted = model.doors
+            for i in range(len(extracted)):
+                table.append(**dict((col, extracted[col][i]) for col, _ in table.schema))
+        else:
+            for door in collect_elements(doc, None, BuiltInCategory.OST_Doors, True):
+                try:
+                    _, mark = params.mark.string(door)
+                    _, comments = params.comments.string(door)
+                    type_comments = params.door_types.get(door.Symbol)[0]
+                except:
+                    continue
+                table.append(id=door.Id.IntegerValue, mark=mark,
+                             type_comments=type_comments, comments=comments)
+
+
+def extract_model(doc, view, phase, all_sectors=False, rooms=True, doors=True,
+                  excluded_gifa_names=None, document_values=False):
+    """Read everything validation needs from ``doc`` into ModelData.
+
+    In view mode only elements visible in ``view`` are in scope, and Revit
+    only returns those whose bounding box touches the view sector's scope
+    box.  Other visible elements the validators would still report (rooms
+    missing a parameter or level, anything in no scope box) are read by a
+    second pass, so counts match reading the whole view (see view_leftovers).
+    Rooms whose GIFA NAME is in ``excluded_gifa_names`` are left in Revit
+    (see FunctionCatalogue.names_rejected).  Rooms that doors refer to are
+    still extracted (out of scope) for the mark check.
+
+    Whole-model runs, and view runs with ``document_values``, also fill
+    ``room_numbers`` / ``door_marks`` with the Number and Mark of every room
+    and door in ``doc``, so the duplicate check sees the whole document;
+    otherwise it only compares the extracted rooms and doors.
+
+    ``excluded_gifa_names`` may also be a callable returning the names; it
+    is called only once levels and scope boxes are read, so config that is
+    still loading in the background has until then to finish.
+    """
+    model = ModelData(meta={
+        "title": doc.Title,
+        "path": doc.PathName,
+        "scope": "model" if all_sectors else "view",
+        "view_name": view.Name if view is not None else None,
+        "view_sector": None if all_sectors else get_view_sector(doc, view),
+        "phase": phase.Name,
+        "extracted": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "document_values": bool(all_sectors or document_values),
+    })
+
+    with timed("collect.levels_phases"):
+        _extract_levels_phases(doc, model)
+    with timed("collect.scope_boxes"):
+        _extract_scope_boxes(doc, model)
+
+    sector_filter = sector_index = None
+    if not all_sectors and model.meta["view_sector"]:
+        sector_filter = sector_outline_filter(model.scope_boxes, model.meta["view_sector"])
+    if sector_filter is not None:
+        sector_index = build_sector_index(model)
+    if callable(excluded_gifa_names):
+        excluded_gifa_names = excluded_gifa_names() if rooms else None
+    gifa_filter = gifa_exclusion_filter(doc, excluded_gifa_names)
+    room_filter = _combine([sector_filter, gifa_filter], LogicalAndFilter)
+
+    params = ExtractionParams()
+    seen_rooms = set()
+    # Elements are streamed from the collectors and only their values kept.
+    if rooms:
+        with timed("extract.rooms"):
+            for room in collect_elements(doc, view, BuiltInCategory.OST_Rooms,
+                                         all_sectors, room_filter):
+                seen_rooms.add(room.Id.IntegerValue)
+                _append_room(model.rooms, room, True, params)
+            if sector_index is not None:
+                keep = _room_reported(set(model.levels["id"]), params,
+                                      outside_sectors(sector_index, room_ref_point))
+                for room in view_leftovers(doc, view, BuiltInCategory.OST_Rooms,
+                                           list(seen_rooms), keep, gifa_filter):
+                    seen_rooms.add(room.Id.IntegerValue)
+                    _append_room(model.rooms, room, True, params)
+        count("rooms.collected", len(model.rooms))
+
+    if doors:
+        door_rooms = DoorRoomCache()
+
+        def add_door(door):
+            for room in _append_door(model.doors, door, phase, door_rooms, params):
+                if room.Id.IntegerValue not in seen_rooms:
+                    seen_rooms.add(room.Id.IntegerValue)
+                    _append_room(model.rooms, room, False, params)
+
+        with timed("extract.doors"):
+            for door in collect_elements(doc, view, BuiltInCategory.OST_Doors,
+                                         all_sectors, sector_filter):
+                add_door(door)
+            if sector_index is not None:
+                for door in view_leftovers(doc, view, BuiltInCategory.OST_Doors,
+                                           list(model.doors["id"]),
+                                           outside_sectors(sector_index, door_ref_point)):
+                    add_door(door)
+        count("doors.collected", len(model.doors))
+        count("api.door_room_reads", door_rooms.api_calls)
+
+    if model.meta["document_values"]:
+        with timed("extract.document_values"):
+            _extract_document_values(doc, model, params, rooms, doors,
+                                     all_sectors and gifa_filter is None, all_sectors)
+
+    params.report_counts()
+    return model
+
+
+# --- Linked models ---
+
+def linked_documents(doc):
+    """[(RevitLinkInstance, linked Document)] for every loaded link in ``doc``."""
+    links = []
+    for instance in FilteredElementCollector(doc).OfClass(RevitLinkInstance):
+        try:
+            link_doc = instance.GetLinkDocument()
+        except:
+            link_doc = None
+        if link_doc is not None:
+            links.append((instance, link_doc))
+    return links
+
+
+def link_transform(instance):
+    """The instance's total transform as (ox, oy, oz, bxx, bxy, byx, byy)."""
+    t = instance.GetTotalTransform()
+    return (t.Origin.X, t.Origin.Y, t.Origin.Z,
+            t.BasisX.X, t.BasisX.Y, t.BasisY.X, t.BasisY.Y)
+
+
+def document_version(doc):
+    """Identifier of the saved state of ``doc``, or None when it cannot be told."""
+    try:
+        version = Document.GetDocumentVersion(doc)
+        return "{}/{}".format(version.VersionGUID, version.NumberOfSaves)
+    except:
+        pass
+    try:
+        return "mtime/{}".format(os.path.getmtime(doc.PathName))
+    except:
+        return None
+
+
+def extract_link_model(host_model, instance, link_doc, rooms=True, doors=True,
+                       excluded_gifa_names=None, cache_dir=None):
+    """(ModelData of a link placed in host coordinates, True if read from cache).
+
+    The link is extracted whole (its own New Construction phase, no view
+    filter) and cached per link version; see linked_models.
+    """
+    if callable(excluded_gifa_names):
+        excluded_gifa_names = excluded_gifa_names() if rooms else None
+    phase = find_new_construction_phase(link_doc)
+    if phase is None:
+        raise ValueError("no 'New Construction' phase in {}".format(link_doc.Title))
+    version = document_version(link_doc)
+    if version is not None:
+        version = stable_hash(version, phase.Name, bool(rooms), bool(doors),
+                              sorted(excluded_gifa_names or []))
+
+    def extract():
+        with timed("links.extract"):
+            return extract_model(link_doc, None, phase, True, rooms, doors,
+                                 excluded_gifa_names)
+
+    model, cached = cached_link_model(link_doc.PathName or link_doc.Title, version,
+                                      extract, cache_dir)
+    try:
+        return place_model(model, link_transform(instance), host_model.scope_boxes,
+                           link_doc.Title), cached
+    finally:
+        model.close()
@@ -1,57 +1,77 @@
 # -*- coding: utf-8 -*-
 __title__ = 'Validate Room &\n Door Numbers'
 __author__ = 'Huang Yuhan (Revit 2025 compatible version)'
+config = None
+profiler = None
 try:
     import os
-    import re
     from pyrevit import revit, script, forms
-    from Autodesk.Revit.DB import *
-    from door_rules_reader import read_door_direction_rules
-    from function_level_reader import read_function_map, read_level_map
-    from collections import defaultdict
+    from instrumentation import STATS, RunProfiler, timed
     
     doc = revit.doc
     view = revit.active_view
     output = script.get_output()
     tool_dir = os.path.dirname(__file__)
     
-    # --- Load Excel Config Files ---
-    door_rule_file = os.path.join(tool_dir, "door_direction_rules.xlsx")
-    function_map_file = os.path.join(tool_dir, "function_map.xlsx")
-    level_map_file = os.path.join(tool_dir, "level_map.xlsx")
+    # --- Ask user which mode to validate (before loading anything) ---
+    modes = ['ALL', 'FRONT OF HOUSE (FOH)', 'BACK OF HOUSE (BOH)']
+    WHOLE_MODEL_SWITCH = 'Whole model (all sectors)'
+    ROOMS_ONLY_SWITCH = 'Rooms only'
+    DOORS_ONLY_SWITCH = 'Doors only'
+    SNAPSHOT_SWITCH = 'Export model snapshot'
+    FULL_RECHECK_SWITCH = 'Full re-check (ignore saved state)'
+    EXPORT_SWITCH = 'Export results (CSV/JSON)'
+    TIMINGS_SWITCH = 'Show timings'
+    PROFILE_SWITCH = 'Profile run (write profile file)'
+    LINKS_SWITCH = 'Include linked models'
+    RENUMBER_SWITCH = 'Fix numbers (dry run, then confirm)'
+    DOCUMENT_DUPLICATES_SWITCH = 'Duplicates across whole document'
+    picked = forms.CommandSwitchWindow.show(
+        modes,
+        switches=[WHOLE_MODEL_SWITCH, ROOMS_ONLY_SWITCH, DOORS_ONLY_SWITCH,
+                  LINKS_SWITCH, SNAPSHOT_SWITCH, FULL_RECHECK_SWITCH, EXPORT_SWITCH,
+                  TIMINGS_SWITCH, PROFILE_SWITCH, RENUMBER_SWITCH,
+                  DOCUMENT_DUPLICATES_SWITCH],
+        message='Select which category of rooms to validate:'
+    )
+    if not picked or not picked[0]:
+        script.exit()
+    selected_mode, switches = picked
+    switches = switches or {}
+    all_sectors = bool(switches.get(WHOLE_MODEL_SWITCH))
+    # Both "only" switches (or neither) check rooms and doors.
+    check_rooms = bool(switches.get(ROOMS_ONLY_SWITCH)) or not switches.get(DOORS_ONLY_SWITCH)
+    check_doors = bool(switches.get(DOORS_ONLY_SWITCH)) or not switches.get(ROOMS_ONLY_SWITCH)
+    # Timers and counters only run when timings or a profile are asked for.
+    STATS.enabled = bool(switches.get(TIMINGS_SWITCH) or switches.get(PROFILE_SWITCH))
+    if switches.get(PROFILE_SWITCH):
+        profiler = RunProfiler()
+        if not profiler.start():
+            profiler = None
     
-    door_rules = read_door_direction_rules(door_rule_file)
-    function_map = read_function_map(function_map_file)
-    level_map = read_level_map(level_map_file)
+    # Imported only once a mode is picked, so the picker opens at once.
+    from model_snapshot import write_snapshot
+    from revit_extract import (extract_model, extract_link_model,
+                               find_new_construction_phase, linked_documents)
+    from state_store import StateStore, default_state_path
+    from validation_engine import (validate_model, sector_sort_key, ValidationResult,
+                                   ROOM, DOOR, DIRECTION, DUPLICATE)
+    from report_builder import ReportBuilder, export_result
+    from tool_config import ToolConfig
     
-    output.print_md("### Config Files Loaded")
-    output.print_md("- Door rules: `{}`".format(len(door_rules)))
-    output.print_md("- Function map: `{}`".format(len(function_map)))
-    output.print_md("- Level map: `{}`".format(len(level_map)))
-    output.print_md("")
+    # --- Excel config files: parsed in the background while Revit is read,
+    # joined when a check first needs them ---
+    config = ToolConfig(tool_dir)
+    config.prefetch((["function_map", "function_categories", "level_map"]
+                     if check_rooms else []) +
+                    (["door_rules"] if check_doors else []))
     
     # --- Find "New Construction" phase ---
-    new_con_phase = None
-    phase_collector = FilteredElementCollector(doc).OfClass(Phase)
-    for phase in phase_collector:
-        if phase.Name and phase.Name.lower() in ["new construction", "new"]:
-            new_con_phase = phase
-            break
-    
+    with timed("phase.lookup"):
+        new_con_phase = find_new_construction_phase(doc)
     if not new_con_phase:
         raise Exception("Could not find 'New Construction' phase in model.")
     
-    new_con_phase_id = new_con_phase.Id
-    
-    # --- Ask user which mode to validate ---
-    modes = ['ALL', 'FRONT OF HOUSE (FOH)', 'BACK OF HOUSE (BOH)']
-    selected_mode = forms.CommandSwitchWindow.show(
-        modes,
-        message='Select which category of rooms to validate:'
-    )
-    if not selected_mode:
-        script.exit()
-    
     MODE_ALIASES = {
         'ALL': 'ALL',
         'FRONT OF HOUSE (FOH)': 'FOH',
@@ -61,485 +81,220 @@ try:
     }
     validation_mode = MODE_ALIASES.get(selected_mode, 'ALL')
     output.print_md("### Validation Mode: **{}**".format(validation_mode))
+    if all_sectors:
+        output.print_md("### Scope: **Whole model (all sectors)**")
+    if not (check_rooms and check_doors):
+        output.print_md("### Checks: **{}**".format("Rooms only" if check_rooms
+                                                      else "Doors only"))
     
-    # =============================================================
-    # GLOBAL SCOPE BOX COLLECTION + HELPERS (sectors)
-    # =============================================================
-    def parse_sector_code(text):
-        if not text:
-            return None
-        t = (text or "").strip()
-        m = re.match(r'^100_(\d{4})$', t)
-        if m:
-            return m.group(1)
-        m = re.search(r'100_(\d{4})', t)
-        return m.group(1) if m else None
+    # --- Extract model data (the only Revit reads) ---
+    # Whole-model runs always read every Number/Mark; a view run only does when
+    # asked, or when renumbering, which must not reuse a value held elsewhere.
+    document_values = bool(switches.get(DOCUMENT_DUPLICATES_SWITCH) or
+                           switches.get(RENUMBER_SWITCH))
+    with timed("extract.total"):
+        model = extract_model(
+            doc, view, new_con_phase, all_sectors, rooms=check_rooms, doors=check_doors,
+            excluded_gifa_names=lambda: config.catalogue.names_rejected(validation_mode),
+            document_values=document_values)
+    output.print_md("### Scope Boxes Loaded: {}".format(len(model.scope_boxes)))
     
-    all_scope_boxes = []
-    scope_box_collector = FilteredElementCollector(doc).OfCategory(BuiltInCategory.OST_VolumeOfInterest).WhereElementIsNotElementType()
-    for sb in scope_box_collector:
-        try:
-            name = (sb.Name or "").strip()
-            sector_code = parse_sector_code(name)
-            if not sector_code:
-                continue
-            bbox = sb.get_BoundingBox(None)
-            if not bbox:
-                continue
-            all_scope_boxes.append((sector_code, bbox))
-        except:
-            pass
+    if switches.get(SNAPSHOT_SWITCH):
+        snapshot_path = forms.save_file(file_ext='rvsnap',
+                                        default_name=doc.Title or 'model')
+        if snapshot_path:
+            write_snapshot(snapshot_path, model)
+            output.print_md("- Snapshot written: `{}`".format(snapshot_path))
     
-    output.print_md("### Scope Boxes Loaded: {}".format(len(all_scope_boxes)))
+    view_sector = model.meta.get("view_sector")
+    has_rooms = any(model.rooms["in_scope"][i] for i in range(len(model.rooms)))
+    has_doors = len(model.doors) > 0
     
-    def _room_ref_point(room):
+    def run_checks(target):
+        """Validate ``target`` with its saved state; returns (result, state stats)."""
+        # Unchanged rooms, doors and numbering groups reuse the last run's results.
+        state = StateStore(default_state_path(target.meta,
+                                              variant=None if check_rooms else "doors"))
+        if switches.get(FULL_RECHECK_SWITCH):
+            state.clear()
+        with timed("validate.total"):
+            checked = validate_model(target,
+                                     config.catalogue if check_rooms else None,
+                                     config.level_resolver if check_rooms else None,
+                                     validation_mode, view_sector,
+                                     rooms=check_rooms, doors=check_doors, state=state,
+                                     direction_rules=(config.direction_rules
+                                                      if check_doors else None))
         try:
-            bb = room.get_BoundingBox(None) if room else None
-            if bb:
-                return XYZ((bb.Min.X + bb.Max.X) * 0.5,
-                           (bb.Min.Y + bb.Max.Y) * 0.5,
-                           0.0)
-        except:
+            state.save()
+        except (IOError, OSError):
             pass
-        return None
+        return checked, state.stats
     
-    def _door_ref_point(door):
-        try:
-            loc = door.Location
-            if isinstance(loc, LocationPoint):
-                return loc.Point
-            elif isinstance(loc, LocationCurve):
-                curve = loc.Curve
-                if curve:
-                    return curve.Evaluate(0.5, True)
-        except:
-            pass
-        try:
-            bb = door.get_BoundingBox(None)
-            if bb:
-                return XYZ((bb.Min.X + bb.Max.X) * 0.5,
-                           (bb.Min.Y + bb.Max.Y) * 0.5,
-                           0.0)
-        except:
-            pass
-        return None
-    
-    def sectors_overlapping_point(pt, boxes):
-        if pt is None:
-            return []
-        hits = []
-        eps = 0.01
-        for code, bb in boxes:
-            if ((bb.Min.X - eps) <= pt.X <= (bb.Max.X + eps)) and \
-               ((bb.Min.Y - eps) <= pt.Y <= (bb.Max.Y + eps)):
-                hits.append((code, bb))
-        return hits
+    result = host_result = None
+    if all_sectors or view_sector:
+        result, stats = run_checks(model)
+        host_result = result
+        output.print_md("- Incremental: re-checked {} of {} rooms, {} of {} groups, "
+                        "{} of {} doors".format(
+                            stats["rooms"] - stats["rooms_reused"], stats["rooms"],
+                            stats["groups"] - stats["groups_reused"], stats["groups"],
+                            stats["doors"] - stats["doors_reused"], stats["doors"]))
     
-    def resolve_owner_sector_at_point(pt, boxes):
-        overlaps = sectors_overlapping_point(pt, boxes)
-        if not overlaps:
-            return None
-        overlaps.sort(key=lambda x: (x[1].Min.X, x[1].Min.Y))
-        return overlaps[0][0]
+    # --- Linked models: extracted per link (cached by version), placed in host
+    # coordinates and checked against the host's scope boxes ---
+    if result is not None and switches.get(LINKS_SWITCH):
+        result = ValidationResult(host_result.sector).extend(host_result)
+        result.levels = host_result.levels
+        for instance, link_doc in linked_documents(doc):
+            try:
+                with timed("links.total"):
+                    link_model, cached = extract_link_model(
+                        model, instance, link_doc, rooms=check_rooms, doors=check_doors,
+                        excluded_gifa_names=lambda: config.catalogue.names_rejected(
+                            validation_mode))
+                    link_result, _ = run_checks(link_model)
+            except Exception as e:
+                output.print_md("- ⚠️ Linked model `{}` skipped: {}".format(link_doc.Title, e))
+                continue
+            result.extend(link_result, source=link_doc.Title)
+            has_rooms = has_rooms or any(link_model.rooms["in_scope"][i]
+                                         for i in range(len(link_model.rooms)))
+            has_doors = has_doors or len(link_model.doors) > 0
+            output.print_md("- Linked model `{}`: {} rooms, {} doors ({})".format(
+                link_doc.Title, len(link_model.rooms), len(link_model.doors),
+                "cached" if cached else "extracted"))
     
-    def resolve_owner_sector(room, boxes):
-        pt = _room_ref_point(room)
-        return resolve_owner_sector_at_point(pt, boxes)
+    output.print_md("### Config Files Loaded")
+    for line in config.summary():
+        output.print_md(line)
+    output.print_md("")
     
-    # =============================================================
-    # Helper Functions
-    # =============================================================
-    def get_level_code(level):
-        try:
-            if not level:
-                return "???"
-            level_name = (level.Name or "").strip().upper()
-            for _, code in level_map.items():
-                code_str = str(code).upper()
-                if level_name == code_str or level_name.endswith(" " + code_str):
-                    return code_str
-            for _, code in level_map.items():
-                code_str = str(code).upper()
-                if code_str in level_name:
-                    return code_str
-            elevation_mm = level.Elevation * 304.8
-            closest = min(level_map.keys(), key=lambda k: abs(k - elevation_mm))
-            return str(level_map[closest])
-        except Exception as e:
-            output.print_md("- Level mapping error for `{}`: {}".format(level.Name if level else '?', e))
-            return "???"
+    # --- Build the report, then render it in one pass ---
+    report = ReportBuilder()
+    if all_sectors:
+        report.md("### 🔹 Validating Model: `{}`".format(doc.Title))
+    else:
+        report.md("### 🔹 Validating View: `{}`".format(view.Name))
     
-    def get_function_id(name):
-        try:
-            name = (name or "").strip().upper()
-        except:
-            name = ""
-        return function_map.get(name, None)
+    room_tallies = result.tallies(ROOM) if result and has_rooms else {}
+    door_tallies = result.tallies(DOOR) if result and has_doors else {}
+    direction_tallies = result.tallies(DIRECTION) if result and has_doors else {}
+    if result is not None:
+        summary = []
+        if check_rooms:
+            summary.append(("Rooms", room_tallies))
+        if check_doors:
+            summary.extend([("Doors", door_tallies), ("Door directions", direction_tallies)])
+        summary.append(("Duplicate numbers/marks", result.tallies(DUPLICATE)))
+        report.table(["", "OK", "Issues"],
+                     [[title, sum(c[0] for c in tallies.values()),
+                       sum(c[1] for c in tallies.values())]
+                      for title, tallies in summary],
+                     title="Summary")
     
-    def normalize_function_id(fid):
-        try:
-            if fid is None:
-                return None
-            if isinstance(fid, int):
-                return fid
-            s = str(fid).strip()
-            if not s:
-                return None
-            if s.isdigit():
-                return int(s)
-            if s[0].isdigit():
-                return int(s[0])
-        except:
-            pass
-        return None
+    # --- Room Validation ---
+    if check_rooms:
+        report.md("## Room Number Validation")
+        if not has_rooms:
+            report.md("- No rooms found in this view.")
+        elif result is None:
+            report.md("- ⚠️ Could not determine sector code for this view.")
+        else:
+            if not all_sectors:
+                report.md("- Using View Sector: `{}`".format(view_sector))
+            report.findings(ROOM, result.rooms, by_sector=all_sectors)
+            report.md(*["- Level `{}` → `{}` ({}: {})".format(
+                level_name, match.code, match.rule, match.detail)
+                for level_name, match in result.levels])
     
-    def extract_function_id_from_number(room_number):
-        try:
-            parts = (room_number or '').split('-')
-            if len(parts) == 3:
-                tail = parts[2]
-                if tail and tail[0].isdigit():
-                    return int(tail[0])
-        except:
-            pass
-        return None
+    # --- Door Validation ---
+    if check_doors:
+        report.md("## Door Number Validation")
+        print("NOTE: Only check the door number after room numbers are corrected!!")
+        if not has_doors:
+            report.md("- No doors found in this view.")
+        elif result is None:
+            report.md("- ⚠️ Could not determine sector code for this view (doors).")
+        else:
+            report.findings(DOOR, result.doors, by_sector=all_sectors)
     
-    def get_area_category(function_id):
-        fid = normalize_function_id(function_id)
-        if fid is None:
-            return "UNASSIGNED"
-        foh_ids = [1, 5, 6, 8, 9]
-        boh_ids = [2, 3, 7, 8, 9]
-        if fid in foh_ids and fid in boh_ids:
-            return "FOH & BOH"
-        elif fid in foh_ids:
-            return "FOH"
-        elif fid in boh_ids:
-            return "BOH"
+    # --- Door Direction Validation ---
+    if result is not None and has_doors and check_doors and len(config.direction_rules):
+        report.md("## Door Direction Validation")
+        report.md("- \"Flipped\" is Revit's *Facing Flipped*: expected for "
+                  "`flip_contains` / `flip_search_contains` matches, not for "
+                  "`block_flip_equals` matches; doors no rule applies to are not checked.")
+        if result.directions:
+            report.findings(DIRECTION, result.directions, by_sector=all_sectors)
         else:
-            return "UNASSIGNED"
+            report.md("- No doors matched a direction rule.")
     
-    # --- Room Validation ---
-    def validate_rooms(view):
-        output.print_md("## Room Number Validation")
-        rooms = list(FilteredElementCollector(doc, view.Id)
-                     .OfCategory(BuiltInCategory.OST_Rooms)
-                     .WhereElementIsNotElementType())
-        if not rooms:
-            output.print_md("- No rooms found in this view.")
-            return
-        
-        view_sector = None
-        scope_box_param = view.LookupParameter("Scope Box")
-        if scope_box_param and scope_box_param.HasValue:
-            sb_elem = doc.GetElement(scope_box_param.AsElementId())
-            if sb_elem:
-                view_sector = parse_sector_code(sb_elem.Name)
-        
-        if not view_sector:
-            view_sector = parse_sector_code(view.Name or "")
-        
-        if not view_sector:
-            output.print_md("- ⚠️ Could not determine sector code for this view.")
-            return
-        
-        output.print_md("- Using View Sector: `{}`".format(view_sector))
-        
-        valid_count = 0
-        error_count = 0
-        room_data = []
-        
-        for room in rooms:
-            try:
-                rid = room.Id.IntegerValue
-                name_param = room.LookupParameter("Name")
-                number_param = room.LookupParameter("Number")
-                func_param = room.LookupParameter("GIFA NAME")
-                
-                if not (name_param and number_param and func_param):
-                    error_count += 1
-                    continue
-                
-                room_name = (name_param.AsString() or "").strip()
-                room_number = (number_param.AsString() or "").strip()
-                func_name = (func_param.AsString() or "").strip().upper()
-                
-                function_id = get_function_id(func_name)
-                function_id = normalize_function_id(function_id)
-                
-                if function_id is None:
-                    function_id = normalize_function_id(
-                        extract_function_id_from_number(room_number)
-                    )
-                
-                area_cat = get_area_category(function_id)
-                
-                if validation_mode == "FOH" and "FOH" not in area_cat:
-                    continue
-                if validation_mode == "BOH" and "BOH" not in area_cat:
-                    continue
-                
-                level = doc.GetElement(room.LevelId)
-                if not level:
-                    error_count += 1
-                    continue
-                
-                level_code = get_level_code(level)
-                owner_sector = resolve_owner_sector(room, all_scope_boxes)
-                
-                if not owner_sector:
-                    error_count += 1
-                    continue
-                
-                if owner_sector != view_sector:
-                    continue
-                
-                sector = owner_sector
-                pt = None
-                if room.Location:
-                    pt = room.Location.Point
-                else:
-                    bbox = room.get_BoundingBox(None)
-                    if bbox:
-                        pt = XYZ((bbox.Min.X + bbox.Max.X) / 2.0,
-                                 (bbox.Min.Y + bbox.Max.Y) / 2.0,
-                                 0)
-                
-                if not pt:
-                    continue
-                
-                room_data.append((sector, function_id, pt, room,
-                                  level_code, area_cat, room_name, room_number))
-            except Exception:
-                error_count += 1
-        
-        grouped = defaultdict(list)
-        for sector, fid, pt, room, level_code, area_cat, name, number in room_data:
-            grouped[(sector, fid)].append(
-                (pt, room, level_code, area_cat, fid, name, number)
-            )
-        
-        for key, data in grouped.items():
-            data.sort(key=lambda x: -x[0].X)
-            band_tol = 3000.0 / 304.8
-            bands = []
-            current_band = []
-            last_x = None
-            
-            for item in data:
-                pt = item[0]
-                if last_x is None or abs(pt.X - last_x) <= band_tol:
-                    current_band.append(item)
-                else:
-                    bands.append(current_band)
-                    current_band = [item]
-                last_x = pt.X
-            
-            if current_band:
-                bands.append(current_band)
-            
-            sorted_rooms = []
-            for band in bands:
-                band.sort(key=lambda x: -x[0].Y)
-                sorted_rooms.extend(band)
-            
-            for idx, (pt, room, level_code, area_cat,
-                      fid, name, number) in enumerate(sorted_rooms, start=1):
-                rid = room.Id.IntegerValue
-                function_code = "{}{:02d}".format(fid or 0, idx)
-                expected_number = "{}-{}-{}".format(level_code, key[0], function_code)
-                
-                if number != expected_number:
-                    output.print_md(
-                        "• Room [{}](revit://element?id={}) '{}' [{}] Expected `{}` | Found `{}`".format(
-                            rid, rid, name, area_cat, expected_number, number
-                        ))
-                    error_count += 1
-                else:
-                    output.print_md(
-                        "• Room [{}](revit://element?id={}) '{}' [{}] OK".format(
-                            rid, rid, name, area_cat
-                        ))
-                    valid_count += 1
-        
-        output.print_md("")
-        output.print_md("Rooms OK: {}, Issues: {}".format(valid_count, error_count))
-        output.print_md("")
+    # --- Duplicate Room Numbers / Door Marks ---
+    if result is not None and result.duplicates:
+        report.md("## Duplicate Numbers and Marks")
+        if not model.meta.get("document_values"):
+            report.md("- Compared within this view only; tick '{}' to compare "
+                      "against the whole document.".format(DOCUMENT_DUPLICATES_SWITCH))
+        report.findings(DUPLICATE, result.duplicates, by_sector=all_sectors)
     
-    # --- Door Validation ---
-    def get_door_room_with_phase(door, phase_id, from_room=True):
-        try:
-            if from_room:
-                return door.get_ToRoom(phase_id)
-            else:
-                return door.get_FromRoom(phase_id)
-        except:
-            try:
-                if from_room:
-                    return door.ToRoom[new_con_phase]
-                else:
-                    return door.FromRoom[new_con_phase]
-            except:
-                return None
-    #####################################################################
-    def get_reference_room(door):
-        try:
-            to_room = get_door_room_with_phase(door, new_con_phase_id, from_room=False)
-            from_room = get_door_room_with_phase(door, new_con_phase_id, from_room=True)
-        except:
-            return None
-        if to_room and not from_room:
-            return to_room
-        if from_room and not to_room:
-            return from_room
-        return from_room
-    #######################################################################
-    def get_reference_room_for_sector(door, door_sector):
-        try:
-            to_room = get_door_room_with_phase(door, new_con_phase_id, from_room=False)
-            from_room = get_door_room_with_phase(door, new_con_phase_id, from_room=True)
-        except:
-            return None
-        candidates = []
-        if from_room:
-            candidates.append(from_room)
-        if to_room and to_room != from_room:
-            candidates.append(from_room)
-        for r in candidates:
-            rs = resolve_owner_sector(r, all_scope_boxes)
-            if rs == door_sector:
-                return r
-        if to_room and not from_room:
-            return to_room
-        if from_room and not to_room:
-            return from_room
-        return from_room 
+    if all_sectors:
+        sectors = sorted(set(room_tallies) | set(door_tallies), key=sector_sort_key)
+        table = []
+        for sector in sectors:
+            rooms_ok, rooms_bad = room_tallies.get(sector, [0, 0])
+            doors_ok, doors_bad = door_tallies.get(sector, [0, 0])
+            table.append([sector, rooms_ok, rooms_bad, doors_ok, doors_bad])
+        report.table(["Sector", "Rooms OK", "Room Issues", "Doors OK", "Door Issues"],
+                     table, title="Per-Sector Summary")
+    with timed("report.render"):
+        report.render(output)
     
-    def validate_doors(view):
-        output.print_md("## Door Number Validation")
-        print("NOTE: Only check the door number after room numbers are corrected!!")
-        doors = list(FilteredElementCollector(doc, view.Id)
-                     .OfCategory(BuiltInCategory.OST_Doors)
-                     .WhereElementIsNotElementType())
-        if not doors:
-            output.print_md("- No doors found in this view.")
-            return
-        
-        view_sector = None
-        scope_box_param = view.LookupParameter("Scope Box")
-        if scope_box_param and scope_box_param.HasValue:
-            sb_elem = doc.GetElement(scope_box_param.AsElementId())
-            if sb_elem:
-                view_sector = parse_sector_code(sb_elem.Name)
-        
-        if not view_sector:
-            view_sector = parse_sector_code(view.Name or "")
-        
-        if not view_sector:
-            output.print_md("- ⚠️ Could not determine sector code for this view (doors).")
-            return
-        
-        valid_count = 0
-        error_count = 0
-        SKIP_PHRASE = "NOT FOR DOOR SCHEDULE"
-        
-        for door in doors:
-            try:
-                did = door.Id.IntegerValue
-                skip = False
-                try:
-                    if door.Symbol:
-                        type_comments = door.Symbol.get_Parameter(
-                            BuiltInParameter.ALL_MODEL_TYPE_COMMENTS)
-                        if (type_comments and type_comments.HasValue
-                                and SKIP_PHRASE in (type_comments.AsString() or "").upper()):
-                            skip = True
-                    if not skip:
-                        inst_comments = door.LookupParameter("Comments")
-                        if (inst_comments and inst_comments.HasValue
-                                and SKIP_PHRASE in (inst_comments.AsString() or "").upper()):
-                            skip = True
-                except:
-                    pass
-                
-                if skip:
-                    continue
-                
-                door_pt = _door_ref_point(door)
-                door_sector = resolve_owner_sector_at_point(door_pt, all_scope_boxes)
-                
-                if not door_sector:
-                    output.print_md("- Door [{}](revit://element?id={}) could not resolve sector.".format(did, did))
-                    error_count += 1
-                    continue
-                
-                if door_sector != view_sector:
-                    continue
-                
-                mark_param = door.LookupParameter("Mark")
-                if not (mark_param and mark_param.HasValue):
-                    output.print_md("- Door [{}](revit://element?id={}) has no Mark.".format(did, did))
-                    error_count += 1
-                    continue
-                
-                mark = mark_param.AsString() or ""
-                
-                try:
-                    to_room = get_door_room_with_phase(door, new_con_phase_id, from_room=False)
-                    from_room = get_door_room_with_phase(door, new_con_phase_id, from_room=True)
-                except:
-                    to_room = None
-                    from_room = None
-                
-                ref_room = None
-                if to_room and not from_room:
-                    ref_room = to_room
-                elif from_room and not to_room:
-                    ref_room = from_room
-                elif from_room and to_room:
-                    ref_room = from_room
-                
-                if not ref_room:
-                    output.print_md("- Door [{}](revit://element?id={}) has no room reference.".format(did, did))
-                    error_count += 1
-                    continue
-                
-                num_param = ref_room.LookupParameter("Number")
-                if not (num_param and num_param.HasValue):
-                    output.print_md("- Door [{}](revit://element?id={}) reference room missing Number.".format(did, did))
-                    error_count += 1
-                    continue
-                
-                room_number = num_param.AsString() or ""
-                
-                ref_room_name = ""
-                try:
-                    name_param = ref_room.LookupParameter("Name")
-                    if name_param and name_param.HasValue:
-                        ref_room_name = name_param.AsString() or ""
-                except:
-                    pass
-                
-                pattern = r'^{}[A-Z]?$'.format(re.escape(room_number))
-                if not re.match(pattern, mark):
-                    output.print_md(
-                        "• Door [{}](revit://element?id={}) → Room '{}' [{}] Expected `{}`[A-Z] | Found `{}`".format(
-                            did, did, ref_room_name, room_number, room_number, mark))
-                    error_count += 1
-                else:
-                    valid_count += 1
-            except Exception as e:
-                output.print_md("- Error validating Door [{}]: {}".format(did, e))
-                error_count += 1
-        
-        output.print_md("")
-        output.print_md("Doors OK: {}, Issues: {}".format(valid_count, error_count))
-        output.print_md("")
+    if result is not None and switches.get(EXPORT_SWITCH):
+        export_path = forms.save_file(file_ext='csv',
+                                      default_name=(doc.Title or 'model') + '_validation')
+        if export_path:
+            export_result(result, export_path)
+            json_path = os.path.splitext(export_path)[0] + '.json'
+            export_result(result, json_path, model.meta)
+            output.print_md("- Results written: `{}`, `{}`".format(export_path, json_path))
+    
+    # --- Auto-renumber: show the full plan, then write it in one transaction ---
+    if host_result is not None and switches.get(RENUMBER_SWITCH):
+        # Linked documents are read-only here; only host elements are renumbered.
+        from renumber import build_plan
+        with timed("renumber.plan"):
+            plan = build_plan(model, host_result)
+        plan_report = ReportBuilder()
+        plan_report.md("## Renumber Plan")
+        if not len(plan):
+            plan_report.md("- Nothing to renumber.")
+        else:
+            plan_report.table(["Parameter", "Sector", "Element", "Old", "New"],
+                              plan.diff_rows(), title="Changes (dry run)")
+            for target, dupes in sorted(plan.duplicates().items()):
+                plan_report.md("- ⚠️ {} values still shared after the fix: {}".format(
+                    target, ", ".join("`{}`".format(v) for v in sorted(dupes))))
+        if plan.skipped:
+            plan_report.listing("Not planned ({})".format(len(plan.skipped)),
+                                ["{} {}: {}".format(kind, element_id, reason)
+                                 for kind, element_id, reason in plan.skipped])
+        plan_report.render(output)
+        if len(plan) and forms.alert("Apply {} changes ({} rooms, {} doors) in one "
+                                     "transaction?".format(len(plan), len(plan.room_changes),
+                                                           len(plan.door_changes)),
+                                     yes=True, no=True):
+            from revit_apply import apply_plan
+            written, failures = apply_plan(doc, plan)
+            output.print_md("- Renumbered {} of {} elements; re-run to validate.".format(
+                written, len(plan)))
+            for element_id, reason in failures:
+                output.print_md("- ⚠️ Element `{}`: {}".format(element_id, reason))
     
-    # --- Run Validations ---
-    output.print_md("### 🔹 Validating View: `{}`".format(view.Name))
-    validate_rooms(view)
-    validate_doors(view)
+    if switches.get(TIMINGS_SWITCH):
+        timing_report = ReportBuilder()
+        timing_report.timings(STATS)
+        timing_report.render(output)
     output.print_md("---")
     output.print_md("Validation completed.")
 
@@ -547,4 +302,16 @@ except Exception as e:
     import traceback
     output = script.get_output()
     output.print_md("### Script Error")
-    output.print_md("```\n{}\n```".format(traceback.format_exc()))
\ No newline at end of file
+    output.print_md("```\n{}\n```".format(traceback.format_exc()))
+finally:
+    # A failed run is the one most worth profiling, so the profile is always
+    # written; a profile that cannot be written must not hide the run's error.
+    try:
+        if profiler is not None:
+            try:
+                output.print_md("- Profile written: `{}`".format(profiler.stop()))
+            except Exception as e:
+                output.print_md("- ⚠️ Profile not written: {}".format(e))
+    finally:
+        if config is not None:
+            config.close()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Uniform-grid index answering point -> owner sector queries.
+
+Built once from the model's ``100_XXXX`` scope boxes.  Each box is stored
+with its axis-aligned XY extent (used for the grid and for the Min.X/Min.Y
+ownership tie-break) and, for rotated boxes, the inverse of its plan
+transform so containment is tested in the box's own frame.
+"""
+import math
+import re
+
+EPS = 0.01
+_ROTATION_TOL = 1e-9
+
+
+def parse_sector_code(text):
+    """Four-digit sector code from a '100_XXXX' scope box or view name."""
+    if not text:
+        return None
+    t = (text or "").strip()
+    m = re.match(r'^100_(\d{4})$', t)
+    if m:
+        return m.group(1)
+    m = re.search(r'100_(\d{4})', t)
+    return m.group(1) if m else None
+
+
+class SectorBox(object):
+    """One scope box footprint in plan."""
+    __slots__ = ("code", "min_x", "min_y", "max_x", "max_y", "frame", "order")
+
+    def __init__(self, code, min_x, min_y, max_x, max_y, frame=None, order=0):
+        self.code = code
+        self.min_x = min_x
+        self.min_y = min_y
+        self.max_x = max_x
+        self.max_y = max_y
+        # (origin_x, origin_y, ux, uy, vx, vy, length_u, length_v) or None
+        self.frame = frame
+        self.order = order
+
+    def sort_key(self):
+        return (self.min_x, self.min_y, self.order)
+
+    def contains(self, x, y, eps=EPS):
+        if not ((self.min_x - eps) <= x <= (self.max_x + eps) and
+                (self.min_y - eps) <= y <= (self.max_y + eps)):
+            return False
+        if self.frame is None:
+            return True
+        ox, oy, ux, uy, vx, vy, length_u, length_v = self.frame
+        dx = x - ox
+        dy = y - oy
+        s = dx * ux + dy * uy
+        t = dx * vx + dy * vy
+        return (-eps <= s <= length_u + eps) and (-eps <= t <= length_v + eps)
+
+
+def box_from_corners(code, corners, order=0):
+    """Build a SectorBox from the four XY corners of a (possibly rotated) box.
+
+    Falls back to the axis-aligned extent when the corners do not form a
+    rectangle, and drops the frame when the box is not actually rotated.
+    """
+    xs = [c[0] for c in corners]
+    ys = [c[1] for c in corners]
+    box = SectorBox(code, min(xs), min(ys), max(xs), max(ys), order=order)
+    if len(corners) != 4:
+        return box
+
+    cx = sum(xs) / 4.0
+    cy = sum(ys) / 4.0
+    ring = sorted(corners, key=lambda c: math.atan2(c[1] - cy, c[0] - cx))
+    ox, oy = ring[0]
+    ax, ay = ring[1][0] - ox, ring[1][1] - oy
+    bx, by = ring[3][0] - ox, ring[3][1] - oy
+    length_u = math.hypot(ax, ay)
+    length_v = math.hypot(bx, by)
+    if length_u <= 0.0 or length_v <= 0.0:
+        return box
+    ux, uy = ax / length_u, ay / length_u
+    vx, vy = bx / length_v, by / length_v
+    # Opposite corner must close the rectangle and the sides be square.
+    if (abs(ux * vx + uy * vy) > 1e-6 or
+            abs(ring[2][0] - (ox + ax + bx)) > 1e-6 or
+            abs(ring[2][1] - (oy + ay + by)) > 1e-6):
+        return box
+    if min(abs(ux), abs(uy)) <= _ROTATION_TOL:
+        return box
+    box.frame = (ox, oy, ux, uy, vx, vy, length_u, length_v)
+    return box
+
+
+class SectorIndex(object):
+    """Grid of scope boxes; each cell lists its boxes in tie-break order."""
+
+    def __init__(self, boxes, cell_size=None, eps=EPS):
+        self.boxes = list(boxes)
+        self.eps = eps
+        self._cells = {}
+        if not self.boxes:
+            self.cell_size = 1.0
+            self._x0 = self._y0 = 0.0
+            return
+
+        if cell_size is None:
+            spans = sorted(max(b.max_x - b.min_x, b.max_y - b.min_y)
+                           for b in self.boxes)
+            cell_size = spans[len(spans) // 2]
+        self.cell_size = max(float(cell_size), 1.0)
+        self._x0 = min(b.min_x for b in self.boxes) - eps
+        self._y0 = min(b.min_y for b in self.boxes) - eps
+
+        for box in sorted(self.boxes, key=SectorBox.sort_key):
+            i0, j0 = self._cell(box.min_x - eps, box.min_y - eps)
+            i1, j1 = self._cell(box.max_x + eps, box.max_y + eps)
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    self._cells.setdefault((i, j), []).append(box)
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def _cell(self, x, y):
+        return (int(math.floor((x - self._x0) / self.cell_size)),
+                int(math.floor((y - self._y0) / self.cell_size)))
+
+    def overlapping(self, x, y):
+        """All boxes containing (x, y), sorted by the ownership tie-break."""
+        candidates = self._cells.get(self._cell(x, y), ())
+        return [b for b in candidates if b.contains(x, y, self.eps)]
+
+    def owner(self, x, y):
+        """Sector code owning (x, y): the hit with the lowest Min.X, Min.Y."""
+        for box in self._cells.get(self._cell(x, y), ()):
+            if box.contains(x, y, self.eps):
+                return box.code
+        return None
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Per-document store of element input hashes and last validation results.
+
+The engine hashes the inputs it reads for each room and door and keeps the
+outcome next to the hash.  On the next run unchanged elements reuse their
+outcome, and a ``(sector, function_id)`` group is only renumbered when one
+of its members (or its membership) changed.  Everything is invalidated
+when the run context changes: config maps, levels, scope boxes or mode.
+Runs over part of the model (one view's sector) only replace the entries
+they touched.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+STATE_VERSION = 1
+DEFAULT_STATE_DIR = os.path.join(tempfile.gettempdir(),
+                                 "validators-for-revit-cache", "state")
+
+
+def stable_hash(*values):
+    """Short hex digest of ``values`` (repr-based, stable across runs)."""
+    return hashlib.sha1(repr(values).encode("utf-8")).hexdigest()[:20]
+
+
+def default_state_path(meta, state_dir=None, variant=None):
+    """State file for a model, keyed by its path (or title when unsaved).
+
+    Runs with a different context (e.g. door-only runs) pass a ``variant``
+    so they keep their own file instead of invalidating the main one.
+    """
+    key = meta.get("path") or meta.get("title") or "untitled"
+    name = "{}{}.json".format(stable_hash(key), "-" + variant if variant else "")
+    return os.path.join(state_dir or DEFAULT_STATE_DIR, name)
+
+
+class StateStore(object):
+    """Element hashes and outcomes from the previous run of one document."""
+
+    TABLES = ("rooms", "groups", "doors")
+
+    def __init__(self, path):
+        self.path = path
+        self.context = None
+        self._stored = dict((name, {}) for name in self.TABLES)
+        self._current = dict((name, {}) for name in self.TABLES)
+        self.stats = {"rooms": 0, "rooms_reused": 0,
+                      "groups": 0, "groups_reused": 0,
+                      "doors": 0, "doors_reused": 0}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as fh:
+                data = json.load(fh)
+        except (IOError, OSError, ValueError):
+            return
+        if data.get("version") != STATE_VERSION:
+            return
+        self.context = data.get("context")
+        for name in self.TABLES:
+            self._stored[name] = data.get(name) or {}
+
+    def clear(self):
+        """Forget every stored outcome, so the next run re-checks everything."""
+        self.context = None
+        self._stored = dict((name, {}) for name in self.TABLES)
+
+    def begin(self, context):
+        """Start a run; stored outcomes only survive an unchanged context."""
+        if context != self.context:
+            self.context = context
+            self._stored = dict((name, {}) for name in self.TABLES)
+        self._current = dict((name, {}) for name in self.TABLES)
+        for key in self.stats:
+            self.stats[key] = 0
+
+    def _lookup(self, table, key, input_hash):
+        self.stats[table] += 1
+        entry = self._stored[table].get(str(key))
+        if entry is not None and entry[0] == input_hash:
+            self.stats[table + "_reused"] += 1
+            self._current[table][str(key)] = entry
+            return True, entry[1]
+        return False, None
+
+    def _set(self, table, key, input_hash, value):
+        self._current[table][str(key)] = [input_hash, value]
+
+    def room(self, element_id, input_hash):
+        """(hit, stored outcome) for a room."""
+        return self._lookup("rooms", element_id, input_hash)
+
+    def set_room(self, element_id, input_hash, outcome):
+        self._set("rooms", element_id, input_hash, outcome)
+
+    def group(self, key, group_hash):
+        """(hit, stored findings) for a (sector, function id) group."""
+        return self._lookup("groups", key, group_hash)
+
+    def set_group(self, key, group_hash, findings):
+        self._set("groups", key, group_hash, findings)
+
+    def door(self, element_id, input_hash):
+        """(hit, stored outcome) for a door."""
+        return self._lookup("doors", element_id, input_hash)
+
+    def set_door(self, element_id, input_hash, outcome):
+        self._set("doors", element_id, input_hash, outcome)
+
+    def save(self):
+        """Write stored and current entries, replacing the file atomically."""
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        tmp_path = self.path + ".tmp"
+        data = {"version": STATE_VERSION, "context": self.context}
+        for name in self.TABLES:
+            # Keep entries from runs that only covered part of the model.
+            merged = dict(self._stored[name])
+            merged.update(self._current[name])
+            data[name] = merged
+        with open(tmp_path, "w") as fh:
+            json.dump(data, fh, separators=(",", ":"))
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        os.rename(tmp_path, self.path)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Door direction rules: workbook columns, matching order and flip expectation.
+
+Run from the tool folder with ``python -m pytest tests``.
+"""
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "benchmarks"))
+
+from door_direction import (BLOCK_FLIP_EQUALS, FLIP_CONTAINS, FLIP_SEARCH_CONTAINS,
+                            DoorDirectionRules, FlipRule)
+from door_rules_reader import read_door_direction_rules
+from synthetic import write_xlsx
+
+RULES = {
+    FLIP_CONTAINS: ["STAIR"],
+    FLIP_SEARCH_CONTAINS: ["FIRE 90"],
+    BLOCK_FLIP_EQUALS: ["STAIR CORE", "DOUBLE LEAF"],
+}
+
+
+def test_room_name_phrase_expects_flip():
+    rules = DoorDirectionRules(RULES)
+    assert rules.expected("Stair 1", "Single Door") == FlipRule(True, FLIP_CONTAINS, "STAIR")
+    assert rules.expected("  stair 2 ", "") == FlipRule(True, FLIP_CONTAINS, "STAIR")
+
+
+def test_search_text_phrase_expects_flip():
+    rules = DoorDirectionRules(RULES)
+    assert (rules.expected("Office", "Door FIRE 90 min") ==
+            FlipRule(True, FLIP_SEARCH_CONTAINS, "FIRE 90"))
+
+
+def test_block_wins_over_flip_phrases():
+    rules = DoorDirectionRules(RULES)
+    # "STAIR CORE" also contains "STAIR", but an exact block comes first.
+    assert rules.expected("Stair Core", "Door FIRE 90") == FlipRule(False, BLOCK_FLIP_EQUALS,
+                                                                    "STAIR CORE")
+    assert rules.expected("Stair 1", "x", "Double Leaf") == FlipRule(False, BLOCK_FLIP_EQUALS,
+                                                                     "DOUBLE LEAF")
+
+
+def test_no_rule_means_not_checked():
+    rules = DoorDirectionRules(RULES)
+    assert rules.expected("Office", "Single Door") is None
+    assert rules.expected(None, None) is None
+    empty = DoorDirectionRules(None)
+    assert len(empty) == 0
+    assert empty.expected("Stair 1", "Door FIRE 90") is None
+
+
+def test_workbook_columns(tmpdir):
+    path = str(tmpdir.join("door_direction_rules.xlsx"))
+    write_xlsx(path, [["Flip if room contains", "Flip if type contains", "Never flip"],
+                      [" stair ", "fire 90", "Stair Core"],
+                      [None, None, "double leaf"],
+                      [],
+                      ["LOBBY", None, None]])
+    rules = read_door_direction_rules(path)
+    # Reading stops at the first empty row.
+    assert rules == RULES
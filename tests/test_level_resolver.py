@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Level code rules: exact, suffix, contains, nearest elevation and memo keys.
+
+Run from the tool folder with ``python -m pytest tests``.
+"""
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from level_resolver import (FEET_TO_MM, RULE_CONTAINS, RULE_ELEVATION, RULE_EXACT,
+                            RULE_NONE, RULE_SUFFIX, UNKNOWN_CODE, LevelMatch,
+                            LevelResolver)
+
+# Elevations in mm, as read_level_map returns them.
+LEVEL_MAP = {0.0: "L00", 4000.0: "L01", 6000.0: "L01M", 8000.0: "L02"}
+
+
+def _ft(mm):
+    return mm / FEET_TO_MM
+
+
+def test_exact_name():
+    resolver = LevelResolver(LEVEL_MAP)
+    assert resolver.resolve(1, " l01m ", None) == LevelMatch("L01M", RULE_EXACT, "L01M")
+
+
+def test_suffix_after_a_space():
+    resolver = LevelResolver(LEVEL_MAP)
+    assert resolver.resolve(1, "Level 2 L02", None) == LevelMatch("L02", RULE_SUFFIX, "L02")
+    # The longest tail is tried first.
+    assert resolver.resolve(2, "Mezz L01 L01M", None).code == "L01M"
+
+
+def test_contains_prefers_the_longest_code():
+    resolver = LevelResolver(LEVEL_MAP)
+    assert resolver.resolve(1, "XL01M-MEZZ", None) == LevelMatch("L01M", RULE_CONTAINS, "L01M")
+    assert resolver.resolve(2, "XL01-FLOOR", None) == LevelMatch("L01", RULE_CONTAINS, "L01")
+
+
+def test_name_wins_over_elevation():
+    resolver = LevelResolver(LEVEL_MAP)
+    assert resolver.resolve(1, "Level L00", _ft(8000.0)).code == "L00"
+
+
+def test_nearest_elevation():
+    resolver = LevelResolver(LEVEL_MAP)
+    assert resolver.resolve(1, "Roof", _ft(7900.0)) == LevelMatch("L02", RULE_ELEVATION,
+                                                                  "8000 mm")
+    assert resolver.resolve(2, "Basement", _ft(-3000.0)).code == "L00"
+    assert resolver.resolve(3, "Plant", _ft(20000.0)).code == "L02"
+    # Half way between two entries goes to the lower one.
+    assert resolver.resolve(4, "Between", _ft(5000.0)).code == "L01"
+
+
+def test_no_match():
+    resolver = LevelResolver(LEVEL_MAP)
+    assert resolver.resolve(1, "Roof", None) == LevelMatch(UNKNOWN_CODE, RULE_NONE, "no match")
+    empty = LevelResolver({})
+    assert empty.resolve(1, "Roof", 10.0) == LevelMatch(UNKNOWN_CODE, RULE_NONE,
+                                                        "no level map entries")
+
+
+def test_memo_is_per_key():
+    resolver = LevelResolver(LEVEL_MAP)
+    # The same level id in two documents resolves separately.
+    assert resolver.resolve(("host", 7), "Level L00", None).code == "L00"
+    assert resolver.resolve(("link", 7), "Level L02", None).code == "L02"
+    # A repeated key returns the memoized match whatever is passed.
+    assert resolver.resolve(("host", 7), "Level L02", None).code == "L00"
+    assert resolver.explain() == [("Level L00", LevelMatch("L00", RULE_SUFFIX, "L00")),
+                                  ("Level L02", LevelMatch("L02", RULE_SUFFIX, "L02"))]
+
+
+def test_fingerprint_follows_the_map():
+    assert LevelResolver(LEVEL_MAP).fingerprint() == LevelResolver(dict(LEVEL_MAP)).fingerprint()
+    changed = dict(LEVEL_MAP)
+    changed[8000.0] = "L03"
+    assert LevelResolver(changed).fingerprint() != LevelResolver(LEVEL_MAP).fingerprint()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Room numbering order: banding, ties and NumPy/pure-Python agreement.
+
+Run from the tool folder with ``python -m pytest tests``; the NumPy cases
+are skipped when NumPy is not installed.
+"""
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import pytest
+
+import numbering
+from numbering import BAND_TOLERANCE, NUMPY_MIN_ROOMS, band_order, number_group
+
+needs_numpy = pytest.mark.skipif(numbering.np is None, reason="NumPy is not installed")
+
+
+def _random_group(rng, size):
+    # Coarse grids give many equal X/Y values, so tie order is exercised too.
+    xs = [rng.randint(0, 40) * BAND_TOLERANCE / 3 for _ in range(size)]
+    ys = [rng.randint(0, 10) * 2.0 for _ in range(size)]
+    return xs, ys
+
+
+def test_bands_by_descending_x_then_y():
+    xs = [0.0, 100.0, 100.0 + BAND_TOLERANCE / 2, 0.0 + BAND_TOLERANCE, 50.0]
+    ys = [5.0, 1.0, 2.0, 9.0, 3.0]
+    # Bands: {2, 1} (x ~ 100), {4}, {3, 0} (within tolerance of each other).
+    assert band_order(xs, ys, use_numpy=False) == [2, 1, 4, 3, 0]
+
+
+def test_chained_band_and_ties_keep_input_order():
+    step = BAND_TOLERANCE * 0.9
+    xs = [0.0, step, 2 * step, 2 * step]
+    ys = [1.0, 1.0, 1.0, 1.0]
+    # Each room is within tolerance of the previous one, so all share a band.
+    assert band_order(xs, ys, use_numpy=False) == [2, 3, 1, 0]
+
+
+def test_rows_restrict_the_group():
+    xs = [0.0, 100.0, 200.0, 300.0]
+    ys = [0.0, 0.0, 0.0, 0.0]
+    assert band_order(xs, ys, use_numpy=False, rows=[0, 2]) == [2, 0]
+
+
+def test_number_format():
+    assert number_group([10.0, 200.0], [0.0, 0.0], ["L01", "L02"], "0001", 7,
+                        use_numpy=False) == [(1, "L02-0001-701"), (0, "L01-0001-702")]
+    assert number_group([0.0], [0.0], ["L00"], "0002", None,
+                        use_numpy=False) == [(0, "L00-0002-001")]
+
+
+def test_small_groups_use_python_by_default(monkeypatch):
+    monkeypatch.setattr(numbering, "np", None)
+    xs, ys = _random_group(random.Random(1), NUMPY_MIN_ROOMS - 1)
+    assert band_order(xs, ys) == band_order(xs, ys, use_numpy=False)
+    with pytest.raises(RuntimeError):
+        band_order(xs, ys, use_numpy=True)
+
+
+@needs_numpy
+def test_numpy_and_python_paths_agree():
+    rng = random.Random(11)
+    for size in (1, 2, 5, NUMPY_MIN_ROOMS - 1, NUMPY_MIN_ROOMS, 300, 2000):
+        xs, ys = _random_group(rng, size)
+        expected = band_order(xs, ys, use_numpy=False)
+        assert band_order(xs, ys, use_numpy=True) == expected
+        rows = sorted(rng.sample(range(size), max(1, size // 2)))
+        assert (band_order(xs, ys, use_numpy=True, rows=rows) ==
+                band_order(xs, ys, use_numpy=False, rows=rows))
+
+
+@needs_numpy
+def test_large_group_default_matches_python():
+    xs, ys = _random_group(random.Random(5), NUMPY_MIN_ROOMS * 4)
+    codes = ["L%02d" % (i % 3) for i in range(len(xs))]
+    assert (number_group(xs, ys, codes, "0003", 12) ==
+            number_group(xs, ys, codes, "0003", 12, use_numpy=False))
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Write ordering of renumber plans: duplicates, swaps and cycles.
+
+Run from the tool folder with ``python -m pytest tests``.
+"""
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "benchmarks"))
+
+from renumber import TEMP_PREFIX, Change, order_assignments
+
+
+def _changes(*specs):
+    return [Change("t", element_id, old, new, None) for element_id, old, new in specs]
+
+
+def _replay(changes, holders, steps):
+    """Apply ``steps`` to ``holders``; check each write and the end state."""
+    current = {}
+    for value, ids in holders.items():
+        for element_id in ids:
+            current[element_id] = value
+    targets = dict((c.element_id, c.new) for c in changes)
+    done = set()
+    for element_id, value in steps:
+        if not value.startswith(TEMP_PREFIX):
+            assert targets[element_id] == value
+            others = [b for b, v in current.items() if v == value and b != element_id]
+            moving = [b for b in others if b in targets and b not in done]
+            # Only a value that is already shared may gain a holder that is still to move.
+            assert not moving or len(others) > 1, (element_id, value, others)
+            done.add(element_id)
+        current[element_id] = value
+    assert done == set(targets)
+    for element_id, value in targets.items():
+        assert current[element_id] == value
+    return current
+
+
+def test_duplicate_holders_resolve_without_parking():
+    changes = _changes((1, "x", "y"), (2, "x", "y"), (3, "y", "x"))
+    holders = {"x": {1, 2}, "y": {3}}
+    steps = order_assignments(changes, holders)
+    _replay(changes, holders, steps)
+    assert steps == [(3, "x"), (2, "y"), (1, "y")]
+
+
+def test_swap_goes_through_one_temporary_value():
+    changes = _changes((1, "a", "b"), (2, "b", "a"))
+    holders = {"a": {1}, "b": {2}}
+    steps = order_assignments(changes, holders)
+    _replay(changes, holders, steps)
+    assert steps == [(1, TEMP_PREFIX + "1"), (2, "a"), (1, "b")]
+
+
+def test_swap_with_duplicate_holder():
+    # 1 and 2 share "a", so 3 can join them before 1 moves to "b".
+    changes = _changes((1, "a", "b"), (3, "b", "a"))
+    holders = {"a": {1, 2}, "b": {3}}
+    steps = order_assignments(changes, holders)
+    _replay(changes, holders, steps)
+    assert steps == [(3, "a"), (1, "b")]
+
+
+def test_chain_needs_no_temporary_value():
+    changes = _changes(*[(n, "v%d" % n, "v%d" % (n + 1)) for n in range(1000)])
+    holders = dict(("v%d" % n, {n}) for n in range(1000))
+    steps = order_assignments(changes, holders)
+    _replay(changes, holders, steps)
+    assert len(steps) == 1000
+
+
+def test_random_plans_terminate():
+    rng = random.Random(7)
+    for _ in range(300):
+        values = ["v%d" % n for n in range(rng.randint(2, 6))]
+        ids = range(rng.randint(2, 12))
+        holders = {}
+        for element_id in ids:
+            holders.setdefault(rng.choice(values), set()).add(element_id)
+        current = dict((e, v) for v, es in holders.items() for e in es)
+        changes = []
+        for element_id in ids:
+            new = rng.choice(values)
+            if new != current[element_id] and rng.random() < 0.7:
+                changes.append(Change("t", element_id, current[element_id], new, None))
+        steps = order_assignments(changes, holders)
+        _replay(changes, holders, steps)
+        parks = sum(1 for _, v in steps if v.startswith(TEMP_PREFIX))
+        assert parks <= len(changes)
+
+
+def test_synthetic_model_plan_applies():
+    import fake_revit
+    fake_revit.install()
+    import synthetic
+    from function_catalogue import FunctionCatalogue
+    from level_resolver import LevelResolver
+    from revit_apply import apply_plan
+    from revit_extract import extract_model
+    from renumber import build_plan
+    from validation_engine import DOOR, ROOM, UNRESOLVED_SECTOR, validate_model
+
+    catalogue = FunctionCatalogue(dict((n, str(f)) for n, f, _ in synthetic.gifa_names(90)))
+    resolver = LevelResolver(dict((n * synthetic.LEVEL_HEIGHT, "L%02d" % n)
+                                  for n in range(4)))
+    doc, phase = synthetic.make_document(rooms=800, sectors=9, levels=4, seed=5)
+    model = extract_model(doc, None, phase, True)
+    plan = build_plan(model, validate_model(model, catalogue, resolver))
+    written, failures = apply_plan(doc, plan)
+    assert written == len(plan) and not failures
+
+    after = validate_model(extract_model(doc, None, phase, True), catalogue, resolver)
+    for kind in (ROOM, DOOR):
+        tallies = after.tallies(kind)
+        assert sum(c[1] for sector, c in tallies.items() if sector != UNRESOLVED_SECTOR) == 0
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""Point -> sector lookups: rotated boxes, tie-breaks and code parsing.
+
+Run from the tool folder with ``python -m pytest tests``.
+"""
+import math
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from sector_index import EPS, SectorBox, SectorIndex, box_from_corners, parse_sector_code
+
+
+def _rotated_corners(cx, cy, half_u, half_v, degrees):
+    a = math.radians(degrees)
+    ux, uy = math.cos(a), math.sin(a)
+    vx, vy = -uy, ux
+    return [(cx + su * half_u * ux + sv * half_v * vx, cy + su * half_u * uy + sv * half_v * vy)
+            for su, sv in ((-1, -1), (1, -1), (1, 1), (-1, 1))]
+
+
+def test_parse_sector_code():
+    assert parse_sector_code("100_0001") == "0001"
+    assert parse_sector_code("Level 2 - 100_0304 plan") == "0304"
+    assert parse_sector_code("100_12") is None
+    assert parse_sector_code(None) is None
+
+
+def test_rotated_box_tests_its_own_frame():
+    box = box_from_corners("0001", _rotated_corners(0.0, 0.0, 10.0, 2.0, 45.0))
+    assert box.frame is not None
+    index = SectorIndex([box])
+    assert index.owner(0.0, 0.0) == "0001"
+    assert index.owner(6.0, 6.0) == "0001"
+    # Inside the axis-aligned extent, outside the rotated footprint.
+    assert index.owner(6.0, -6.0) is None
+    assert index.owner(-6.0, 6.0) is None
+
+
+def test_axis_aligned_corners_drop_the_frame():
+    box = box_from_corners("0001", [(0, 0), (10, 0), (10, 5), (0, 5)])
+    assert box.frame is None
+    assert (box.min_x, box.min_y, box.max_x, box.max_y) == (0, 0, 10, 5)
+
+
+def test_not_a_rectangle_falls_back_to_extent():
+    box = box_from_corners("0001", [(0, 0), (10, 0), (12, 5), (0, 5)])
+    assert box.frame is None
+    assert box.contains(11.0, 4.0)
+
+
+def test_overlap_goes_to_lowest_min_x_then_min_y():
+    boxes = [SectorBox("0003", 5, 0, 15, 10, order=0),
+             SectorBox("0002", 0, 2, 10, 10, order=1),
+             SectorBox("0001", 0, 0, 10, 10, order=2)]
+    index = SectorIndex(boxes)
+    assert index.owner(7, 5) == "0001"
+    assert [b.code for b in index.overlapping(7, 5)] == ["0001", "0002", "0003"]
+    assert index.owner(12, 5) == "0003"
+
+
+def test_identical_boxes_keep_model_order():
+    index = SectorIndex([SectorBox("0002", 0, 0, 10, 10, order=0),
+                         SectorBox("0001", 0, 0, 10, 10, order=1)])
+    assert index.owner(5, 5) == "0002"
+
+
+def test_shared_edge_within_eps():
+    index = SectorIndex([SectorBox("0001", 0, 0, 10, 10, order=0),
+                         SectorBox("0002", 10, 0, 20, 10, order=1)])
+    assert index.owner(10.0, 5.0) == "0001"
+    assert index.owner(10.0 + EPS / 2, 5.0) == "0001"
+    assert index.owner(10.0 + 2 * EPS, 5.0) == "0002"
+    assert index.owner(20.0 + 2 * EPS, 5.0) is None
+
+
+def test_grid_matches_linear_scan():
+    rng = random.Random(3)
+    boxes = []
+    for n in range(40):
+        cx, cy = rng.uniform(0, 200), rng.uniform(0, 200)
+        corners = _rotated_corners(cx, cy, rng.uniform(2, 30), rng.uniform(2, 30),
+                                   rng.choice([0.0, 15.0, 30.0, 90.0]))
+        boxes.append(box_from_corners("%04d" % n, corners, order=n))
+    index = SectorIndex(boxes)
+    ranked = sorted(boxes, key=SectorBox.sort_key)
+    for _ in range(2000):
+        x, y = rng.uniform(-10, 210), rng.uniform(-10, 210)
+        expected = next((b.code for b in ranked if b.contains(x, y)), None)
+        assert index.owner(x, y) == expected
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Saved validation state: reuse of unchanged elements and invalidation.
+
+Run from the tool folder with ``python -m pytest tests``.
+"""
+import json
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from function_catalogue import FunctionCatalogue
+from level_resolver import LevelResolver
+from model_snapshot import ModelData
+from state_store import StateStore, default_state_path, stable_hash
+from validation_engine import validate_model
+
+CATALOGUE = FunctionCatalogue({"OFFICE": "1", "LOBBY": "2.0"})
+
+
+def _model(seed=3):
+    rng = random.Random(seed)
+    model = ModelData(meta={"title": "T", "view_sector": None, "scope": "model"})
+    model.levels.append(id=1, name="Level L01", elevation=0.0)
+    model.scope_boxes.append(code="0001", min_x=0, min_y=0, max_x=100, max_y=100)
+    model.scope_boxes.append(code="0002", min_x=100, min_y=0, max_x=200, max_y=100)
+    for i in range(60):
+        x, y = rng.uniform(0, 200), rng.uniform(0, 100)
+        model.rooms.append(id=1000 + i, level_id=1, x=x, y=y, sx=x, sy=y,
+                           name="Rm %d" % i, gifa=rng.choice(["OFFICE", "LOBBY"]),
+                           number="L01-%04d-%d%02d" % (1 if x < 100 else 2, 1, i % 20),
+                           has_params=1, in_scope=1)
+    for i in range(30):
+        model.doors.append(id=2000 + i, x=0.0, y=0.0, to_room=1000 + i, from_room=-1,
+                           mark="L01-0001-1%02dA" % (i % 20))
+    return model
+
+
+def _run(path, model, level_map=None, **kwargs):
+    store = StateStore(path)
+    result = validate_model(model, CATALOGUE, LevelResolver(level_map or {0: "L01"}),
+                            state=store, **kwargs)
+    store.save()
+    return result, dict(store.stats)
+
+
+def _plain(model, level_map=None, **kwargs):
+    return validate_model(model, CATALOGUE, LevelResolver(level_map or {0: "L01"}), **kwargs)
+
+
+def test_store_round_trip_and_hash_mismatch(tmpdir):
+    path = str(tmpdir.join("state.json"))
+    store = StateStore(path)
+    store.begin("ctx")
+    store.set_room(1, "h1", ["skip"])
+    store.set_door(2, "h2", ["skip"])
+    store.save()
+
+    store = StateStore(path)
+    store.begin("ctx")
+    assert store.room(1, "h1") == (True, ["skip"])
+    assert store.room(1, "changed") == (False, None)
+    assert store.door(2, "h2") == (True, ["skip"])
+    assert store.stats["rooms"] == 2 and store.stats["rooms_reused"] == 1
+
+
+def test_new_context_clear_and_bad_files(tmpdir):
+    path = str(tmpdir.join("state.json"))
+    store = StateStore(path)
+    store.begin("ctx")
+    store.set_room(1, "h1", ["skip"])
+    store.save()
+
+    store = StateStore(path)
+    store.begin("other")
+    assert store.room(1, "h1") == (False, None)
+    store = StateStore(path)
+    store.clear()
+    store.begin("ctx")
+    assert store.room(1, "h1") == (False, None)
+
+    with open(path) as fh:
+        data = json.load(fh)
+    data["version"] = -1
+    with open(path, "w") as fh:
+        json.dump(data, fh)
+    assert StateStore(path).context is None
+    with open(path, "w") as fh:
+        fh.write("{not json")
+    assert StateStore(path).context is None
+
+
+def test_default_state_path():
+    a = default_state_path({"path": "C:/m.rvt", "title": "m"}, "/s")
+    assert a == os.path.join("/s", stable_hash("C:/m.rvt") + ".json")
+    assert default_state_path({"title": "m"}, "/s") != a
+    assert default_state_path({"path": "C:/m.rvt"}, "/s", variant="doors").endswith("-doors.json")
+
+
+def test_unchanged_model_is_reused(tmpdir):
+    path = str(tmpdir.join("state.json"))
+    model = _model()
+    first, stats = _run(path, model)
+    assert stats["rooms_reused"] == 0 and stats["groups_reused"] == 0
+    second, stats = _run(path, model)
+    assert stats["rooms_reused"] == stats["rooms"] == len(model.rooms)
+    assert stats["groups_reused"] == stats["groups"]
+    assert stats["doors_reused"] == stats["doors"] == len(model.doors)
+    expected = _plain(model)
+    for result in (first, second):
+        assert result.rooms == expected.rooms and result.doors == expected.doors
+
+
+def test_changed_room_rechecks_its_group_only(tmpdir):
+    path = str(tmpdir.join("state.json"))
+    model = _model()
+    _run(path, model)
+    model.rooms["number"][5] = "CHANGED"
+    result, stats = _run(path, model)
+    assert stats["rooms"] - stats["rooms_reused"] == 1
+    assert stats["groups"] - stats["groups_reused"] == 1
+    expected = _plain(model)
+    assert result.rooms == expected.rooms and result.doors == expected.doors
+
+
+def test_context_change_invalidates_everything(tmpdir):
+    path = str(tmpdir.join("state.json"))
+    model = _model()
+    _run(path, model)
+    result, stats = _run(path, model, level_map={0: "L09"})
+    assert stats["rooms_reused"] == stats["groups_reused"] == stats["doors_reused"] == 0
+    assert result.rooms == _plain(model, level_map={0: "L09"}).rooms
+    _, stats = _run(path, model, level_map={0: "L09"}, mode="FOH")
+    assert stats["rooms_reused"] == 0
+
+
+def test_partial_run_keeps_other_entries(tmpdir):
+    path = str(tmpdir.join("state.json"))
+    model = _model()
+    _run(path, model)
+    result, _ = _run(path, model, sector="0001", unresolved=False)
+    assert result.rooms == _plain(model, sector="0001", unresolved=False).rooms
+    _, stats = _run(path, model)
+    assert stats["rooms_reused"] == stats["rooms"]
+    assert stats["groups_reused"] == stats["groups"]
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Direct .xlsx reading: values, row gaps, sheet choice and bad packages.
+
+Run from the tool folder with ``python -m pytest tests``.
+"""
+import os
+import sys
+import zipfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "benchmarks"))
+
+import pytest
+
+import xlsx_reader
+from synthetic import write_xlsx
+
+_NS = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+_REL_NS = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+
+
+def _write_parts(path, parts):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in parts.items():
+            zf.writestr(name, data)
+
+
+def _two_sheet_parts(active_tab=1):
+    sheet = ('<worksheet {}><dimension ref="A1:C2"/><sheetData>'
+             '<row r="1"><c r="A1" t="s"><v>{}</v></c></row>'
+             '<row r="2"><c r="C2"><v>1</v></c></row>'
+             '</sheetData></worksheet>')
+    return {
+        "[Content_Types].xml": "<Types/>",
+        "xl/workbook.xml": (
+            '<workbook {} {}><bookViews><workbookView activeTab="{}"/></bookViews>'
+            '<sheets><sheet name="One" sheetId="1" r:id="rId1"/>'
+            '<sheet name="Two" sheetId="2" r:id="rId2"/></sheets></workbook>'
+            .format(_NS, _REL_NS, active_tab)),
+        "xl/_rels/workbook.xml.rels": (
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+            'relationships"><Relationship Id="rId1" Target="worksheets/sheet1.xml"/>'
+            '<Relationship Id="rId2" Target="/xl/worksheets/sheet2.xml"/></Relationships>'),
+        "xl/sharedStrings.xml": (
+            '<sst {}><si><t>first</t></si><si><r><t>sec</t></r><r><t>ond</t></r>'
+            '<rPh><t>x</t></rPh></si></sst>'.format(_NS)),
+        "xl/worksheets/sheet1.xml": sheet.format(_NS, 0),
+        "xl/worksheets/sheet2.xml": sheet.format(_NS, 1),
+    }
+
+
+def test_values_and_row_gaps(tmpdir):
+    path = str(tmpdir.join("values.xlsx"))
+    write_xlsx(path, [["Office", 1.5, None], [], [None, None, "x"]])
+    # Row 2 has no cells, so read_sheet stops there like the COM reader does.
+    assert xlsx_reader.read_sheet(path) == [["Office", 1.5, None]]
+    rows = xlsx_reader.iter_sheet_rows(path, col_count=3)
+    assert [next(rows) for _ in range(4)] == [
+        ["Office", 1.5, None], [None, None, None], [None, None, "x"], [None, None, None]]
+    rows.close()
+
+
+def test_sheet_choice_and_shared_strings(tmpdir):
+    path = str(tmpdir.join("sheets.xlsx"))
+    _write_parts(path, _two_sheet_parts(active_tab=1))
+    assert xlsx_reader.read_sheet(path) == [["second", None, None], [None, None, 1.0]]
+    assert xlsx_reader.read_sheet(path, xlsx_reader.FIRST_SHEET)[0][0] == "first"
+    assert xlsx_reader.read_sheet(path, "One")[0][0] == "first"
+    assert xlsx_reader.read_sheet(path, 2)[0][0] == "second"
+    with pytest.raises(xlsx_reader.XlsxError):
+        xlsx_reader.read_sheet(path, "Three")
+    with pytest.raises(xlsx_reader.XlsxError):
+        xlsx_reader.read_sheet(path, 3)
+
+
+def test_is_xlsx(tmpdir):
+    path = str(tmpdir.join("book.xlsx"))
+    write_xlsx(path, [["a"]])
+    text = tmpdir.join("book.xls")
+    text.write("not a zip")
+    assert xlsx_reader.is_xlsx(path)
+    assert not xlsx_reader.is_xlsx(str(text))
+
+
+@pytest.mark.parametrize("damage", ["truncated_xml", "missing_part", "not_a_zip"])
+def test_broken_packages_raise_xlsx_error(tmpdir, damage):
+    # The config readers fall back to COM only on XlsxError.
+    path = str(tmpdir.join("broken.xlsx"))
+    parts = _two_sheet_parts()
+    if damage == "truncated_xml":
+        sheet = parts["xl/worksheets/sheet2.xml"]
+        parts["xl/worksheets/sheet2.xml"] = sheet[:len(sheet) // 2]
+    elif damage == "missing_part":
+        del parts["xl/worksheets/sheet2.xml"]
+    if damage == "not_a_zip":
+        tmpdir.join("broken.xlsx").write("PK but not really")
+    else:
+        _write_parts(path, parts)
+    with pytest.raises(xlsx_reader.XlsxError):
+        xlsx_reader.read_sheet(path)
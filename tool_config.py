@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""Config workbooks of the tool folder, each loaded on first use.
+
+A run that only checks doors never opens the function or level maps, and
+one that only checks rooms never opens the door rules.  All loads share one
+``ExcelSession`` (Excel itself only starts if a workbook needs COM), which
+``close`` releases::
+
+    config = ToolConfig(tool_dir)
+    try:
+        config.prefetch(["function_map", "level_map"])  # parse in the background
+        ...                                             # collect from Revit meanwhile
+        catalogue = config.catalogue      # joins the function_map.xlsx worker
+    finally:
+        config.close()
+
+Prefetch workers (one per workbook file) never use Excel: COM stays on the
+main thread, so a workbook that needs it is read there on first use.
+"""
+import os
+import threading
+import time
+
+from instrumentation import add_time, timed
+
+FUNCTION_MAP_FILE = "function_map.xlsx"
+LEVEL_MAP_FILE = "level_map.xlsx"
+DOOR_RULES_FILE = "door_direction_rules.xlsx"
+
+# Raw workbook values: name -> (module, reader function, file name).
+READERS = {
+    "function_map": ("function_level_reader", "read_function_map", FUNCTION_MAP_FILE),
+    "function_categories": ("function_level_reader", "read_function_categories",
+                            FUNCTION_MAP_FILE),
+    "level_map": ("function_level_reader", "read_level_map", LEVEL_MAP_FILE),
+    "door_rules": ("door_rules_reader", "read_door_direction_rules", DOOR_RULES_FILE),
+}
+
+
+def _reader(name):
+    module, func, _ = READERS[name]
+    return getattr(__import__(module), func)
+
+
+class _NoExcel(object):
+    """Session for background reads: refuses to start Excel off the main thread."""
+
+    def read_workbook(self, file_path, reader):
+        raise RuntimeError("Excel is only used on the main thread")
+
+
+class _Prefetch(object):
+    """Reads of one workbook file, run on a background thread."""
+
+    def __init__(self, folder, file_name, names):
+        from config_cache import cached_read
+        self.file_name = file_name
+        self.values = {}
+        self.seconds = 0.0
+        self._joined = False
+        reads = [(name, _reader(name)) for name in names]
+        path = os.path.join(folder, file_name)
+
+        def run():
+            start = time.time()
+            try:
+                for name, reader in reads:
+                    self.values[name] = cached_read(reader, path, session=_NoExcel())
+            except Exception:
+                pass  # whatever is missing is read again on the main thread
+            self.seconds = time.time() - start
+
+        self._thread = threading.Thread(target=run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def join(self):
+        """Wait for the reads; True the first time, so their time is reported once."""
+        self._thread.join()
+        first, self._joined = not self._joined, True
+        return first
+
+
+class ToolConfig(object):
+    """Lazily loaded FunctionCatalogue, LevelResolver and DoorDirectionRules."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._session = None
+        self._loaded = {}
+        self._prefetched = {}
+
+    def prefetch(self, names):
+        """Start reading the raw values ``names`` (READERS keys) in the background.
+
+        One worker per workbook file; the values are picked up on first use.
+        """
+        by_file = {}
+        for name in names:
+            if name not in self._loaded and name not in self._prefetched:
+                by_file.setdefault(READERS[name][2], []).append(name)
+        for file_name in sorted(by_file):
+            worker = _Prefetch(self.folder, file_name, by_file[file_name])
+            for name in by_file[file_name]:
+                self._prefetched[name] = worker
+
+    def _read(self, name):
+        from config_cache import cached_read
+        worker = self._prefetched.pop(name, None)
+        if worker is not None:
+            with timed("config.wait"):
+                if worker.join():
+                    add_time("config.background." + worker.file_name, worker.seconds)
+            if name in worker.values:
+                return worker.values[name]
+        if self._session is None:
+            from excel_com import ExcelSession
+            self._session = ExcelSession()
+        return cached_read(_reader(name), os.path.join(self.folder, READERS[name][2]),
+                           session=self._session)
+
+    def _get(self, name, loader):
+        try:
+            return self._loaded[name]
+        except KeyError:
+            pass
+        with timed("config." + name):
+            value = self._loaded[name] = loader()
+        return value
+
+    @property
+    def function_map(self):
+        return self._get("function_map", lambda: self._read("function_map"))
+
+    @property
+    def function_categories(self):
+        return self._get("function_categories", lambda: self._read("function_categories"))
+
+    @property
+    def level_map(self):
+        return self._get("level_map", lambda: self._read("level_map"))
+
+    @property
+    def door_rules(self):
+        return self._get("door_rules", lambda: self._read("door_rules"))
+
+    @property
+    def catalogue(self):
+        from function_catalogue import FunctionCatalogue
+        return self._get("catalogue", lambda: FunctionCatalogue(
+            self.function_map, self.function_categories))
+
+    @property
+    def level_resolver(self):
+        from level_resolver import LevelResolver
+        return self._get("level_resolver", lambda: LevelResolver(self.level_map))
+
+    @property
+    def direction_rules(self):
+        from door_direction import DoorDirectionRules
+        return self._get("direction_rules", lambda: DoorDirectionRules(self.door_rules))
+
+    def summary(self):
+        """Markdown lines describing the workbooks loaded so far."""
+        lines = []
+        if "door_rules" in self._loaded:
+            lines.append("- Door rules: `{}`".format(len(self.direction_rules)))
+        if "function_map" in self._loaded:
+            lines.append("- Function map: `{}`".format(len(self.function_map)))
+        categories = self._loaded.get("function_categories")
+        if categories:
+            lines.append("- FOH/BOH ids from workbook: FOH `{}`, BOH `{}`".format(
+                categories.get("FOH"), categories.get("BOH")))
+        if "level_map" in self._loaded:
+            lines.append("- Level map: `{}`".format(len(self.level_map)))
+        return lines
+
+    def close(self):
+        """Wait for background reads, then release the Excel instance, if any."""
+        for worker in set(self._prefetched.values()):
+            worker.join()
+        self._prefetched = {}
+        if self._session is not None:
+            self._session.close()
+            self._session = None
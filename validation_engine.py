@@ -0,0 +1,831 @@
+# -*- coding: utf-8 -*-
+"""Room number and door mark checks over ``ModelData``.
+
+The engine only reads plain columns, so it gives the same findings for a
+live document (extracted by ``revit_extract``) and for a snapshot file
+(``model_snapshot.load_snapshot``), and runs without Revit.
+
+Run headless against a snapshot::
+
+    python validation_engine.py model.rvsnap --config-dir <tool folder>
+"""
+import os
+from collections import defaultdict, namedtuple
+
+from function_catalogue import mode_accepts
+from instrumentation import count, timed
+from model_snapshot import NO_ID
+from numbering import number_group
+from sector_index import SectorBox, SectorIndex
+from state_store import stable_hash
+
+SKIP_PHRASE = "NOT FOR DOOR SCHEDULE"
+UNRESOLVED_SECTOR = "(none)"
+
+ROOM = "room"
+DOOR = "door"
+DIRECTION = "direction"
+DUPLICATE = "duplicate"
+
+OK = "ok"
+MISMATCH = "mismatch"
+MISSING_PARAMS = "missing_params"
+NO_LEVEL = "no_level"
+NO_SECTOR = "no_sector"
+NO_MARK = "no_mark"
+NO_ROOM = "no_room"
+NO_ROOM_NUMBER = "no_room_number"
+ERROR = "error"
+DUPLICATE_NUMBER = "duplicate_number"
+DUPLICATE_MARK = "duplicate_mark"
+
+Finding = namedtuple("Finding", "kind element_id sector code details")
+
+
+def _isnan(value):
+    return value != value
+
+
+def _sector_set(sector):
+    """None (every sector), or the set of sector codes to validate."""
+    if sector is None:
+        return None
+    if isinstance(sector, (set, frozenset, list, tuple)):
+        return frozenset(sector)
+    return frozenset([sector])
+
+
+def build_sector_index(model):
+    """SectorIndex over the model's scope box table."""
+    table = model.scope_boxes
+    boxes = []
+    for i in range(len(table)):
+        frame = None
+        if not _isnan(table["ox"][i]):
+            frame = tuple(table[c][i] for c in ("ox", "oy", "ux", "uy", "vx", "vy", "lu", "lv"))
+        boxes.append(SectorBox(table["code"][i],
+                               table["min_x"][i], table["min_y"][i],
+                               table["max_x"][i], table["max_y"][i],
+                               frame=frame, order=i))
+    return SectorIndex(boxes)
+
+
+class ValidationResult(object):
+    """Findings for one validation run, in report order."""
+
+    def __init__(self, sector=None):
+        self.sector = sector
+        self.rooms = []
+        self.doors = []
+        self.directions = []
+        self.duplicates = []
+        self.levels = []
+        self.room_groups = None
+
+    def extend(self, other, source=None):
+        """Append ``other``'s findings, tagging each with ``source`` (a document)."""
+        for name in ("rooms", "doors", "directions", "duplicates"):
+            findings = getattr(other, name)
+            if source is not None:
+                findings = [f._replace(details=dict(f.details, source=source))
+                            for f in findings]
+            getattr(self, name).extend(findings)
+        return self
+
+    def findings(self, kind):
+        if kind == ROOM:
+            return self.rooms
+        if kind == DUPLICATE:
+            return self.duplicates
+        return self.directions if kind == DIRECTION else self.doors
+
+    def tallies(self, kind):
+        """{sector: [ok, issues]} for one kind of finding."""
+        counts = {}
+        for f in self.findings(kind):
+            c = counts.setdefault(f.sector or UNRESOLVED_SECTOR, [0, 0])
+            c[0 if f.code == OK else 1] += 1
+        return counts
+
+
+def run_context(model, catalogue, level_resolver, mode):
+    """Hash of everything outside the elements that findings depend on.
+
+    ``catalogue`` and ``level_resolver`` are None for door-only runs.
+    """
+    levels = model.levels
+    boxes = model.scope_boxes
+    return stable_hash(None if catalogue is None else catalogue.fingerprint(),
+                       None if level_resolver is None else level_resolver.fingerprint(),
+                       mode,
+                       [tuple(levels[c][i] for c in ("id", "name", "elevation"))
+                        for i in range(len(levels))],
+                       [tuple(boxes[c][i] for c, _ in boxes.schema)
+                        for i in range(len(boxes))])
+
+
+def _room_hash(rooms, i):
+    return stable_hash(rooms["id"][i], rooms["level_id"][i],
+                       rooms["x"][i], rooms["y"][i], rooms["sx"][i], rooms["sy"][i],
+                       rooms["name"][i], rooms["number"][i], rooms["gifa"][i],
+                       bool(rooms["has_params"][i]), rooms["error"][i])
+
+
+def _classify_room(rooms, i, catalogue, level_resolver, sector_index, mode,
+                   levels, level_rows, document):
+    """Outcome for one room, as plain (JSON-able) data.
+
+    ``["skip"]``, ``["finding", [kind, id, sector, code, details]]`` or
+    ``["member", sector, function_id, level_code, area_cat]``.
+    """
+    rid = rooms["id"][i]
+
+    def finding(code, details):
+        return ["finding", [ROOM, rid, None, code, details]]
+
+    try:
+        if rooms["error"][i]:
+            return finding(ERROR, {"error": rooms["error"][i]})
+        if not rooms["has_params"][i]:
+            return finding(MISSING_PARAMS, {})
+
+        room_number = (rooms["number"][i] or "").strip()
+        func_name = (rooms["gifa"][i] or "").strip().upper()
+
+        function_id, area_cat = catalogue.lookup(func_name, room_number)
+        if not mode_accepts(mode, area_cat):
+            return ["skip"]
+
+        level_row = level_rows.get(rooms["level_id"][i])
+        if level_row is None:
+            return finding(NO_LEVEL, {})
+        # Level ids repeat across documents (links from one template).
+        level_code = level_resolver.resolve((document, levels["id"][level_row]),
+                                            levels["name"][level_row],
+                                            levels["elevation"][level_row]).code
+
+        sx = rooms["sx"][i]
+        sy = rooms["sy"][i]
+        owner_sector = None if _isnan(sx) else sector_index.owner(sx, sy)
+        if not owner_sector:
+            return finding(NO_SECTOR, {})
+        if _isnan(rooms["x"][i]):
+            return ["skip"]
+        return ["member", owner_sector, function_id, level_code, area_cat]
+    except Exception as e:
+        return finding(ERROR, {"error": str(e)})
+
+
+class _GroupMembers(object):
+    """Rooms that reached a numbering group, as per-run columns by room row.
+
+    ``groups`` maps (sector, function id) to the member rows in model
+    order; the other columns hold what classification added to each row.
+    """
+    __slots__ = ("groups", "level_code", "area_cat", "input_hash")
+
+    def __init__(self, size):
+        self.groups = defaultdict(list)
+        self.level_code = [None] * size
+        self.area_cat = [None] * size
+        self.input_hash = [None] * size
+
+
+def _room_outcomes(model, catalogue, level_resolver, sector_index, mode, sectors,
+                   unresolved, state):
+    """(unresolved findings, _GroupMembers) for in-scope rooms."""
+    rooms = model.rooms
+    levels = model.levels
+    level_rows = dict((levels["id"][i], i) for i in range(len(levels)))
+    document = model.meta.get("path") or model.meta.get("title")
+    findings = []
+    members = _GroupMembers(len(rooms))
+
+    for i in range(len(rooms)):
+        if not rooms["in_scope"][i]:
+            continue
+        rid = rooms["id"][i]
+        input_hash = None
+        hit = False
+        if state is not None:
+            input_hash = _room_hash(rooms, i)
+            hit, outcome = state.room(rid, input_hash)
+        if not hit:
+            outcome = _classify_room(rooms, i, catalogue, level_resolver, sector_index,
+                                     mode, levels, level_rows, document)
+            if state is not None:
+                state.set_room(rid, input_hash, outcome)
+
+        if outcome[0] == "finding":
+            if unresolved:
+                findings.append(Finding(*outcome[1]))
+        elif outcome[0] == "member":
+            owner_sector, function_id, level_code, area_cat = outcome[1:]
+            if sectors is not None and owner_sector not in sectors:
+                continue
+            members.groups[(owner_sector, function_id)].append(i)
+            members.level_code[i] = level_code
+            members.area_cat[i] = area_cat
+            members.input_hash[i] = input_hash
+    return findings, members
+
+
+def _number_groups(rooms, members, state):
+    """OK/mismatch findings for each group, in sector and function id order."""
+    findings = []
+    groups = members.groups
+    ids = rooms["id"]
+    for key in sorted(groups, key=lambda k: (k[0], k[1] is None, k[1] or 0)):
+        rows = groups[key]
+        group_key = group_hash = None
+        if state is not None:
+            # Numbering depends on every member, so any change renumbers the group.
+            group_key = "{}/{}".format(key[0], key[1])
+            group_hash = stable_hash(sorted((ids[i], members.input_hash[i]) for i in rows))
+            hit, stored = state.group(group_key, group_hash)
+            if hit:
+                findings.extend(Finding(*f) for f in stored)
+                continue
+
+        group_findings = []
+        numbered = number_group(rooms["x"], rooms["y"], members.level_code,
+                                key[0], key[1], rows=rows)
+        for i, expected_number in numbered:
+            number = (rooms["number"][i] or "").strip()
+            details = {"name": (rooms["name"][i] or "").strip(),
+                       "area_cat": members.area_cat[i],
+                       "expected": expected_number, "found": number}
+            code = OK if number == expected_number else MISMATCH
+            group_findings.append(Finding(ROOM, ids[i], key[0], code, details))
+        if state is not None:
+            state.set_group(group_key, group_hash, [list(f) for f in group_findings])
+        findings.extend(group_findings)
+    return findings
+
+
+def classify_rooms(model, catalogue, level_resolver, sector_index,
+                   mode="ALL", sector=None, unresolved=True, state=None):
+    """(findings, groups): rooms that reach no numbering group, and the groups.
+
+    Arguments work as for validate_rooms.  ``groups`` is numbered by
+    number_groups, or split with group_data to number it elsewhere.
+    """
+    with timed("rooms.loop"):
+        findings, members = _room_outcomes(model, catalogue, level_resolver,
+                                           sector_index, mode, _sector_set(sector),
+                                           unresolved, state)
+    count("rooms.processed", len(model.rooms))
+    count("rooms.groups", len(members.groups))
+    return findings, members
+
+
+def number_groups(rooms, groups, state=None):
+    """OK/mismatch findings for classify_rooms ``groups``, in sector and function id order."""
+    with timed("rooms.numbering"):
+        return _number_groups(rooms, groups, state)
+
+
+def group_data(groups):
+    """{sector: [(key, rows, level codes, area categories)]} as plain data.
+
+    Each sector's groups can be numbered on their own (in another process)
+    with number_group_data.
+    """
+    by_sector = defaultdict(list)
+    for key in sorted(groups.groups, key=lambda k: (k[0], k[1] is None, k[1] or 0)):
+        rows = groups.groups[key]
+        by_sector[key[0]].append((key, rows, [groups.level_code[i] for i in rows],
+                                  [groups.area_cat[i] for i in rows]))
+    return dict(by_sector)
+
+
+def number_group_data(rooms, data):
+    """Findings for groups in group_data form; same as number_groups on them."""
+    members = _GroupMembers(len(rooms))
+    for key, rows, level_codes, area_cats in data:
+        members.groups[tuple(key)] = list(rows)
+        for i, level_code, area_cat in zip(rows, level_codes, area_cats):
+            members.level_code[i] = level_code
+            members.area_cat[i] = area_cat
+    return number_groups(rooms, members)
+
+
+def validate_rooms(model, catalogue, level_resolver, sector_index,
+                   mode="ALL", sector=None, unresolved=True, state=None):
+    """Room numbering findings, grouped by (sector, function id).
+
+    ``sector`` is one code or a collection of codes (None: all sectors).
+    With ``unresolved=False`` rooms that never reach a sector are left out,
+    so runs over disjoint sector sets can be merged without duplicates.
+    With a begun ``state`` (see validate_model) unchanged rooms reuse their
+    stored outcome and unchanged groups their stored findings.
+    """
+    findings, groups = classify_rooms(model, catalogue, level_resolver, sector_index,
+                                      mode, sector, unresolved, state)
+    findings.extend(number_groups(model.rooms, groups, state))
+    return findings
+
+
+class DoorRoomIndex(object):
+    """Per-run lookups shared by the door checks.
+
+    Reference rooms and door sectors are worked out once, however many
+    doors share a room or checks visit a door.
+    """
+
+    def __init__(self, model, sector_index):
+        self.doors = model.doors
+        self.rooms = model.rooms
+        self.sector_index = sector_index
+        self._room_rows = dict((self.rooms["id"][i], i) for i in range(len(self.rooms)))
+        self._ref_rows = {}
+        self._door_sectors = {}
+
+    def ref_row(self, i):
+        """Row of door ``i``'s reference room: its ToRoom, else its FromRoom."""
+        try:
+            return self._ref_rows[i]
+        except KeyError:
+            pass
+        ref_id = self.doors["to_room"][i]
+        if ref_id == NO_ID:
+            ref_id = self.doors["from_room"][i]
+        row = self._room_rows.get(ref_id) if ref_id != NO_ID else None
+        self._ref_rows[i] = row
+        return row
+
+    def door_sector(self, i):
+        """Sector owning door ``i``'s reference point, or None."""
+        try:
+            return self._door_sectors[i]
+        except KeyError:
+            pass
+        x = self.doors["x"][i]
+        sector = None if _isnan(x) else self.sector_index.owner(x, self.doors["y"][i])
+        self._door_sectors[i] = sector
+        return sector
+
+
+def mark_matches(room_number, mark):
+    """True when ``mark`` is ``room_number`` plus at most one letter A-Z.
+
+    Same result as ``re.match(r'^<number>[A-Z]?$', mark)`` without compiling
+    a pattern per room number.
+    """
+    if not mark.startswith(room_number):
+        return False
+    rest = mark[len(room_number):]
+    if rest.endswith("\n"):
+        rest = rest[:-1]  # "$" also matches before a final newline
+    return not rest or (len(rest) == 1 and "A" <= rest <= "Z")
+
+
+def _door_skipped(doors, i):
+    """True for doors marked NOT FOR DOOR SCHEDULE (type or instance comments)."""
+    return (SKIP_PHRASE in (doors["type_comments"][i] or "").upper()
+            or SKIP_PHRASE in (doors["comments"][i] or "").upper())
+
+
+def _door_hash(doors, i, rooms, ref_row):
+    ref = (None, None) if ref_row is None else (rooms["number"][ref_row],
+                                                rooms["name"][ref_row])
+    return stable_hash(doors["id"][i], doors["x"][i], doors["y"][i],
+                       doors["from_room"][i], doors["to_room"][i], doors["mark"][i],
+                       doors["type_comments"][i], doors["comments"][i],
+                       doors["error"][i], ref)
+
+
+def _classify_door(index, i):
+    """Outcome for one door: ``["skip"]`` or ``["finding", [...]]``."""
+    doors = index.doors
+    rooms = index.rooms
+    did = doors["id"][i]
+    door_sector = None
+
+    def finding(code, details):
+        return ["finding", [DOOR, did, door_sector, code, details]]
+
+    try:
+        if doors["error"][i]:
+            return finding(ERROR, {"error": doors["error"][i]})
+        if _door_skipped(doors, i):
+            return ["skip"]
+
+        door_sector = index.door_sector(i)
+        if not door_sector:
+            return finding(NO_SECTOR, {})
+
+        mark = doors["mark"][i]
+        if mark is None:
+            return finding(NO_MARK, {})
+        ref_row = index.ref_row(i)
+        if ref_row is None:
+            return finding(NO_ROOM, {})
+
+        room_number = rooms["number"][ref_row]
+        if room_number is None:
+            return finding(NO_ROOM_NUMBER, {})
+        ref_room_name = rooms["name"][ref_row] or ""
+
+        details = {"room_name": ref_room_name, "room_number": room_number, "mark": mark}
+        code = OK if mark_matches(room_number, mark) else MISMATCH
+        return finding(code, details)
+    except Exception as e:
+        return finding(ERROR, {"error": str(e)})
+
+
+def validate_doors(model, sector_index, sector=None, unresolved=True, state=None,
+                   door_index=None):
+    """Door mark findings: each mark must be its reference room's number + [A-Z].
+
+    ``sector``, ``unresolved`` and ``state`` work as for validate_rooms;
+    ``door_index`` is a DoorRoomIndex to share with other door checks.
+    """
+    sectors = _sector_set(sector)
+    doors = model.doors
+    rooms = model.rooms
+    index = door_index or DoorRoomIndex(model, sector_index)
+    findings = []
+
+    with timed("doors.loop"):
+        for i in range(len(doors)):
+            did = doors["id"][i]
+            hit = False
+            if state is not None:
+                input_hash = _door_hash(doors, i, rooms, index.ref_row(i))
+                hit, outcome = state.door(did, input_hash)
+            if not hit:
+                outcome = _classify_door(index, i)
+                if state is not None:
+                    state.set_door(did, input_hash, outcome)
+
+            if outcome[0] != "finding":
+                continue
+            f = Finding(*outcome[1])
+            if f.sector is None:
+                if unresolved:
+                    findings.append(f)
+            elif sectors is None or f.sector in sectors:
+                findings.append(f)
+    count("doors.processed", len(doors))
+    return findings
+
+
+def validate_door_directions(model, sector_index, direction_rules, sector=None,
+                             door_index=None):
+    """Door flip findings for doors a direction rule applies to.
+
+    ``direction_rules`` is a DoorDirectionRules.  Doors without a sector,
+    without a FacingFlipped value or matching no rule are not checked.
+    """
+    sectors = _sector_set(sector)
+    doors = model.doors
+    rooms = model.rooms
+    index = door_index or DoorRoomIndex(model, sector_index)
+    findings = []
+
+    with timed("doors.directions"):
+        for i in range(len(doors)):
+            did = doors["id"][i]
+            if doors["error"][i] or doors["flipped"][i] == NO_ID:
+                continue
+            if _door_skipped(doors, i):
+                continue
+            door_sector = index.door_sector(i)
+            if not door_sector or (sectors is not None and door_sector not in sectors):
+                continue
+
+            ref_row = index.ref_row(i)
+            room_name = (rooms["name"][ref_row] or "") if ref_row is not None else ""
+            type_name = doors["type_name"][i] or ""
+            search_text = "{} {}".format(doors["family"][i] or "", type_name)
+            rule = direction_rules.expected(room_name, search_text, type_name)
+            if rule is None:
+                continue
+            flipped = bool(doors["flipped"][i])
+            details = {"room_name": room_name, "rule": rule.rule, "phrase": rule.phrase,
+                       "expected": rule.flip, "flipped": flipped}
+            code = OK if flipped == rule.flip else MISMATCH
+            findings.append(Finding(DIRECTION, did, door_sector, code, details))
+    count("doors.directions_processed", len(doors))
+    return findings
+
+
+class DuplicateIndex(object):
+    """Every room Number and door Mark of a document, hashed to the ids using it.
+
+    Built from the document-wide ``room_numbers`` / ``door_marks`` tables,
+    so rooms and doors the view or mode left out still count.  Models
+    without them (``meta["document_values"]`` false: view runs that did not
+    ask for them, older snapshots) use the extracted rooms and doors.  Doors
+    skipped by the door checks are left out.
+    """
+
+    def __init__(self, model):
+        if model.meta.get("document_values"):
+            rooms, doors = model.room_numbers, model.door_marks
+        else:
+            rooms, doors = model.rooms, model.doors
+        self._numbers = self._index(rooms, "number", lambda i: True)
+        self._marks = self._index(doors, "mark", lambda i: not _door_skipped(doors, i))
+
+    @staticmethod
+    def _index(table, column, keep):
+        index = {}
+        ids = table["id"]
+        values = table[column]
+        for i in range(len(table)):
+            value = values[i]
+            if value and keep(i):
+                index.setdefault(value, []).append(ids[i])
+        return index
+
+    def holders(self, kind):
+        """{value: set(ids)} of room numbers (ROOM) or door marks (DOOR)."""
+        index = self._numbers if kind == ROOM else self._marks
+        return dict((value, set(ids)) for value, ids in index.items())
+
+    def collisions(self, kind):
+        """{value: [ids]} for values used by more than one room (ROOM) or door."""
+        index = self._numbers if kind == ROOM else self._marks
+        return dict((value, ids) for value, ids in index.items() if len(ids) > 1)
+
+
+def validate_duplicates(model, sector_index, duplicate_index, sector=None,
+                        unresolved=True, rooms=True, doors=True, door_index=None):
+    """A finding per in-scope room or door sharing its Number/Mark with another.
+
+    ``details["others"]`` lists every other element id using the value,
+    whether or not it is in the validated sectors or was extracted.
+    """
+    sectors = _sector_set(sector)
+    index = door_index or DoorRoomIndex(model, sector_index)
+    findings = []
+
+    def add(element_id, element_sector, code, field, value, ids):
+        if element_sector is None:
+            if not unresolved:
+                return
+        elif sectors is not None and element_sector not in sectors:
+            return
+        others = [other for other in ids if other != element_id]
+        findings.append(Finding(DUPLICATE, element_id, element_sector, code,
+                                {field: value, "others": others}))
+
+    def rows(table):
+        return dict((table["id"][i], i) for i in range(len(table)))
+
+    with timed("duplicates.check"):
+        if rooms:
+            table = model.rooms
+            room_rows = rows(table)
+            collisions = duplicate_index.collisions(ROOM)
+            for value in sorted(collisions):
+                for room_id in collisions[value]:
+                    i = room_rows.get(room_id)
+                    if i is None or not table["in_scope"][i]:
+                        continue
+                    sx = table["sx"][i]
+                    room_sector = None if _isnan(sx) else sector_index.owner(sx, table["sy"][i])
+                    add(room_id, room_sector or None, DUPLICATE_NUMBER,
+                        "room_number", value, collisions[value])
+        if doors:
+            door_rows = rows(model.doors)
+            collisions = duplicate_index.collisions(DOOR)
+            for value in sorted(collisions):
+                for door_id in collisions[value]:
+                    i = door_rows.get(door_id)
+                    if i is None:
+                        continue
+                    add(door_id, index.door_sector(i) or None, DUPLICATE_MARK,
+                        "mark", value, collisions[value])
+    count("duplicates.found", len(findings))
+    return findings
+
+
+def validate_model(model, catalogue, level_resolver, mode="ALL", sector=None,
+                   rooms=True, doors=True, unresolved=True, state=None,
+                   direction_rules=None, duplicates=True, numbering=True):
+    """Run room and/or door checks; ``sector=None`` validates every sector.
+
+    ``state`` is an optional StateStore; it is begun here with the run
+    context, and saving it is left to the caller.  Door flips are checked
+    when ``direction_rules`` (a DoorDirectionRules) is given, and shared
+    room Numbers / door Marks when ``duplicates`` is true.  With
+    ``rooms=False`` the catalogue and level resolver are not used and may
+    be None.  With ``numbering=False`` the room groups are left unnumbered
+    in ``result.room_groups`` (see classify_rooms) and ``result.rooms`` only
+    holds the rooms outside them.
+    """
+    with timed("sectors.index"):
+        sector_index = build_sector_index(model)
+    result = ValidationResult(sector)
+    if not rooms:
+        catalogue = level_resolver = None
+    if state is not None:
+        state.begin(run_context(model, catalogue, level_resolver, mode))
+    if rooms:
+        result.rooms, groups = classify_rooms(model, catalogue, level_resolver,
+                                              sector_index, mode, sector, unresolved, state)
+        if numbering:
+            result.rooms.extend(number_groups(model.rooms, groups, state))
+        else:
+            result.room_groups = groups
+    door_index = DoorRoomIndex(model, sector_index)
+    if doors:
+        result.doors = validate_doors(model, sector_index, sector, unresolved, state,
+                                      door_index)
+        if direction_rules is not None:
+            result.directions = validate_door_directions(model, sector_index,
+                                                         direction_rules, sector,
+                                                         door_index)
+    if duplicates and (rooms or doors):
+        with timed("duplicates.index"):
+            duplicate_index = DuplicateIndex(model)
+        result.duplicates = validate_duplicates(model, sector_index, duplicate_index,
+                                                sector, unresolved, rooms, doors,
+                                                door_index)
+    if level_resolver is not None:
+        result.levels = level_resolver.explain()
+    if state is not None:
+        for key, value in sorted(state.stats.items()):
+            count("state." + key, value)
+    return result
+
+
+MAX_LISTED_OTHERS = 10
+
+
+def _link(element_id):
+    return "[{0}](revit://element?id={0})".format(element_id)
+
+
+def _plain_id(element_id):
+    return "[{}]".format(element_id)
+
+
+def format_finding(finding):
+    """Markdown line for a finding, or None for findings that are only counted.
+
+    Findings from a linked model (``details["source"]``) name the link and
+    show plain ids: a revit:// link would select the host element that
+    happens to have the same id.
+    """
+    source = finding.details.get("source")
+    line = _format_finding(finding, _plain_id if source else _link)
+    if line and source:
+        bullet, rest = line.split(" ", 1)
+        line = "{} [{}] {}".format(bullet, source, rest)
+    return line
+
+
+def _format_finding(finding, link):
+    d = finding.details
+    if finding.kind == DIRECTION:
+        rule = "{} `{}`".format(d["rule"], d["phrase"])
+        if finding.code == OK:
+            return "• Door {} → Room '{}' direction OK ({})".format(
+                link(finding.element_id), d["room_name"], rule)
+        return "• Door {} → Room '{}' Expected {} | Found {} ({})".format(
+            link(finding.element_id), d["room_name"],
+            "flipped" if d["expected"] else "not flipped",
+            "flipped" if d["flipped"] else "not flipped", rule)
+    if finding.kind == DUPLICATE:
+        others = d["others"]
+        links = ", ".join(link(other) for other in others[:MAX_LISTED_OTHERS])
+        if len(others) > MAX_LISTED_OTHERS:
+            links += " and {} more".format(len(others) - MAX_LISTED_OTHERS)
+        if finding.code == DUPLICATE_NUMBER:
+            return "• Room {} Number `{}` also used by {}".format(
+                link(finding.element_id), d["room_number"], links)
+        return "• Door {} Mark `{}` also used by {}".format(
+            link(finding.element_id), d["mark"], links)
+    if finding.kind == ROOM:
+        if finding.code == OK:
+            return "• Room {} '{}' [{}] OK".format(
+                link(finding.element_id), d["name"], d["area_cat"])
+        if finding.code == MISMATCH:
+            return "• Room {} '{}' [{}] Expected `{}` | Found `{}`".format(
+                link(finding.element_id), d["name"], d["area_cat"],
+                d["expected"], d["found"])
+        return None
+
+    if finding.code == MISMATCH:
+        return "• Door {} → Room '{}' [{}] Expected `{}`[A-Z] | Found `{}`".format(
+            link(finding.element_id), d["room_name"], d["room_number"],
+            d["room_number"], d["mark"])
+    if finding.code == ERROR:
+        return "- Error validating Door [{}]: {}".format(finding.element_id, d["error"])
+    messages = {
+        NO_SECTOR: "could not resolve sector.",
+        NO_MARK: "has no Mark.",
+        NO_ROOM: "has no room reference.",
+        NO_ROOM_NUMBER: "reference room missing Number.",
+    }
+    if finding.code in messages:
+        return "- Door {} {}".format(link(finding.element_id), messages[finding.code])
+    return None
+
+
+def sector_sort_key(sector):
+    return (sector == UNRESOLVED_SECTOR, sector)
+
+
+def report_lines(findings, by_sector=False):
+    """Markdown lines for findings, optionally under per-sector headings."""
+    if not by_sector:
+        return [line for line in (format_finding(f) for f in findings) if line]
+    grouped = defaultdict(list)
+    for f in findings:
+        line = format_finding(f)
+        if line:
+            grouped[f.sector or UNRESOLVED_SECTOR].append(line)
+    lines = []
+    for sector in sorted(grouped, key=sector_sort_key):
+        lines.append("### Sector `{}`".format(sector))
+        lines.extend(grouped[sector])
+    return lines
+
+
+def load_config(config_dir):
+    """(FunctionCatalogue, LevelResolver) from the workbooks in ``config_dir``."""
+    from config_cache import cached_read
+    from function_catalogue import FunctionCatalogue
+    from function_level_reader import (read_function_map, read_function_categories,
+                                       read_level_map)
+    from level_resolver import LevelResolver
+
+    function_map_file = os.path.join(config_dir, "function_map.xlsx")
+    level_map_file = os.path.join(config_dir, "level_map.xlsx")
+    catalogue = FunctionCatalogue(cached_read(read_function_map, function_map_file),
+                                  cached_read(read_function_categories, function_map_file))
+    resolver = LevelResolver(cached_read(read_level_map, level_map_file))
+    return catalogue, resolver
+
+
+def load_direction_rules(config_dir):
+    """DoorDirectionRules from ``config_dir``, or None without a rule workbook."""
+    from config_cache import cached_read
+    from door_direction import DoorDirectionRules
+    from door_rules_reader import read_door_direction_rules
+
+    door_rule_file = os.path.join(config_dir, "door_direction_rules.xlsx")
+    if not os.path.exists(door_rule_file):
+        return None
+    return DoorDirectionRules(cached_read(read_door_direction_rules, door_rule_file))
+
+
+def main(argv=None):
+    import argparse
+    from model_snapshot import load_snapshot
+
+    parser = argparse.ArgumentParser(description="Validate a model snapshot without Revit.")
+    parser.add_argument("snapshot", help="snapshot file written from Revit")
+    parser.add_argument("--config-dir", default=os.path.dirname(os.path.abspath(__file__)),
+                        help="folder holding function_map.xlsx, level_map.xlsx and "
+                             "door_direction_rules.xlsx")
+    parser.add_argument("--mode", choices=["ALL", "FOH", "BOH"], default="ALL")
+    parser.add_argument("--sector", default=None,
+                        help="validate one sector (default: the snapshot's view sector, "
+                             "or every sector for whole-model snapshots)")
+    parser.add_argument("--export", default=None,
+                        help="also write the findings to a .csv or .json file")
+    parser.add_argument("--state", default=None,
+                        help="state file; unchanged elements reuse its stored results")
+    args = parser.parse_args(argv)
+
+    model = load_snapshot(args.snapshot)
+    try:
+        sector = args.sector or model.meta.get("view_sector")
+        catalogue, resolver = load_config(args.config_dir)
+        direction_rules = load_direction_rules(args.config_dir)
+        state = None
+        if args.state:
+            from state_store import StateStore
+            state = StateStore(args.state)
+        result = validate_model(model, catalogue, resolver, args.mode, sector, state=state,
+                                direction_rules=direction_rules)
+        if state is not None:
+            state.save()
+        if args.export:
+            from report_builder import export_result
+            export_result(result, args.export, model.meta)
+    finally:
+        model.close()
+
+    for kind, title in ((ROOM, "Rooms"), (DOOR, "Doors"), (DIRECTION, "Door directions"),
+                        (DUPLICATE, "Duplicate numbers and marks")):
+        print("## {}".format(title))
+        for line in report_lines(result.findings(kind), by_sector=sector is None):
+            print(line)
+        tallies = result.tallies(kind)
+        print("{} OK: {}, Issues: {}".format(title, sum(c[0] for c in tallies.values()),
+                                            sum(c[1] for c in tallies.values())))
+    issues = sum(c[1] for kind in (ROOM, DOOR, DIRECTION, DUPLICATE)
+                 for c in result.tallies(kind).values())
+    return 1 if issues else 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
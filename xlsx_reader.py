@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""Read .xlsx workbooks straight from the zip/XML package (no Excel needed).
+
+Values are returned the way Excel's ``Range.Value2`` returns them through
+COM, so callers get the same row lists as the COM reader: numbers (and
+dates) as floats, text as strings, booleans as bools, empty cells as None.
+"""
+import os
+import posixpath
+import re
+import zipfile
+import zlib
+from xml.etree import ElementTree as ET
+
+ACTIVE_SHEET = "active"
+FIRST_SHEET = "first"
+
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_CELL_REF = re.compile(r'^([A-Z]+)(\d+)$')
+
+
+class XlsxError(Exception):
+    """The file is not a workbook this reader understands."""
+    pass
+
+
+# What a truncated, corrupt or incomplete package raises while it is read.
+_PACKAGE_ERRORS = (ET.ParseError, KeyError, zipfile.BadZipfile, zlib.error, EOFError)
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _col_index(letters):
+    idx = 0
+    for ch in letters:
+        idx = idx * 26 + (ord(ch) - 64)
+    return idx
+
+
+def _split_ref(ref):
+    m = _CELL_REF.match((ref or "").upper().replace("$", ""))
+    if not m:
+        return None, None
+    return _col_index(m.group(1)), int(m.group(2))
+
+
+def _join_path(base_dir, target):
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(base_dir, target))
+
+
+def _iterparse(zf, name):
+    """Stream (event, element) pairs for a package part."""
+    with zf.open(name) as fh:
+        for event, elem in ET.iterparse(fh, events=("start", "end")):
+            yield event, elem
+
+
+def _workbook_sheets(zf):
+    """Return ([(sheet name, part path)], active tab index) for the workbook."""
+    rels = {}
+    rels_name = "xl/_rels/workbook.xml.rels"
+    if rels_name in zf.namelist():
+        root = ET.fromstring(zf.read(rels_name))
+        for rel in root:
+            if _local(rel.tag) == "Relationship":
+                rels[rel.get("Id")] = _join_path("xl", rel.get("Target", ""))
+
+    try:
+        root = ET.fromstring(zf.read("xl/workbook.xml"))
+    except KeyError:
+        raise XlsxError("Workbook part xl/workbook.xml not found")
+
+    sheets = []
+    active_tab = 0
+    for elem in root.iter():
+        tag = _local(elem.tag)
+        if tag == "workbookView" and elem.get("activeTab"):
+            try:
+                active_tab = int(elem.get("activeTab"))
+            except ValueError:
+                pass
+        elif tag == "sheet":
+            rid = elem.get("{%s}id" % _REL_NS)
+            if rid is None:
+                # Strict OOXML puts r:id in a different namespace.
+                for key, val in elem.attrib.items():
+                    if _local(key) == "id":
+                        rid = val
+                        break
+            part = rels.get(rid)
+            if part:
+                sheets.append((elem.get("name"), part))
+
+    if not sheets:
+        raise XlsxError("Workbook has no worksheets")
+    return sheets, active_tab
+
+
+def _sheet_part(zf, sheet):
+    sheets, active_tab = _workbook_sheets(zf)
+    if sheet == FIRST_SHEET:
+        return sheets[0][1]
+    if sheet == ACTIVE_SHEET:
+        if 0 <= active_tab < len(sheets):
+            return sheets[active_tab][1]
+        return sheets[0][1]
+    if isinstance(sheet, int):
+        # 1-based, like Sheets.Item(n)
+        try:
+            return sheets[sheet - 1][1]
+        except IndexError:
+            raise XlsxError("Sheet index {} out of range".format(sheet))
+    for name, part in sheets:
+        if name == sheet:
+            return part
+    raise XlsxError("Sheet '{}' not found".format(sheet))
+
+
+def _read_shared_strings(zf):
+    name = "xl/sharedStrings.xml"
+    if name not in zf.namelist():
+        return []
+    strings = []
+    parts = []
+    in_phonetic = False
+    for event, elem in _iterparse(zf, name):
+        tag = _local(elem.tag)
+        if event == "start":
+            if tag == "si":
+                parts = []
+            elif tag == "rPh":
+                in_phonetic = True
+            continue
+        if tag == "t" and not in_phonetic:
+            parts.append(elem.text or "")
+        elif tag == "rPh":
+            in_phonetic = False
+        elif tag == "si":
+            strings.append(u"".join(parts))
+            elem.clear()
+    return strings
+
+
+def _cell_value(cell_type, raw, inline_text, shared):
+    if cell_type == "inlineStr":
+        return inline_text
+    if raw is None:
+        return None
+    if cell_type == "s":
+        try:
+            return shared[int(raw)]
+        except (ValueError, IndexError):
+            return None
+    if cell_type in ("str", "e"):
+        return raw
+    if cell_type == "b":
+        return raw.strip() in ("1", "true")
+    try:
+        return float(raw)
+    except ValueError:
+        return raw
+
+
+def _iter_cells(zf, part, shared):
+    """Yield ('dim', ref) once if present, then (row, col, value) per cell."""
+    row_num = 0
+    col_num = 0
+    cell_type = None
+    cell_ref = None
+    raw = None
+    inline = []
+    in_inline = False
+    for event, elem in _iterparse(zf, part):
+        tag = _local(elem.tag)
+        if event == "start":
+            if tag == "row":
+                r = elem.get("r")
+                row_num = int(r) if r else row_num + 1
+                col_num = 0
+            elif tag == "c":
+                cell_type = elem.get("t")
+                cell_ref = elem.get("r")
+                raw = None
+                inline = []
+            elif tag == "is":
+                in_inline = True
+            continue
+
+        if tag == "dimension":
+            yield ("dim", elem.get("ref"), None)
+        elif tag == "v":
+            raw = elem.text
+        elif tag == "t" and in_inline:
+            inline.append(elem.text or "")
+        elif tag == "is":
+            in_inline = False
+        elif tag == "c":
+            col, row = _split_ref(cell_ref)
+            if col is None:
+                col = col_num + 1
+                row = row_num
+            col_num = col
+            value = _cell_value(cell_type, raw, u"".join(inline), shared)
+            if value is not None:
+                yield (row, col, value)
+            elem.clear()
+        elif tag == "row":
+            elem.clear()
+        elif tag == "sheetData":
+            break
+
+
+def _used_column_count(zf, part, shared):
+    """Columns.Count of UsedRange, from <dimension> or a pre-scan of cells."""
+    cells = _iter_cells(zf, part, shared)
+    try:
+        for row, ref, _ in cells:
+            if row == "dim":
+                bounds = (ref or "").split(":")
+                if len(bounds) == 2:
+                    first, _r1 = _split_ref(bounds[0])
+                    last, _r2 = _split_ref(bounds[1])
+                    if first and last:
+                        return last - first + 1
+            break
+    finally:
+        cells.close()
+    # No usable dimension: derive it from the cells themselves.
+    min_col = None
+    max_col = None
+    for row, col, _ in _iter_cells(zf, part, shared):
+        if row == "dim":
+            continue
+        min_col = col if min_col is None else min(min_col, col)
+        max_col = col if max_col is None else max(max_col, col)
+    if min_col is None:
+        return 1
+    return max_col - min_col + 1
+
+
+def _open(file_path):
+    try:
+        return zipfile.ZipFile(file_path)
+    except zipfile.BadZipfile:
+        raise XlsxError("Not an .xlsx package: {}".format(file_path))
+
+
+def iter_sheet_rows(file_path, sheet=ACTIVE_SHEET, col_count=None):
+    """Yield every row from row 1 down as a list of ``col_count`` values.
+
+    Rows missing from the sheet XML are yielded as all-None rows, so the
+    caller sees the same sequence ``Cells(row, col)`` would give.  When
+    ``col_count`` is None the UsedRange column count is used.
+    """
+    zf = _open(file_path)
+    cells = None
+    try:
+        try:
+            shared = _read_shared_strings(zf)
+            part = _sheet_part(zf, sheet)
+            if col_count is None:
+                col_count = _used_column_count(zf, part, shared)
+
+            current = 1
+            values = [None] * col_count
+            cells = _iter_cells(zf, part, shared)
+            for row, col, value in cells:
+                if row == "dim":
+                    continue
+                while row > current:
+                    yield values
+                    current += 1
+                    values = [None] * col_count
+                if row == current and col <= col_count:
+                    values[col - 1] = value
+            yield values
+            # Past the last stored row every cell is empty.
+            while True:
+                yield [None] * col_count
+        except _PACKAGE_ERRORS as err:
+            raise XlsxError("Cannot read {}: {}".format(file_path, err))
+    finally:
+        if cells is not None:
+            cells.close()
+        zf.close()
+
+
+def read_sheet(file_path, sheet=ACTIVE_SHEET):
+    """Read rows from row 1 until the first completely empty row."""
+    data = []
+    for row_values in iter_sheet_rows(file_path, sheet):
+        if all(v is None for v in row_values):
+            break
+        data.append(row_values)
+    return data
+
+
+def is_xlsx(file_path):
+    """True when the path looks like an Office Open XML workbook."""
+    ext = os.path.splitext(file_path)[1].lower()
+    return ext in (".xlsx", ".xlsm") and zipfile.is_zipfile(file_path)